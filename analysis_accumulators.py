@@ -0,0 +1,894 @@
+"""
+Incremental statistics for YearInReviewAnalyzer
+Keeps running, mergeable accumulators (monthly sums, opponent/teammate counters,
+streak and tilt state, ...) for a player's match history, so when a few new
+games are played only those games are folded in instead of recomputing every
+section over the whole year. Accumulators are saved per PUUID by AnalysisStore.
+
+Matches are folded in chronologically (oldest first). Every table remembers the
+sequence number of the most recent match it saw, which reproduces the
+most-recent-first ordering (and so the max/min tie-breaks) of the analyzer.
+"""
+from collections import Counter
+
+from analysis_store import match_digest
+from match_features import match_features
+from outcome_sequence import TILT_WINDOWS
+from player_index import player_key, riot_id
+from population_baselines import cs_rank, get_baselines
+
+# Bump whenever the accumulated state or the sections computed from it change
+ACCUMULATOR_VERSION = 7
+
+# Sections computed from the accumulators (the rest need timelines or the network)
+SECTIONS = (
+    'nemesis', 'bff', 'hot_streak_month', 'slump_month', 'glow_up', 'miracle_comeback',
+    'pentakill_breaker', 'afk_stats', 'highlight_stats', 'role_evolution', 'longest_win_streak',
+    'surrender_analysis', 'what_if_scenarios', 'time_analysis', 'champion_diversity', 'total_hours',
+    'cs_efficiency', 'tilt_detection', 'champion_fatigue', 'learning_curves', 'meta_adaptation',
+    'objective_priority', 'duo_synergy', 'tilt_factor',
+)
+
+# Tables keyed by a label, each entry a list of running values ending with the last sequence number
+TABLES = ('opponents', 'teammates', 'duos', 'months', 'played_months', 'periods', 'roles',
+          'champions', 'patches', 'month_roles', 'fatigue')
+
+
+def _recent_first(table):
+    """Table items ordered by most recent appearance (the analyzer's dict insertion order)"""
+    return sorted(table.items(), key=lambda item: item[1][-1], reverse=True)
+
+
+def _game_details(row, *fields):
+    """Champion/date/time/kda details shown for highlight games"""
+    details = {'champion': row['champion'], 'date': row['date'].strftime('%B %d, %Y')}
+    if 'time' in fields:
+        details['time'] = row['date'].strftime('%I:%M %p')
+    if 'kda' in fields:
+        details['kda'] = f"{row['kills']}/{row['deaths']}/{row['assists']}"
+    return details
+
+
+class MatchAccumulators:
+    """Running statistics over a chronologically growing match history"""
+
+    def __init__(self):
+        self.match_ids = []  # Chronological
+        self.digests = []  # match_digest of each folded match, so a history with edited games isn't extended
+        self.last_creation = None
+        self.tables = {name: {} for name in TABLES}
+        # Per-match series for sections that slice the history (glow up, learning curves)
+        self.series = {'win': [], 'kills': [], 'deaths': [], 'assists': [], 'cs_per_min': []}
+        self.totals = Counter()
+        self.records = {}  # Best/worst games and their details
+        self.recent_quadras = []  # Most recent quadra-but-no-penta matches, oldest first
+        self.win_streak = {'current': 0, 'start': 0, 'start_game': None, 'max': 0, 'max_start': 0,
+                           'max_start_game': None, 'max_end_game': None}
+        # after_streaks[k - 1] = [games, wins] played right after exactly k straight losses, so the
+        # win rate after any number of losses is a suffix sum
+        self.tilt = {'recent': [], 'loss_streak': 0, 'episodes': 0, 'longest_episode': 0, 'after_streaks': []}
+        self.tilt_factor = {'prev': None, 'current': 0, 'max_loss_streak': 0, 'loss_streaks': 0,
+                            'loss_streak_total': 0, 'after_loss': [0, 0, 0], 'after_win': [0, 0, 0]}
+        self.fatigue_state = {'champion': None, 'games': 0}
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    # ---- Updating ----
+
+    def extend(self, matches, digests=None):
+        """
+        Fold in the matches that are new since the last update
+
+        Args:
+            matches: Full processed match list, most recent first
+            digests: match_digest of each match in the same order (computed if not given)
+
+        Returns:
+            Number of matches added, or None if `matches` isn't this history plus newer games
+            (the caller should start from fresh accumulators then)
+        """
+        count = len(self.match_ids)
+        if len(matches) < count:
+            return None
+        chronological = matches[::-1]
+        if [m.get('matchId') for m in chronological[:count]] != self.match_ids:
+            return None
+        if digests is None:
+            digests = [match_digest(m) for m in matches]
+        chronological_digests = digests[::-1]
+        if chronological_digests[:count] != self.digests:
+            return None
+
+        new_matches = chronological[count:]
+        last_creation = self.last_creation
+        for match in new_matches:
+            creation = match.get('gameCreation', 0)
+            if last_creation is not None and creation <= last_creation:
+                return None  # Out of order - the tie-breaks below would no longer match
+            last_creation = creation
+
+        for match, digest in zip(new_matches, chronological_digests[count:]):
+            self.add(match, digest)
+        return len(new_matches)
+
+    def add(self, match, digest=None):
+        """
+        Fold a single match (newer than every match seen so far) into the accumulators
+
+        Without its digest the accumulators can be read but never extended (e.g. one-pass streaming).
+        """
+        seq = len(self.match_ids)
+        row = match_features(match)
+        self.match_ids.append(match.get('matchId'))
+        self.digests.append(digest)
+        self.last_creation = row['creation']
+        win = 1 if row['win'] else 0
+        tables = self.tables
+
+        # Opponents (losses only) / teammates, remembering where in the most recent match they appeared
+        # Keyed by PUUID, showing the Riot ID from the most recent game
+        if not match['win']:
+            for pos, opponent in enumerate(match.get('opponents', [])):
+                self._count_player(tables['opponents'], player_key(opponent), seq, pos, opponent, win,
+                                   riot_id(opponent))
+        for pos, teammate in enumerate(match.get('teammates', [])):
+            if teammate.get('riotIdGameName'):
+                self._count_player(tables['teammates'], player_key(teammate), seq, pos, teammate, win,
+                                   riot_id(teammate))
+            if isinstance(teammate, dict):
+                key, name = player_key(teammate), riot_id(teammate, unknown='Unknown')
+            else:
+                key = name = str(teammate)
+            self._count_player(tables['duos'], key, seq, pos, None, win, name)
+
+        # Group-by tables: [games, wins, kills, deaths, assists, last_seq]
+        for name, label in (('months', row['month']), ('periods', row['period']), ('roles', row['role'])):
+            entry = tables[name].setdefault(label, [0, 0, 0, 0, 0, seq])
+            entry[0] += 1
+            entry[1] += win
+            entry[2] += row['kills']
+            entry[3] += row['deaths']
+            entry[4] += row['assists']
+            entry[5] = seq
+
+        if row['duration_min'] > 0:
+            entry = tables['played_months'].setdefault(row['month'], [0, 0, 0, seq])  # [cs, minutes, games, seq]
+            entry[0] += row['cs']
+            entry[1] += row['duration_min']
+            entry[2] += 1
+            entry[3] = seq
+
+        entry = tables['champions'].setdefault(row['champion'], [0, 0, seq])  # [games, wins, seq]
+        entry[0] += 1
+        entry[1] += win
+        entry[2] = seq
+
+        entry = tables['patches'].setdefault(row['patch'], [0, 0, [], seq])  # [games, wins, champions, seq]
+        entry[0] += 1
+        entry[1] += win
+        if row['champion'] not in entry[2]:
+            entry[2].append(row['champion'])
+        entry[3] = seq
+
+        pair = (row['month'], row['role'])
+        entry = tables['month_roles'].setdefault(pair, [0, seq])
+        entry[0] += 1
+        entry[1] = seq
+
+        for name in ('win', 'kills', 'deaths', 'assists', 'cs_per_min'):
+            self.series[name].append(win if name == 'win' else row[name])
+
+        self._add_totals(match, row, win)
+        self._add_records(match, row)
+        self._add_streaks(row, seq)
+        self._add_tilt(row, win)
+        self._add_fatigue(row, win)
+
+    @staticmethod
+    def _count_player(table, key, seq, pos, info, win, name):
+        """[games, wins, info, position in most recent match, last_seq, latest name] per opponent/teammate"""
+        entry = table.get(key)
+        if entry is None:
+            # Info comes from the oldest game, like the analyzer's overwrite-while-walking-back loop
+            table[key] = [1, win, info, pos, seq, name]
+            return
+        entry[0] += 1
+        entry[1] += win
+        entry[5] = name
+        if entry[4] != seq:
+            entry[3] = pos
+            entry[4] = seq
+
+    def _add_totals(self, match, row, win):
+        totals = self.totals
+        totals['games'] += 1
+        totals['wins'] += win
+        totals['pentaKills'] += match.get('pentaKills', 0)
+        totals['quadraKills'] += match.get('quadraKills', 0)
+        totals['timeCCingOthers'] += match.get('timeCCingOthers', 0)
+        totals['duration'] += match.get('gameDuration', 0)
+        totals['afk_games'] += 1 if match.get('teamHadAFK', False) else 0
+        totals['afk_wins'] += 1 if match.get('teamHadAFK', False) and match['win'] else 0
+        totals['surrenders'] += 1 if match.get('gameEndedInSurrender', False) else 0
+        totals['early_surrenders'] += 1 if match.get('gameEndedInEarlySurrender', False) else 0
+        totals['dragonKills'] += match.get('dragonKills', 0)
+        totals['baronKills'] += match.get('baronKills', 0)
+        if match.get('dragonKills', 0) + match.get('baronKills', 0) >= 2:
+            totals['high_obj_games'] += 1
+            totals['high_obj_wins'] += 1 if match.get('win') else 0
+
+    def _add_records(self, match, row):
+        """Best games - newer games win ties, matching max() over a most-recent-first list"""
+        records = self.records
+        for name, value in (('longestTimeSpentLiving', match.get('longestTimeSpentLiving', 0)),
+                            ('largestCriticalStrike', match.get('largestCriticalStrike', 0)),
+                            ('largestKillingSpree', match.get('largestKillingSpree', 0)),
+                            ('kills', row['kills'])):
+            if name not in records or value >= records[name][0]:
+                details = _game_details(row, 'time')
+                if name == 'largestKillingSpree':
+                    details['kills'] = row['kills']
+                elif name == 'kills':
+                    details['kda'] = f"{row['kills']}/{row['deaths']}/{row['assists']}"
+                records[name] = [value, details]
+
+        records['longest_game'] = max(records.get('longest_game', 0), match.get('gameDuration', 0))
+        records['shortest_game'] = min(records.get('shortest_game', 9999), match.get('gameDuration', 9999))
+
+        if row['win'] and row['deaths'] >= 8:
+            if 'miracle_comeback' not in records or row['deaths'] >= records['miracle_comeback']['deaths']:
+                records['miracle_comeback'] = {
+                    'matchId': match['matchId'],
+                    'championName': match['championName'],
+                    'kills': row['kills'],
+                    'deaths': row['deaths'],
+                    'assists': row['assists'],
+                    'gameDuration': match['gameDuration'],
+                    'date': row['date'].strftime('%B %d, %Y'),
+                    'time': row['date'].strftime('%I:%M %p'),
+                    'kda': round(row['kda'], 2)
+                }
+
+        if match.get('quadraKills', 0) > 0 and match.get('pentaKills', 0) == 0:
+            self.totals['quadra_games'] += 1
+            self.recent_quadras = (self.recent_quadras + [match])[-3:]
+
+    def _add_streaks(self, row, seq):
+        streak = self.win_streak
+        if row['win']:
+            if streak['current'] == 0:
+                streak['start'] = seq
+                streak['start_game'] = _game_details(row, 'kda')
+            streak['current'] += 1
+            if streak['current'] > streak['max']:
+                streak['max'] = streak['current']
+                streak['max_start'] = streak['start']
+                streak['max_start_game'] = streak['start_game']
+                streak['max_end_game'] = _game_details(row, 'kda')
+        else:
+            streak['current'] = 0
+
+    def _add_tilt(self, row, win):
+        # Win rate after 2/3 straight losses vs after a recent win (detect_tilt_patterns)
+        tilt = self.tilt
+        recent = tilt['recent']
+        if len(recent) >= 2:
+            if not any(recent[-2:]):
+                self.totals['after_2_losses'] += 1
+                self.totals['after_2_losses_wins'] += win
+            else:
+                self.totals['normal_games'] += 1
+                self.totals['normal_wins'] += win
+        if len(recent) >= 3 and not any(recent[-3:]):
+            self.totals['after_3_losses'] += 1
+            self.totals['after_3_losses_wins'] += win
+        tilt['recent'] = (recent + [win])[-3:]
+        if tilt['loss_streak']:
+            after_streaks = tilt['after_streaks']
+            while len(after_streaks) < tilt['loss_streak']:
+                after_streaks.append([0, 0])
+            after_streaks[tilt['loss_streak'] - 1][0] += 1
+            after_streaks[tilt['loss_streak'] - 1][1] += win
+
+        if not win:
+            tilt['loss_streak'] += 1
+        else:
+            if tilt['loss_streak'] >= 3:
+                tilt['episodes'] += 1
+                tilt['longest_episode'] = max(tilt['longest_episode'], tilt['loss_streak'])
+            tilt['loss_streak'] = 0
+
+        # KDA/win rate after a win vs after a loss (analyze_tilt_factor)
+        state = self.tilt_factor
+        if state['prev'] is not None:
+            stats = state['after_loss'] if state['prev'] == False else state['after_win']
+            stats[0] += 1
+            stats[1] += win
+            stats[2] += row['kda']
+        if not win:
+            state['current'] += 1
+            state['max_loss_streak'] = max(state['max_loss_streak'], state['current'])
+        else:
+            if state['current'] > 0:
+                state['loss_streaks'] += 1
+                state['loss_streak_total'] += state['current']
+            state['current'] = 0
+        state['prev'] = row['win']
+
+    def _add_fatigue(self, row, win):
+        """Wins and games by consecutive-game number on the same champion"""
+        state = self.fatigue_state
+        if row['champion'] != state['champion']:
+            state['champion'] = row['champion']
+            state['games'] = 1
+        else:
+            state['games'] += 1
+        sessions = self.tables['fatigue'].setdefault(row['champion'], [{}, len(self.match_ids)])
+        results = sessions[0].setdefault(state['games'], [0, 0])
+        results[0] += win
+        results[1] += 1
+
+    # ---- Persistence ----
+
+    def to_dict(self):
+        """JSON-serializable state (tables become [label, entry] lists since labels aren't all strings)"""
+        tables = {}
+        for name, table in self.tables.items():
+            if name == 'fatigue':
+                tables[name] = [[label, [list(sessions.items()), seq]] for label, (sessions, seq) in table.items()]
+            elif name == 'month_roles':
+                tables[name] = [[list(label), entry] for label, entry in table.items()]
+            else:
+                tables[name] = [[label, entry] for label, entry in table.items()]
+        return {
+            'version': ACCUMULATOR_VERSION,
+            'match_ids': self.match_ids,
+            'digests': self.digests,
+            'last_creation': self.last_creation,
+            'tables': tables,
+            'series': self.series,
+            'totals': dict(self.totals),
+            'records': self.records,
+            'recent_quadras': self.recent_quadras,
+            'win_streak': self.win_streak,
+            'tilt': self.tilt,
+            'tilt_factor': self.tilt_factor,
+            'fatigue_state': self.fatigue_state,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore accumulators saved with to_dict (None if saved by another version)"""
+        if not state or state.get('version') != ACCUMULATOR_VERSION:
+            return None
+        acc = cls()
+        acc.match_ids = state['match_ids']
+        acc.digests = state['digests']
+        acc.last_creation = state['last_creation']
+        for name, items in state['tables'].items():
+            if name == 'fatigue':
+                acc.tables[name] = {label: [{int(k): v for k, v in sessions}, seq] for label, (sessions, seq) in items}
+            elif name == 'month_roles':
+                acc.tables[name] = {tuple(label): entry for label, entry in items}
+            else:
+                acc.tables[name] = {label: entry for label, entry in items}
+        acc.series = state['series']
+        acc.totals = Counter(state['totals'])
+        acc.records = state['records']
+        acc.recent_quadras = state['recent_quadras']
+        acc.win_streak = state['win_streak']
+        acc.tilt = state['tilt']
+        acc.tilt_factor = state['tilt_factor']
+        acc.fatigue_state = state['fatigue_state']
+        return acc
+
+    # ---- Sections ----
+
+    def section(self, name, **options):
+        """Result of an analysis section, same shape as the YearInReviewAnalyzer method (options as its section declares)"""
+        return getattr(self, f"_section_{name}")(**options)
+
+    def _section_nemesis(self):
+        if not self.tables['opponents']:
+            return None
+        ordered = sorted(self.tables['opponents'].items(), key=lambda item: (-item[1][4], item[1][3]))
+        _, entry = max(ordered, key=lambda item: item[1][0])
+        return {'name': entry[5], 'losses': entry[0], 'info': entry[2]}
+
+    def _section_bff(self):
+        if not self.tables['teammates']:
+            return None
+        ordered = sorted(self.tables['teammates'].items(), key=lambda item: (-item[1][4], item[1][3]))
+        frequent = [item for item in ordered if item[1][0] >= 5]
+        if frequent:
+            _, entry = max(frequent, key=lambda x: x[1][1] / x[1][0] if x[1][0] > 0 else 0)
+        else:
+            _, entry = max(ordered, key=lambda x: x[1][0])
+        return {
+            'name': entry[5],
+            'games': entry[0],
+            'wins': entry[1],
+            'winrate': round(entry[1] / entry[0] * 100, 1),
+            'info': entry[2]
+        }
+
+    def _section_hot_streak_month(self):
+        if not self.tables['months']:
+            return None
+        month, (games, wins, kills, deaths, assists, _) = max(
+            _recent_first(self.tables['months']),
+            key=lambda x: (x[1][1] / x[1][0] if x[1][0] > 0 else 0, (x[1][2] + x[1][4]) / max(x[1][3], 1))
+        )
+        return {
+            'month': month,
+            'games': games,
+            'wins': wins,
+            'winrate': round(wins / games * 100, 1),
+            'kda': round((kills + assists) / max(deaths, 1), 2)
+        }
+
+    def _section_slump_month(self):
+        if not self.tables['months']:
+            return None
+        month, entry = min(
+            _recent_first(self.tables['months']),
+            key=lambda x: x[1][1] / x[1][0] if x[1][0] > 0 else 0
+        )
+        return {
+            'month': month,
+            'games': entry[0],
+            'wins': entry[1],
+            'winrate': round(entry[1] / entry[0] * 100, 1)
+        }
+
+    def _section_glow_up(self):
+        count = len(self)
+        if count < 10:
+            return None
+
+        split_point = count // 4
+        series = self.series
+
+        def calc_stats(start, end):
+            games = end - start
+            wins = sum(series['win'][start:end])
+            total_kills = sum(series['kills'][start:end])
+            total_deaths = sum(series['deaths'][start:end])
+            total_assists = sum(series['assists'][start:end])
+            return {
+                'winrate': wins / games * 100 if games > 0 else 0,
+                'kda': (total_kills + total_assists) / max(total_deaths, 1),
+                'avg_kills': total_kills / games if games > 0 else 0,
+                'avg_deaths': total_deaths / games if games > 0 else 0
+            }
+
+        # Oldest quarter vs most recent quarter
+        early_stats = calc_stats(0, split_point)
+        late_stats = calc_stats(count - split_point, count)
+        return {
+            'early': early_stats,
+            'late': late_stats,
+            'improvement': {
+                'winrate': round(late_stats['winrate'] - early_stats['winrate'], 1),
+                'kda': round(late_stats['kda'] - early_stats['kda'], 2),
+                'deaths_reduction': round(early_stats['avg_deaths'] - late_stats['avg_deaths'], 2)
+            }
+        }
+
+    def _section_miracle_comeback(self):
+        return self.records.get('miracle_comeback')
+
+    def _section_pentakill_breaker(self):
+        return {
+            'count': self.totals['quadra_games'],
+            'games': self.recent_quadras[::-1]
+        }
+
+    def _section_afk_stats(self):
+        games = self.totals['games']
+        return {
+            'games_with_afk': self.totals['afk_games'],
+            'won_with_afk': self.totals['afk_wins'],
+            'afk_rate': round(self.totals['afk_games'] / games * 100, 1) if games else 0
+        }
+
+    def _section_highlight_stats(self):
+        records = self.records
+        played = self.totals['games'] > 0
+        result = {
+            'total_pentakills': self.totals['pentaKills'],
+            'total_quadrakills': self.totals['quadraKills'],
+            'longest_living': records['longestTimeSpentLiving'][0] if played else 0,
+            'largest_crit': records['largestCriticalStrike'][0] if played else 0,
+            'largest_spree': records['largestKillingSpree'][0] if played else 0,
+            'most_kills_game': records['kills'][0] if played else 0,
+            'total_cc_time': self.totals['timeCCingOthers']
+        }
+        if played:
+            result['longest_living_details'] = records['longestTimeSpentLiving'][1]
+            result['largest_crit_details'] = records['largestCriticalStrike'][1]
+            result['largest_spree_details'] = records['largestKillingSpree'][1]
+            result['most_kills_details'] = records['kills'][1]
+        return result
+
+    def _section_role_evolution(self):
+        result = {}
+        for (month, role), (count, _) in _recent_first(self.tables['month_roles']):
+            result.setdefault(month, {})[role] = count
+        return result
+
+    def _section_longest_win_streak(self):
+        streak = self.win_streak
+        if streak['max']:
+            return {
+                'streak': streak['max'],
+                'start_index': streak['max_start'],
+                'start_game': streak['max_start_game'],
+                'end_game': streak['max_end_game']
+            }
+        return {
+            'streak': streak['max'],
+            'start_index': streak['max_start']
+        }
+
+    def _section_surrender_analysis(self):
+        games = self.totals['games']
+        time_saved = self.totals['early_surrenders'] * (25 * 60 - 20 * 60)
+        return {
+            'total_surrenders': self.totals['surrenders'],
+            'early_surrenders': self.totals['early_surrenders'],
+            'surrender_rate': round(self.totals['surrenders'] / games * 100, 1) if games else 0,
+            'time_saved_seconds': time_saved,
+            'time_saved_hours': round(time_saved / 3600, 1)
+        }
+
+    def _champion_counts(self):
+        return Counter({name: entry[0] for name, entry in _recent_first(self.tables['champions'])})
+
+    def _section_what_if_scenarios(self):
+        games = self.totals['games']
+        champion_games = self._champion_counts()
+        main_champion = champion_games.most_common(1)[0] if champion_games else ('Unknown', 0)
+        main_entry = self.tables['champions'].get(main_champion[0])
+        main_champ_winrate = (main_entry[1] / main_entry[0] * 100) if main_entry else 0
+        overall_winrate = (self.totals['wins'] / games * 100) if games else 0
+
+        roles = _recent_first(self.tables['roles'])
+        best_role = max(roles, key=lambda x: x[1][1] / max(x[1][0], 1)) if roles else ('NONE', [0, 0])
+        worst_role = min(roles, key=lambda x: x[1][1] / max(x[1][0], 1)) if roles else ('NONE', [0, 0])
+        return {
+            'main_champion_only': {
+                'champion': main_champion[0],
+                'games_played': main_champion[1],
+                'winrate': round(main_champ_winrate, 1),
+                'difference': round(main_champ_winrate - overall_winrate, 1)
+            },
+            'best_role_only': {
+                'role': best_role[0],
+                'winrate': round(best_role[1][1] / max(best_role[1][0], 1) * 100, 1),
+                'games': best_role[1][0]
+            },
+            'worst_role_swap': {
+                'role': worst_role[0],
+                'winrate': round(worst_role[1][1] / max(worst_role[1][0], 1) * 100, 1),
+                'games': worst_role[1][0]
+            }
+        }
+
+    def _section_time_analysis(self):
+        periods = _recent_first(self.tables['periods'])
+        best_time = max(periods, key=lambda x: x[1][1] / max(x[1][0], 1)) if periods else ('Unknown', None)
+        result = {}
+        for period, (games, wins, kills, deaths, _, _) in periods:
+            if games > 0:
+                result[period] = {
+                    'games': games,
+                    'winrate': round(wins / games * 100, 1),
+                    'avg_kills': round(kills / games, 1),
+                    'avg_deaths': round(deaths / games, 1)
+                }
+        result['best_time'] = best_time[0]
+        return result
+
+    def _section_champion_diversity(self):
+        champion_games = self._champion_counts()
+        unique_champions = len(champion_games)
+        total_games = self.totals['games']
+        top_3 = champion_games.most_common(3)
+        top_3_games = sum(count for _, count in top_3)
+        top_3_percentage = (top_3_games / total_games * 100) if total_games > 0 else 0
+        return {
+            'unique_champions': unique_champions,
+            'total_games': total_games,
+            'diversity_score': round((unique_champions / total_games) * 100, 1) if total_games > 0 else 0,
+            'top_3_champions': [{'name': champ, 'games': count} for champ, count in top_3],
+            'top_3_percentage': round(top_3_percentage, 1),
+            'one_trick': top_3_percentage > 70
+        }
+
+    def _section_total_hours(self):
+        games = self.totals['games']
+        total_seconds = self.totals['duration']
+        avg_seconds = total_seconds / games if games else 0
+        longest_game = self.records.get('longest_game', 0)
+        shortest_game = self.records.get('shortest_game', 9999) if games else 0
+        return {
+            'total_hours': round(total_seconds / 3600, 1),
+            'total_minutes': round(total_seconds / 60, 0),
+            'total_seconds': total_seconds,
+            'average_game_minutes': round(avg_seconds / 60, 1),
+            'longest_game_minutes': round(longest_game / 60, 1),
+            'shortest_game_minutes': round(shortest_game / 60, 1)
+        }
+
+    def _section_cs_efficiency(self):
+        if not self.totals['games']:
+            return None
+
+        monthly_data = []
+        total_cs_all = 0
+        total_minutes_all = 0
+        played = self.tables['played_months']
+        for month in sorted(played):
+            total_cs, total_minutes, games, _ = played[month]
+            cs_per_min = total_cs / total_minutes if total_minutes > 0 else 0
+            monthly_data.append({
+                'month': month,
+                'cs_per_min': round(cs_per_min, 1),
+                'games': games,
+                'total_cs': total_cs
+            })
+            total_cs_all += total_cs
+            total_minutes_all += total_minutes
+
+        overall_cs_per_min = total_cs_all / total_minutes_all if total_minutes_all > 0 else 0
+        total_games = self.totals['games']
+        jungle_games = self.tables['roles'].get('JUNGLE', [0])[0]
+
+        role_counts = {role: entry[0] for role, entry in self.tables['roles'].items()}
+        estimated_rank, benchmarks, percentile, source = cs_rank(overall_cs_per_min, role_counts, get_baselines())
+
+        return {
+            'monthly_data': monthly_data,
+            'overall_cs_per_min': round(overall_cs_per_min, 1),
+            'total_cs': total_cs_all,
+            'estimated_rank': estimated_rank,
+            'benchmarks': benchmarks,
+            'percentile': percentile,
+            'benchmark_source': source,
+            'is_jungler': jungle_games > (total_games * 0.5),
+            'jungle_percentage': round((jungle_games / total_games * 100) if total_games > 0 else 0, 1)
+        }
+
+    def _section_tilt_detection(self, tilt_windows=TILT_WINDOWS):
+        games = self.totals['games']
+        if games < 10:
+            return None
+        totals = self.totals
+        baseline_winrate = totals['wins'] / games
+        wr_after_2_losses = (totals['after_2_losses_wins'] / totals['after_2_losses'] * 100) if totals['after_2_losses'] else 0
+        wr_after_3_losses = (totals['after_3_losses_wins'] / totals['after_3_losses'] * 100) if totals['after_3_losses'] else 0
+        wr_normal = (totals['normal_wins'] / totals['normal_games'] * 100) if totals['normal_games'] else baseline_winrate * 100
+
+        tilt_drop_2_losses = wr_normal - wr_after_2_losses
+        tilt_drop_3_losses = wr_normal - wr_after_3_losses
+        tilt_episodes = self.tilt['episodes']
+        longest_loss_streak = self.tilt['longest_episode']
+        winrate_after_losses = []
+        after_streaks = self.tilt['after_streaks']
+        for losses in tilt_windows:
+            after_games = sum(games for games, _ in after_streaks[losses - 1:])
+            after_wins = sum(wins for _, wins in after_streaks[losses - 1:])
+            winrate_after_losses.append({
+                'losses': losses,
+                'games': after_games,
+                'winrate': round(after_wins / after_games * 100, 1) if after_games else 0
+            })
+
+        is_heavily_tilting = False
+        is_tilting = False
+        tilt_status = "tilt_proof"
+        if baseline_winrate < 0.35:
+            is_heavily_tilting = True
+            tilt_status = "heavily_tilting"
+        elif tilt_drop_2_losses >= 15 or tilt_drop_3_losses >= 20:
+            is_tilting = True
+            tilt_status = "tilting"
+        elif longest_loss_streak >= 5:
+            is_tilting = True
+            tilt_status = "tilting"
+        elif tilt_episodes >= 3:
+            is_tilting = True
+            tilt_status = "tilt_prone"
+        elif baseline_winrate < 0.45:
+            is_tilting = True
+            tilt_status = "struggling"
+
+        return {
+            'is_tilting': is_tilting,
+            'is_heavily_tilting': is_heavily_tilting,
+            'tilt_status': tilt_status,
+            'baseline_winrate': round(baseline_winrate * 100, 1),
+            'wr_after_2_losses': round(wr_after_2_losses, 1),
+            'wr_after_3_losses': round(wr_after_3_losses, 1),
+            'wr_normal': round(wr_normal, 1),
+            'tilt_drop_2_losses': round(tilt_drop_2_losses, 1),
+            'tilt_drop_3_losses': round(tilt_drop_3_losses, 1),
+            'games_analyzed_after_2_losses': totals['after_2_losses'],
+            'games_analyzed_after_3_losses': totals['after_3_losses'],
+            'tilt_episodes': tilt_episodes,
+            'longest_loss_streak': longest_loss_streak,
+            'winrate_after_losses': winrate_after_losses
+        }
+
+    def _section_champion_fatigue(self):
+        if self.totals['games'] < 20:
+            return None
+
+        fatigue_detected = []
+        for champ, (sessions, _) in self.tables['fatigue'].items():
+            if len(sessions) < 5:
+                continue
+            early_wins = early_games = late_wins = late_games = 0
+            for game_num, (wins, games) in sessions.items():
+                if game_num <= 3:
+                    early_wins += wins
+                    early_games += games
+                elif game_num >= 5:
+                    late_wins += wins
+                    late_games += games
+
+            if early_games >= 3 and late_games >= 3:
+                early_wr = early_wins / early_games * 100
+                late_wr = late_wins / late_games * 100
+                drop = early_wr - late_wr
+                if drop >= 15:
+                    fatigue_detected.append({
+                        'champion': champ,
+                        'early_wr': round(early_wr, 1),
+                        'late_wr': round(late_wr, 1),
+                        'drop': round(drop, 1),
+                        'early_games': early_games,
+                        'late_games': late_games
+                    })
+
+        fatigue_detected.sort(key=lambda x: x['drop'], reverse=True)
+        return {
+            'has_fatigue': len(fatigue_detected) > 0,
+            'fatigued_champions': fatigue_detected[:3],
+            'champions_analyzed': len(self.tables['fatigue'])
+        }
+
+    def _section_learning_curves(self):
+        count = len(self)
+        if count < 30:
+            return None
+
+        chunk_size = count // 3
+        series = self.series
+        periods = [(0, chunk_size), (chunk_size, chunk_size * 2), (chunk_size * 2, count)]
+
+        def calc_avg_cs_per_min(start, end):
+            cs_rates = [cs for cs in series['cs_per_min'][start:end] if cs is not None]
+            return sum(cs_rates) / len(cs_rates) if cs_rates else 0
+
+        def calc_avg_kda(start, end):
+            kdas = [(k + a) / max(d, 1) for k, d, a in zip(series['kills'][start:end], series['deaths'][start:end], series['assists'][start:end])]
+            return sum(kdas) / len(kdas) if kdas else 0
+
+        def calc_winrate(start, end):
+            return (sum(series['win'][start:end]) / (end - start) * 100) if end > start else 0
+
+        early_cs, mid_cs, late_cs = (calc_avg_cs_per_min(*p) for p in periods)
+        early_kda, mid_kda, late_kda = (calc_avg_kda(*p) for p in periods)
+        early_wr, mid_wr, late_wr = (calc_winrate(*p) for p in periods)
+
+        cs_improvement = late_cs - early_cs
+        kda_improvement = late_kda - early_kda
+        wr_improvement = late_wr - early_wr
+        return {
+            'is_improving': cs_improvement > 0.5 or kda_improvement > 0.3 or wr_improvement > 5,
+            'cs_per_min': {
+                'early': round(early_cs, 2),
+                'mid': round(mid_cs, 2),
+                'late': round(late_cs, 2),
+                'improvement': round(cs_improvement, 2)
+            },
+            'kda': {
+                'early': round(early_kda, 2),
+                'mid': round(mid_kda, 2),
+                'late': round(late_kda, 2),
+                'improvement': round(kda_improvement, 2)
+            },
+            'winrate': {
+                'early': round(early_wr, 1),
+                'mid': round(mid_wr, 1),
+                'late': round(late_wr, 1),
+                'improvement': round(wr_improvement, 1)
+            }
+        }
+
+    def _section_meta_adaptation(self):
+        if self.totals['games'] < 20:
+            return None
+
+        patches = sorted(_recent_first(self.tables['patches']), key=lambda x: x[1][0], reverse=True)
+        patch_data = []
+        for patch, (games, wins, champions, _) in patches[:5]:
+            wr = (wins / games * 100) if games > 0 else 0
+            patch_data.append({
+                'patch': patch,
+                'games': games,
+                'winrate': round(wr, 1),
+                'unique_champions': len(champions),
+                'diversity_score': round(len(champions) / games, 2) if games > 0 else 0
+            })
+
+        avg_diversity = sum(p['diversity_score'] for p in patch_data) / len(patch_data) if patch_data else 0
+        return {
+            'is_adapting': avg_diversity > 0.3,
+            'patches_played': len(patches),
+            'patch_data': patch_data,
+            'avg_diversity_score': round(avg_diversity, 2)
+        }
+
+    def _section_objective_priority(self):
+        total_games = self.totals['games']
+        if not total_games:
+            return None
+        high_obj_games = self.totals['high_obj_games']
+        high_obj_winrate = (self.totals['high_obj_wins'] / high_obj_games * 100) if high_obj_games else 0
+        overall_winrate = self.totals['wins'] / total_games * 100
+        objective_impact = high_obj_winrate - overall_winrate
+        return {
+            'avg_dragons_per_game': round(self.totals['dragonKills'] / total_games, 1),
+            'avg_barons_per_game': round(self.totals['baronKills'] / total_games, 1),
+            'high_obj_winrate': round(high_obj_winrate, 1),
+            'overall_winrate': round(overall_winrate, 1),
+            'objective_impact': round(objective_impact, 1),
+            'is_objective_focused': objective_impact > 5
+        }
+
+    def _section_duo_synergy(self):
+        if not self.totals['games']:
+            return None
+        ordered = sorted(self.tables['duos'].items(), key=lambda item: (-item[1][4], item[1][3]))
+        duo_partners = []
+        for _, (games, wins, _, _, _, name) in ordered:
+            if games >= 3:
+                duo_partners.append({
+                    'name': name,
+                    'games': games,
+                    'winrate': round(wins / games * 100, 1)
+                })
+        duo_partners.sort(key=lambda x: (x['winrate'], x['games']), reverse=True)
+        return {
+            'best_duo_partners': duo_partners[:5],
+            'has_consistent_duo': len([p for p in duo_partners if p['games'] >= 5]) > 0
+        }
+
+    def _section_tilt_factor(self):
+        if self.totals['games'] < 10:
+            return None
+        state = self.tilt_factor
+        after_loss_games, after_loss_wins, after_loss_total_kda = state['after_loss']
+        after_win_games, _, after_win_total_kda = state['after_win']
+
+        after_loss_kda = after_loss_total_kda / after_loss_games if after_loss_games > 0 else 0
+        after_win_kda = after_win_total_kda / after_win_games if after_win_games > 0 else 0
+        after_loss_winrate = (after_loss_wins / after_loss_games * 100) if after_loss_games > 0 else 0
+
+        kda_drop = after_win_kda - after_loss_kda
+        max_loss_streak = state['max_loss_streak']
+        tilt_score = max(0, 100 - (kda_drop * 20) - (max_loss_streak * 5))
+        return {
+            'after_loss_kda': round(after_loss_kda, 2),
+            'after_win_kda': round(after_win_kda, 2),
+            'kda_drop_after_loss': round(kda_drop, 2),
+            'after_loss_winrate': round(after_loss_winrate, 1),
+            'max_loss_streak': max_loss_streak,
+            'avg_loss_streak': round(state['loss_streak_total'] / state['loss_streaks'], 1) if state['loss_streaks'] else 0,
+            'tilt_score': round(tilt_score, 0),
+            'mental_fortitude': 'Unshakeable' if tilt_score > 80 else 'Strong' if tilt_score > 60 else 'Average' if tilt_score > 40 else 'Needs Work'
+        }
@@ -0,0 +1,382 @@
+"""
+Differential check of alternative analysis backends against the reference analyzer
+Runs the plain-Python YearInReviewAnalyzer and an alternative backend over the
+same history and diffs every section, so a vectorized, incremental or sampled
+rewrite can't quietly change results:
+
+    numpy         YearInReviewAnalyzer with the NumPy code paths forced on
+    accumulators  MatchAccumulators through an AnalysisStore, saved on the older
+                  half of the history and extended with the rest
+    streaming     StreamingAnalyzer folding the games one at a time
+    sampled       ApproximateAnalyzer - estimated values are checked against
+                  their confidence intervals instead of compared exactly
+
+Histories are synthetic (seeded, so reruns are identical) or recorded
+/api/year-in-review request bodies saved as JSON.
+
+    python analysis_diff.py
+    python analysis_diff.py --backend numpy --games 800 --seeds 1 2 3
+    python analysis_diff.py --dataset review_request.json --abs-tol 0.1
+"""
+import argparse
+import json
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+import damage_attribution
+import timeline_frames
+from analysis_engine import SECTION_REGISTRY, YearInReviewAnalyzer
+from analysis_sampling import CONFIDENCE, ApproximateAnalyzer
+from analysis_store import AnalysisStore
+from analysis_streaming import STREAMING_SECTIONS, StreamingAnalyzer
+from match_record import expand_players
+import numpy_backend
+
+BACKENDS = ('numpy', 'accumulators', 'streaming', 'sampled')
+
+# Network sections (OP.GG builds) depend on live data, not on the backend
+COMPARED_SECTIONS = tuple(name for name, section in SECTION_REGISTRY.items() if 'network' not in section['inputs'])
+
+# The sampled backend fails when fewer exact values than this fall inside its intervals
+MIN_COVERAGE = 0.8
+
+# Differences printed per section
+MAX_REPORTED = 10
+
+SYNTHETIC_CHAMPIONS = ('Ahri', 'Yasuo', 'Lux', 'Jinx', 'Thresh', 'LeeSin', 'Garen', 'Darius', 'Ezreal', 'Leona')
+SYNTHETIC_POSITIONS = ('TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY')
+SYNTHETIC_START = 1735776000000  # 2025-01-02
+
+
+def synthetic_history(games, seed):
+    """
+    A made-up but internally consistent history: processed match rows plus timelines
+
+    Returns:
+        {'name', 'puuid', 'matches', 'timelines'} - matches and timelines most recent first
+    """
+    rng = random.Random(seed)
+
+    def random_puuid():
+        return ''.join(rng.choice(string.ascii_letters + string.digits + '-_') for _ in range(78))
+
+    puuid = random_puuid()
+    pool = [{'puuid': random_puuid(), 'riotIdGameName': f'Player{i}', 'riotIdTagline': 'SYN'} for i in range(40)]
+    matches, timelines = [], []
+    created = SYNTHETIC_START
+    for game in range(games):
+        created += rng.randint(1, 40) * 900000
+        duration = rng.randint(900, 2400)
+        others = [{**player, 'championName': rng.choice(SYNTHETIC_CHAMPIONS)} for player in rng.sample(pool, 9)]
+        teammates, opponents = others[:4], others[4:]
+        match_id = f'SYN{seed}_{game}'
+        match = {
+            'matchId': match_id, 'gameMode': 'CLASSIC', 'gameDuration': duration, 'gameCreation': created,
+            'gameVersion': f'15.{1 + game * 20 // max(games, 1)}.1', 'gameEndedInEarlySurrender': rng.random() < 0.05,
+            'gameEndedInSurrender': rng.random() < 0.4, 'championName': rng.choice(SYNTHETIC_CHAMPIONS[:6]),
+            'championId': 1, 'lane': 'MIDDLE', 'role': 'SOLO', 'individualPosition': rng.choice(SYNTHETIC_POSITIONS),
+            'kills': rng.randint(0, 15), 'deaths': rng.randint(0, 12), 'assists': rng.randint(0, 20),
+            'win': rng.random() < 0.5, 'pentaKills': int(rng.random() < 0.02), 'quadraKills': int(rng.random() < 0.05),
+            'tripleKills': rng.randint(0, 2), 'doubleKills': rng.randint(0, 3), 'largestMultiKill': 2,
+            'killingSprees': 1, 'largestKillingSpree': rng.randint(0, 9), 'largestCriticalStrike': rng.randint(0, 1500),
+            'longestTimeSpentLiving': rng.randint(100, 1500), 'goldEarned': rng.randint(5000, 18000),
+            'goldPerMinute': 400.0, 'totalMinionsKilled': rng.randint(20, 300), 'neutralMinionsKilled': rng.randint(0, 150),
+            'totalDamageDealt': rng.randint(50000, 200000), 'totalDamageDealtToChampions': rng.randint(5000, 50000),
+            'damagePerMinute': 800.0, 'totalDamageTaken': rng.randint(10000, 40000), 'timeCCingOthers': rng.randint(0, 60),
+            'totalTimeCCDealt': 100, 'visionScore': rng.randint(5, 80), 'wardsPlaced': rng.randint(2, 30),
+            'wardsKilled': rng.randint(0, 10), 'visionWardsBoughtInGame': rng.randint(0, 6),
+            'spell1Casts': rng.randint(10, 200), 'spell2Casts': rng.randint(10, 200), 'spell3Casts': rng.randint(10, 200),
+            'spell4Casts': rng.randint(0, 20), 'summoner1Id': 4, 'summoner2Id': rng.choice((7, 12, 14)),
+            'summoner1Casts': rng.randint(0, 8), 'summoner2Casts': rng.randint(0, 8), 'bountyLevel': 0,
+            'objectivesStolen': int(rng.random() < 0.03), 'turretKills': rng.randint(0, 4), 'inhibitorKills': 0,
+            'teamId': 100, 'teamHadAFK': rng.random() < 0.05, 'opponents': opponents, 'teammates': teammates,
+            'item0': rng.choice((0, 3153, 6673)), 'item1': 3031, 'item2': 0, 'item3': 3006, 'item4': 1055,
+            'item5': 0, 'item6': 3340
+        }
+        matches.append(match)
+
+        # Participant IDs 1-5 are the player's team
+        participants = [player['puuid'] for player in teammates]
+        participants.insert(rng.randint(0, 4), puuid)
+        participants += [player['puuid'] for player in opponents]
+        frames = []
+        for minute in range(duration // 60 + 1):
+            participant_frames = {
+                str(pid): {'participantId': pid, 'totalGold': 500 + minute * rng.randint(250, 450), 'xp': minute * 300,
+                           'minionsKilled': minute * rng.randint(4, 8), 'jungleMinionsKilled': minute,
+                           'level': 1 + minute // 3,
+                           'position': {'x': rng.randint(0, 14870), 'y': rng.randint(0, 14980)}}
+                for pid in range(1, 11)
+            }
+            events = []
+            for _ in range(rng.randint(0, 3)):
+                damage = [{'participantId': rng.randint(0, 10), 'magicDamage': rng.randint(0, 800),
+                           'physicalDamage': rng.randint(0, 800), 'trueDamage': rng.randint(0, 100), 'basic': False,
+                           'name': 'x', 'spellName': 'y', 'spellSlot': 0, 'type': 'OTHER'}
+                          for _ in range(rng.randint(0, 5))]
+                events.append({'type': 'CHAMPION_KILL', 'timestamp': minute * 60000 + rng.randint(0, 59999),
+                               'killerId': rng.randint(0, 10), 'victimId': rng.randint(1, 10),
+                               'assistingParticipantIds': rng.sample(range(1, 11), rng.randint(0, 3)),
+                               'position': {'x': rng.randint(0, 14870), 'y': rng.randint(0, 14980)},
+                               'victimDamageReceived': damage})
+            if rng.random() < 0.2:
+                events.append({'type': 'ELITE_MONSTER_KILL', 'timestamp': minute * 60000 + 5,
+                               'killerId': rng.randint(1, 10), 'monsterType': 'DRAGON',
+                               'position': {'x': 9866, 'y': 4414}})
+            events.append({'type': 'WARD_PLACED', 'timestamp': minute * 60000 + 7, 'creatorId': rng.randint(1, 10),
+                           'wardType': 'YELLOW_TRINKET'})
+            frames.append({'timestamp': minute * 60000, 'participantFrames': participant_frames, 'events': events})
+        timelines.append({'match_id': match_id, 'timeline': {
+            'metadata': {'matchId': match_id, 'participants': participants},
+            'info': {'frameInterval': 60000, 'frames': frames}
+        }})
+
+    matches.reverse()
+    timelines.reverse()
+    return {'name': f'synthetic-{games}-seed{seed}', 'puuid': puuid, 'matches': matches, 'timelines': timelines}
+
+
+def load_dataset(path):
+    """A recorded /api/year-in-review request body (matches, timelines, puuid, optional player table)"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {
+        'name': path,
+        'puuid': data.get('puuid'),
+        'matches': expand_players(data.get('matches', []), data.get('players')),
+        'timelines': data.get('timelines', [])
+    }
+
+
+class RecordedHistory:
+    """An in-memory dataset with the CachedMatchHistory interface StreamingAnalyzer reads"""
+
+    def __init__(self, dataset):
+        self.puuid = dataset['puuid']
+        self.matches = dataset['matches']
+        self.timelines = {t.get('match_id'): t.get('timeline') for t in dataset['timelines']}
+        self.match_ids = [match.get('matchId') for match in self.matches]
+        self.timeline_ids = [match_id for match_id in self.match_ids if match_id in self.timelines]
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def games(self, timelines=True):
+        for match in reversed(self.matches):
+            yield match, self.timelines.get(match.get('matchId')) if timelines else None
+
+
+def _clear_frame_caches():
+    # Per-process timeline caches would otherwise carry work over from the previous run
+    timeline_frames._cache.clear()
+    damage_attribution._cache.clear()
+
+
+def _normalized(result):
+    """The result as the client receives it (tuples become lists, records dicts)"""
+    return json.loads(json.dumps(result, default=lambda value: value.to_dict() if hasattr(value, 'to_dict') else str(value)))
+
+
+def run_backend(backend, dataset, sections):
+    """
+    Analyze a dataset with one backend ('reference' or one of BACKENDS)
+
+    Returns:
+        ({section: normalized result}, seconds)
+    """
+    _clear_frame_caches()
+    matches, timelines, puuid = dataset['matches'], dataset['timelines'], dataset['puuid']
+    store_root = tempfile.mkdtemp(prefix='analysis-diff-') if backend == 'accumulators' else None
+    started = time.time()
+    try:
+        if backend == 'reference':
+            analyzer = YearInReviewAnalyzer(matches, 'Diff#SYN', 'na1', timelines=timelines, puuid=puuid,
+                                            backend='python')
+        elif backend == 'numpy':
+            analyzer = YearInReviewAnalyzer(matches, 'Diff#SYN', 'na1', timelines=timelines, puuid=puuid,
+                                            backend='numpy')
+        elif backend == 'accumulators':
+            store = AnalysisStore(store_root)
+            older = matches[len(matches) // 2:]
+            YearInReviewAnalyzer(older, 'Diff#SYN', 'na1', puuid=puuid, store=store).get_accumulators()
+            analyzer = YearInReviewAnalyzer(matches, 'Diff#SYN', 'na1', timelines=timelines, puuid=puuid, store=store,
+                                            backend='python')
+        elif backend == 'streaming':
+            analyzer = StreamingAnalyzer(RecordedHistory(dataset), 'Diff#SYN', 'na1')
+        elif backend == 'sampled':
+            analyzer = ApproximateAnalyzer(matches, 'Diff#SYN', 'na1', timelines=timelines, puuid=puuid,
+                                           backend='python', min_timelines=0)
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
+        results = analyzer.analyze_all(sections=list(sections))
+    finally:
+        if store_root:
+            shutil.rmtree(store_root, ignore_errors=True)
+    return _normalized(results), time.time() - started
+
+
+def diff_values(reference, candidate, abs_tol=1e-6, rel_tol=1e-9, path=''):
+    """
+    Differences between two normalized results
+
+    Numbers are equal within abs_tol + rel_tol * |reference|; booleans, strings,
+    list lengths and dict keys must match exactly.
+
+    Returns:
+        [(path, reference value, candidate value)]
+    """
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        differences = []
+        for key in list(reference) + [key for key in candidate if key not in reference]:
+            child = f'{path}.{key}' if path else str(key)
+            if key not in candidate:
+                differences.append((child, reference[key], '<missing>'))
+            elif key not in reference:
+                differences.append((child, '<missing>', candidate[key]))
+            else:
+                differences += diff_values(reference[key], candidate[key], abs_tol, rel_tol, child)
+        return differences
+
+    if isinstance(reference, list) and isinstance(candidate, list):
+        if len(reference) != len(candidate):
+            return [(f'{path}.length', len(reference), len(candidate))]
+        differences = []
+        for i, (ref_item, cand_item) in enumerate(zip(reference, candidate)):
+            differences += diff_values(ref_item, cand_item, abs_tol, rel_tol, f'{path}[{i}]')
+        return differences
+
+    numbers = (int, float)
+    if (isinstance(reference, numbers) and isinstance(candidate, numbers)
+            and not isinstance(reference, bool) and not isinstance(candidate, bool)):
+        if abs(reference - candidate) <= abs_tol + rel_tol * abs(reference):
+            return []
+        return [(path, reference, candidate)]
+
+    return [] if reference == candidate and type(reference) is type(candidate) else [(path, reference, candidate)]
+
+
+def _interval_checks(exact, intervals, path=''):
+    """[(path, exact value, [low, high])] for every confidence interval of an estimated section"""
+    checks = []
+    for key, interval in intervals.items():
+        child = f'{path}.{key}' if path else key
+        if isinstance(interval, dict):
+            checks += _interval_checks(exact.get(key) or {}, interval, child)
+        elif interval is not None:
+            checks.append((child, exact.get(key), interval))
+    return checks
+
+
+def diff_sampled(reference, candidate, abs_tol=1e-6):
+    """
+    Compare an ApproximateAnalyzer result with the exact one
+
+    Exact sections are diffed as usual. For estimated sections, only whether each
+    exact value lies inside its confidence interval is checked.
+
+    Returns:
+        (differences, intervals checked, exact values outside their interval)
+    """
+    differences, checked, outside = [], 0, []
+    for name, result in candidate.items():
+        if isinstance(result, dict) and result.get('approximate'):
+            # Power spikes keep their intervals per phase, like its phase_stats
+            exact_values = reference[name].get('phase_stats', reference[name])
+            for path, exact, (low, high) in _interval_checks(exact_values, result['confidence_intervals']):
+                checked += 1
+                if exact is None or not low - abs_tol <= exact <= high + abs_tol:
+                    outside.append((f'{name}.{path}', exact, [low, high]))
+        else:
+            differences += diff_values(reference[name], result, abs_tol, path=name)
+    return differences, checked, outside
+
+
+def _print_differences(differences):
+    by_section = {}
+    for path, expected, actual in differences:
+        by_section.setdefault(path.split('.')[0].split('[')[0], []).append((path, expected, actual))
+    for section, entries in by_section.items():
+        print(f"[DIFF]   {section}: {len(entries)} difference(s)")
+        for path, expected, actual in entries[:MAX_REPORTED]:
+            print(f"[DIFF]     {path}: reference={json.dumps(expected)[:80]} candidate={json.dumps(actual)[:80]}")
+        if len(entries) > MAX_REPORTED:
+            print(f"[DIFF]     ... {len(entries) - MAX_REPORTED} more")
+
+
+def compare(dataset, backends=BACKENDS, abs_tol=1e-6, rel_tol=1e-9, min_coverage=MIN_COVERAGE):
+    """
+    Diff every backend against the reference analyzer on one dataset
+
+    Returns:
+        {backend: True if it matched, False if it didn't, None if it was skipped}
+    """
+    print(f"[DIFF] {dataset['name']}: {len(dataset['matches'])} matches, {len(dataset['timelines'])} timelines")
+    reference, reference_seconds = run_backend('reference', dataset, COMPARED_SECTIONS)
+    print(f"[DIFF] reference: {len(reference)} sections in {reference_seconds:.2f}s")
+
+    outcomes = {}
+    for backend in backends:
+        if backend == 'numpy' and not numpy_backend.is_available():
+            print("[DIFF] numpy: skipped, NumPy isn't installed")
+            outcomes[backend] = None
+            continue
+        sections = STREAMING_SECTIONS if backend == 'streaming' else COMPARED_SECTIONS
+        sections = [name for name in sections if name in COMPARED_SECTIONS]
+        candidate, seconds = run_backend(backend, dataset, sections)
+        expected = {name: reference[name] for name in sections}
+
+        if backend == 'sampled':
+            differences, checked, outside = diff_sampled(expected, candidate, abs_tol)
+            coverage = 1 - len(outside) / checked if checked else 1
+            passed = not differences and coverage >= min_coverage
+            print(f"[DIFF] sampled: {len(sections)} sections in {seconds:.2f}s, {len(differences)} difference(s), "
+                  f"{checked - len(outside)}/{checked} exact values inside their {CONFIDENCE:.0%} intervals "
+                  f"{'✅' if passed else '❌'}")
+            for path, exact, interval in outside:
+                print(f"[DIFF]     {path}: exact={exact} interval={interval}")
+        else:
+            differences = diff_values(expected, candidate, abs_tol, rel_tol)
+            passed = not differences
+            print(f"[DIFF] {backend}: {len(sections)} sections in {seconds:.2f}s, "
+                  f"{len(differences)} difference(s) {'✅' if passed else '❌'}")
+        _print_differences(differences)
+        outcomes[backend] = passed
+    return outcomes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff analysis backends against the reference YearInReviewAnalyzer')
+    parser.add_argument('--backend', action='append', choices=BACKENDS,
+                        help='Backend to check (repeatable, default: all)')
+    parser.add_argument('--dataset', action='append', default=[],
+                        help='Recorded /api/year-in-review request body (JSON, repeatable)')
+    parser.add_argument('--games', type=int, default=300, help='Games per synthetic history')
+    parser.add_argument('--seeds', type=int, nargs='*',
+                        help='Seeds of the synthetic histories (default: 1 2, or none with --dataset)')
+    parser.add_argument('--abs-tol', type=float, default=1e-6, help='Absolute tolerance for numbers')
+    parser.add_argument('--rel-tol', type=float, default=1e-9, help='Relative tolerance for numbers')
+    parser.add_argument('--min-coverage', type=float, default=MIN_COVERAGE,
+                        help='Share of exact values the sampled backend must have inside its intervals')
+    args = parser.parse_args(argv)
+
+    seeds = args.seeds if args.seeds is not None else ([] if args.dataset else [1, 2])
+    datasets = [load_dataset(path) for path in args.dataset] + [synthetic_history(args.games, seed) for seed in seeds]
+
+    failed = []
+    for dataset in datasets:
+        outcomes = compare(dataset, args.backend or BACKENDS, args.abs_tol, args.rel_tol, args.min_coverage)
+        failed += [f"{backend} on {dataset['name']}" for backend, passed in outcomes.items() if passed is False]
+
+    if failed:
+        print(f"[DIFF] ❌ Differences found: {', '.join(failed)}")
+        return 1
+    print(f"[DIFF] ✅ All backends match the reference on {len(datasets)} dataset(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
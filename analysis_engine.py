@@ -3,9 +3,25 @@ Analysis Engine for League of Legends Year-in-Review
 Powered by AWS Bedrock (Claude Sonnet 4.5)
 """
 import boto3
+import copy
 import json
-from datetime import datetime
+import os
+import functools
+import threading
 from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+from spatial_index import TimelineSpatialIndex
+from timeline_index import TimelineIndex
+from timeline_frames import get_match_frames
+from damage_attribution import KillDamageTable, KILL_STEAL_SHARE, damage_of
+import damage_attribution
+from match_features import MatchFeatureTable
+from outcome_sequence import OutcomeSequence, TILT_WINDOWS
+import numpy_backend
+from analysis_store import compute_dataset_key, match_digest
+from analysis_accumulators import MatchAccumulators, SECTIONS as ACCUMULATED_SECTIONS
+from population_baselines import PercentileTally, baselines_fingerprint, cs_rank, get_baselines
+from player_index import player_key, riot_id
 
 # AWS Bedrock Configuration
 MODEL_ID = "eu.anthropic.claude-sonnet-4-5-20250929-v1:0"
@@ -13,174 +29,717 @@ MODEL_ID = "eu.anthropic.claude-sonnet-4-5-20250929-v1:0"
 # AWS Bedrock Knowledge Base Configuration
 KNOWLEDGE_BASE_ID = "P8ZJCNHXAV"
 
+# Bump whenever analysis output changes so cached responses (ETags) are invalidated
+ANALYZER_VERSION = 10
 
-class YearInReviewAnalyzer:
-    """Analyzes League of Legends match data and generates AI-powered insights"""
+# Group-by sections backend: 'python', 'numpy', or 'auto' (numpy for long histories when installed)
+ANALYSIS_BACKEND = os.environ.get('ANALYSIS_BACKEND', 'auto')
+NUMPY_MIN_MATCHES = 500
 
-    def __init__(self, matches, summoner_name, region, timelines=None):
-        self.matches = matches
-        self.summoner_name = summoner_name
-        self.region = region
-        self.timelines = timelines or []
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name='eu-central-1')
-        self.bedrock_agent_client = boto3.client('bedrock-agent-runtime', region_name='eu-central-1')
+# Threads for network-bound work (OP.GG lookup, Bedrock narrative) that overlaps the CPU-bound sections
+NETWORK_WORKERS = 2
 
-    def analyze_all(self):
-        """Run all analysis and generate comprehensive year-in-review"""
-        print("[ANALYZER] Starting comprehensive analysis...")
+# OP.GG meta builds drift with patches, so stored build comparisons expire after a day
+BUILD_META_MAX_AGE = 24 * 3600
 
-        print("[ANALYZER] Finding nemesis...")
-        nemesis = self.find_nemesis()
+# Game phases for power spikes: (name, start minute, end minute)
+GAME_PHASES = (('early', 0, 15), ('mid', 15, 25), ('late', 25, None))
 
-        print("[ANALYZER] Finding BFF...")
-        bff = self.find_bff()
+# A game counts as a comeback opportunity when the team trails by this much gold at this minute
+COMEBACK_MINUTE = 15
+COMEBACK_DEFICIT = 1000
 
-        print("[ANALYZER] Finding hot streak month...")
-        hot_streak = self.find_hot_streak_month()
+# Objective fights: the player's kills/deaths within this many map units of each pit, per game phase
+OBJECTIVE_PITS = ('dragon_pit', 'baron_pit')
+OBJECTIVE_RADIUS = 2000
 
-        print("[ANALYZER] Finding slump month...")
-        slump = self.find_slump_month()
 
-        print("[ANALYZER] Calculating glow up...")
-        glow_up = self.calculate_glow_up()
+# Sections the AI narrative prompt reads
+NARRATIVE_SECTIONS = ('hot_streak_month', 'highlight_stats')
 
-        print("[ANALYZER] Finding miracle comebacks...")
-        comeback = self.find_miracle_comeback()
+# Every analysis section, in definition order: {name: section spec}
+SECTION_REGISTRY = {}
 
-        print("[ANALYZER] Finding pentakill breakers...")
-        pentakill = self.find_pentakill_breaker()
 
-        print("[ANALYZER] Calculating AFK stats...")
-        afk = self.calculate_afk_stats()
+def analysis_section(name, version=1, inputs=('matches',), depends=(), max_age=None, options=()):
+    """
+    Register an analyzer method as a named analysis section
 
-        print("[ANALYZER] Getting highlight stats...")
-        highlights = self.get_highlight_stats()
+    Args:
+        name: Key of the section in the analyze_all() result
+        version: Bump when the method's output changes so stored results are recomputed
+        inputs: Data the section reads - 'matches', 'timelines', 'baselines' and/or 'network'
+        depends: Sections that must run first (the method can call them for their memoized results)
+        max_age: Seconds a stored result stays valid (None = forever)
+        options: Analyzer attributes the result also depends on (e.g. 'tilt_windows'), part of its stored key
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self):
+            return self._run_section(wrapper.section, method)
 
-        print("[ANALYZER] Tracking role evolution...")
-        role_evo = self.track_role_evolution()
+        wrapper.section = {
+            'name': name,
+            'version': version,
+            'inputs': tuple(inputs),
+            'depends': tuple(depends),
+            'max_age': max_age,
+            'options': tuple(options),
+            'method': method.__name__
+        }
+        SECTION_REGISTRY[name] = wrapper.section
+        return wrapper
+    return decorator
+
+
+def resolve_sections(names=None):
+    """
+    Order requested sections and everything they depend on so dependencies run first
+
+    Args:
+        names: Requested section names (None = all registered sections)
+
+    Returns:
+        List of section names in dependency order
+
+    Raises:
+        ValueError: Unknown section name or a dependency cycle
+    """
+    requested = list(SECTION_REGISTRY) if names is None else list(names)
+    unknown = [name for name in requested if name not in SECTION_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown analysis sections: {', '.join(unknown)}")
+
+    order = []
+    visiting = []
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Analysis section dependency cycle: {' -> '.join(visiting + [name])}")
+        if name not in SECTION_REGISTRY:
+            raise ValueError(f"Section {visiting[-1]} depends on unknown section {name}")
+        visiting.append(name)
+        for dependency in SECTION_REGISTRY[name]['depends']:
+            visit(dependency)
+        visiting.pop()
+        order.append(name)
+
+    for name in requested:
+        visit(name)
+    return order
+
+
+def request_narrative(bedrock_client, summoner_name, games, wins, analysis_data):
+    """
+    Generate the AI-powered year-in-review narrative using AWS Bedrock
+
+    Args:
+        bedrock_client: boto3 bedrock-runtime client
+        summoner_name: Player's Riot ID
+        games, wins: The player's record for the year
+        analysis_data: Analysis sections (reads NARRATIVE_SECTIONS)
+    """
+    print("[AI NARRATIVE] Preparing prompt...")
+
+    prompt = f"""You are a League of Legends analyst creating a fun year-in-review for {summoner_name}.
 
-        print("[ANALYZER] Finding longest win streak...")
-        streak = self.find_longest_win_streak()
+Based on these stats, write an engaging narrative (6-8 sentences) about their year:
 
-        print("[ANALYZER] Analyzing surrenders...")
-        surrenders = self.analyze_surrenders()
+Total Games: {games}
+Win Rate: {wins / games * 100:.1f}%
+Hot Streak Month: {analysis_data.get('hot_streak_month', {}).get('month', 'Unknown')}
+Pentakills: {analysis_data.get('highlight_stats', {}).get('total_pentakills', 0)}
 
-        print("[ANALYZER] Generating what-if scenarios...")
-        what_if = self.generate_what_if_scenarios()
+Make it fun, personal, and celebratory! Do not use emojis."""
 
-        print("[ANALYZER] Analyzing performance by time...")
-        time_analysis = self.analyze_performance_by_time()
+    try:
+        print("[AI NARRATIVE] Calling AWS Bedrock...")
+        response = bedrock_client.invoke_model(
+            modelId=MODEL_ID,
+            body=json.dumps({
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": 600,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ]
+            })
+        )
 
-        print("[ANALYZER] Calculating champion diversity...")
-        diversity = self.calculate_champion_diversity()
+        print("[AI NARRATIVE] Response received, parsing...")
+        result = json.loads(response['body'].read())
+        narrative = result['content'][0]['text']
+        print(f"[AI NARRATIVE] ✅ Generated: {narrative[:50]}...")
+        return narrative
+
+    except Exception as e:
+        print(f"[AI NARRATIVE] ❌ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return f"Had an incredible year with {games} games played!"
+
+
+def attribute_player_damage(index):
+    """
+    Pure Python version of KillDamageTable.summary() for the player
+
+    Returns:
+        {'kills': [(match_id, timestamp, killer_damage, team_damage, share), ...],
+         'solo_kills': n, 'assist_shares': [share, ...]}
+    """
+    def team_damage_split(event, participant_id):
+        # Determine killer's team (1-5 = blue, 6-10 = red); executions have no team
+        killer_id = event.get('killerId', 0)
+        if not 1 <= killer_id <= 10:
+            return 0, 0
+        killer_team = range(1, 6) if killer_id <= 5 else range(6, 11)
+
+        team_damage_total = 0
+        participant_damage = 0
+        for damage_entry in event.get('victimDamageReceived') or ():
+            entry_participant = damage_entry.get('participantId', 0)
+            # Only count damage from the killer's team
+            if entry_participant not in killer_team:
+                continue
+            total_dmg = damage_of(damage_entry)
+            team_damage_total += total_dmg
+            if entry_participant == participant_id:
+                participant_damage += total_dmg
+        return participant_damage, team_damage_total
+
+    kills = []
+    solo_kills = 0
+    for match_id, event in index.player_events('CHAMPION_KILL', field='killerId'):
+        killer_damage, team_damage_total = team_damage_split(event, event['killerId'])
+        if team_damage_total > 0:
+            kills.append((match_id, event.get('timestamp', 0), killer_damage, team_damage_total,
+                          (killer_damage / team_damage_total) * 100))
+            if not event.get('assistingParticipantIds'):
+                solo_kills += 1
+
+    assist_shares = []
+    for match_id, event in index.player_events('CHAMPION_KILL', field='assistingParticipantIds'):
+        assist_damage, team_damage_total = team_damage_split(event, index.player_id(match_id))
+        if team_damage_total > 0:
+            assist_shares.append((assist_damage / team_damage_total) * 100)
+
+    return {'kills': kills, 'solo_kills': solo_kills, 'assist_shares': assist_shares}
+
+
+def summarize_kill_steals(attribution):
+    """kill_steals section from a kill damage attribution (see KillDamageTable.summary())"""
+    kill_steal_stats = {
+        'total_kills': 0,
+        'kill_steals': 0,
+        'lowest_damage_percentage': 100,
+        'most_shameless_kill': None,
+        'average_damage_contribution': 0,
+        'damage_contributions': []
+    }
+
+    for match_id, timestamp, killer_damage, team_damage_total, damage_percentage in attribution['kills']:
+        kill_steal_stats['total_kills'] += 1
+        kill_steal_stats['damage_contributions'].append(damage_percentage)
+
+        # Check if it's a kill steal (< 15% damage)
+        if damage_percentage < KILL_STEAL_SHARE:
+            kill_steal_stats['kill_steals'] += 1
+
+            # Track most shameless kill
+            if damage_percentage < kill_steal_stats['lowest_damage_percentage']:
+                kill_steal_stats['lowest_damage_percentage'] = damage_percentage
+                kill_steal_stats['most_shameless_kill'] = {
+                    'damage_percentage': round(damage_percentage, 1),
+                    'killer_damage': killer_damage,
+                    'team_damage': team_damage_total,
+                    'match_id': match_id,
+                    'timestamp': timestamp
+                }
 
-        print("[ANALYZER] Calculating total hours played...")
-        total_hours = self.calculate_total_hours()
+    # Calculate average damage contribution
+    if kill_steal_stats['damage_contributions']:
+        kill_steal_stats['average_damage_contribution'] = round(
+            sum(kill_steal_stats['damage_contributions']) / len(kill_steal_stats['damage_contributions']),
+            1
+        )
 
-        print("[ANALYZER] Analyzing CS efficiency...")
-        cs_efficiency = self.analyze_cs_efficiency()
+    # Calculate kill steal and solo kill rates
+    kill_steal_stats['solo_kills'] = attribution['solo_kills']
+    if kill_steal_stats['total_kills'] > 0:
+        kill_steal_stats['kill_steal_rate'] = round(
+            (kill_steal_stats['kill_steals'] / kill_steal_stats['total_kills']) * 100,
+            1
+        )
+        kill_steal_stats['solo_kill_rate'] = round(
+            (attribution['solo_kills'] / kill_steal_stats['total_kills']) * 100,
+            1
+        )
+    else:
+        kill_steal_stats['kill_steal_rate'] = 0
+        kill_steal_stats['solo_kill_rate'] = 0
+
+    # Assist quality: the player's average share of the team's damage on kills they assisted
+    assist_shares = attribution['assist_shares']
+    kill_steal_stats['assists_analyzed'] = len(assist_shares)
+    kill_steal_stats['assist_quality'] = round(sum(assist_shares) / len(assist_shares), 1) if assist_shares else 0
+
+    print(f"[KILL_STEALS] Found {kill_steal_stats['kill_steals']} kill steals out of {kill_steal_stats['total_kills']} total kills")
+
+    return kill_steal_stats
+
+
+class ComebackTally:
+    """Running comeback_potential totals, one game at a time"""
+
+    def __init__(self, oldest_first=False):
+        # Ties for the biggest comeback go to the most recent game, whichever order games arrive in
+        self.oldest_first = oldest_first
+        self.comeback_games = 0
+        self.total_deficit_games = 0
+        self.biggest_comeback = None
+        self.max_comeback_gold = 0
+        self.leads_at_15 = []
+
+    def add(self, match, frames, participant_id):
+        """Fold in a game given its MatchFrames and the player's participantId (skipped if either is missing)"""
+        if frames is None or participant_id is None or frames.last_minute < COMEBACK_MINUTE:
+            return
+
+        # Team gold lead at 15 minutes from the player's side
+        lead = frames.gold_lead(participant_id)[COMEBACK_MINUTE]
+        self.leads_at_15.append(lead)
+
+        if lead <= -COMEBACK_DEFICIT:  # Behind threshold
+            self.total_deficit_games += 1
+            if match.get('win', False):
+                self.comeback_games += 1
+                deficit = -lead
+                if deficit > self.max_comeback_gold or (self.oldest_first and deficit == self.max_comeback_gold):
+                    self.max_comeback_gold = deficit
+                    self.biggest_comeback = match
+
+    def result(self):
+        comeback_rate = (self.comeback_games / self.total_deficit_games * 100) if self.total_deficit_games > 0 else 0
+        leads_at_15 = self.leads_at_15
 
-        print("[ANALYZER] Analyzing kill steals...")
-        kill_steals = self.analyze_kill_steals()
+        return {
+            'comeback_games': self.comeback_games,
+            'total_deficit_games': self.total_deficit_games,
+            'comeback_rate': round(comeback_rate, 1),
+            'biggest_comeback': self.biggest_comeback,
+            'biggest_deficit': self.max_comeback_gold,
+            'avg_gold_lead_at_15': round(sum(leads_at_15) / len(leads_at_15)) if leads_at_15 else 0,
+            'comeback_score': min(100, round(comeback_rate * 1.2, 0))  # Boosted score
+        }
 
-        print("[ANALYZER] Analyzing build choices...")
-        build_comparison = self.analyze_build_mistakes()
 
-        print("[ANALYZER] Detecting tilt patterns...")
-        tilt_detection = self.detect_tilt_patterns()
+class PhaseTally:
+    """Running power_spikes totals per game phase, one game at a time"""
 
-        print("[ANALYZER] Analyzing champion fatigue...")
-        champion_fatigue = self.detect_champion_fatigue()
+    def __init__(self):
+        self.phase_stats = {
+            phase: {'kills': 0, 'deaths': 0, 'games': 0, 'minutes': 0, 'gold': 0, 'xp': 0, 'cs': 0}
+            for phase, _, _ in GAME_PHASES
+        }
 
-        print("[ANALYZER] Analyzing learning curves...")
-        learning_curves = self.analyze_learning_curves()
+    def add(self, frames, participant_id, kill_minutes, death_minutes):
+        """Fold in a game given its MatchFrames, the player's participantId and the minutes they killed/died"""
+        if participant_id is None or frames.last_minute < 1:
+            return
+
+        for phase, start, end in GAME_PHASES:
+            if frames.last_minute <= start:
+                continue  # Game ended before this phase
+            stats = self.phase_stats[phase]
+            phase_end = frames.last_minute if end is None else min(end, frames.last_minute)
+            gold, xp, cs = frames.gains(start, phase_end, participant_id)
+
+            stats['games'] += 1
+            stats['minutes'] += phase_end - start
+            stats['gold'] += gold
+            stats['xp'] += xp
+            stats['cs'] += cs
+            for stat, minutes in (('kills', kill_minutes), ('deaths', death_minutes)):
+                stats[stat] += sum(1 for minute in minutes if minute >= start and (end is None or minute < end))
+
+    def result(self):
+        phase_stats = {phase: dict(stats) for phase, stats in self.phase_stats.items()}
+
+        # Calculate KDA and per-minute income for each phase
+        for phase, _, _ in GAME_PHASES:
+            stats = phase_stats[phase]
+            minutes = stats.pop('minutes')
+            stats['kda'] = round(stats['kills'] / max(stats['deaths'], 1), 2)
+            for stat in ('gold', 'xp', 'cs'):
+                stats[f'{stat}_per_min'] = round(stats.pop(stat) / minutes, 1) if minutes else 0
 
-        print("[ANALYZER] Analyzing meta adaptation...")
-        meta_adaptation = self.analyze_meta_adaptation()
+        # Determine best phase
+        best_phase = max(phase_stats.items(), key=lambda x: x[1]['kda'])
 
-        print("[ANALYZER] Analyzing comeback potential...")
-        comeback_potential = self.analyze_comeback_potential()
+        return {
+            'phase_stats': phase_stats,
+            'best_phase': best_phase[0],
+            'best_phase_kda': best_phase[1]['kda']
+        }
 
-        print("[ANALYZER] Analyzing power spikes...")
-        power_spikes = self.analyze_power_spikes()
 
-        print("[ANALYZER] Analyzing objective priority...")
-        objective_priority = self.analyze_objective_priority()
+class YearInReviewAnalyzer:
+    """Analyzes League of Legends match data and generates AI-powered insights"""
 
-        print("[ANALYZER] Analyzing duo synergy...")
-        duo_synergy = self.analyze_duo_synergy()
+    def __init__(self, matches, summoner_name, region, timelines=None, puuid=None, store=None, backend=None,
+                 tilt_windows=TILT_WINDOWS):
+        self._matches = matches
+        self.summoner_name = summoner_name
+        self.region = region
+        self._timelines = timelines or []
+        self.puuid = puuid
+        self.store = store  # Optional AnalysisStore for results shared across requests and workers
+        self.bedrock_client = boto3.client('bedrock-runtime', region_name='eu-central-1')
+        self.bedrock_agent_client = boto3.client('bedrock-agent-runtime', region_name='eu-central-1')
+        self.backend = backend or ANALYSIS_BACKEND
+        self.tilt_windows = tuple(tilt_windows)  # Loss streak lengths detect_tilt_patterns reports
+        # Sections also run on the network thread pool (analyze_all) - guards memo state and invalidation
+        self._lock = threading.RLock()
+        self._section_locks = {}  # {section name: Lock}, so concurrent callers compute a section once
+        self.invalidate()
+
+    def dataset_key(self, inputs=('matches',)):
+        """
+        Hash of the data a section reads, so matches-only sections are shared by endpoints without timelines
 
-        print("[ANALYZER] Analyzing tilt factor...")
-        tilt_factor = self.analyze_tilt_factor()
+        Covers the contents of every game, not just its ID - the data comes from request bodies.
+        """
+        with_timelines = 'timelines' in inputs
+        with_baselines = 'baselines' in inputs
+        if (with_timelines, with_baselines) not in self._dataset_keys:
+            entries = [f"{m.get('matchId', '')}:{digest}" for m, digest in zip(self.matches, self.get_match_digests())]
+            if with_timelines:
+                # Timelines are most of a body's bytes - only hashed for sections that read them
+                entries += [f"timeline:{t.get('match_id', '')}:{digest}"
+                            for t, digest in zip(self.timelines, self.get_timeline_digests())]
+            if with_baselines:
+                entries.append(f"baselines:{baselines_fingerprint()}")
+            self._dataset_keys[(with_timelines, with_baselines)] = compute_dataset_key(self.puuid or self.summoner_name, entries)
+        return self._dataset_keys[(with_timelines, with_baselines)]
+
+    def get_match_digests(self):
+        """match_digest of every match, computed once per analyzer"""
+        with self._lock:
+            if self._match_digests is None:
+                self._match_digests = [match_digest(m) for m in self.matches]
+            return self._match_digests
+
+    def get_timeline_digests(self):
+        """match_digest of every timeline, computed once per analyzer"""
+        with self._lock:
+            if self._timeline_digests is None:
+                self._timeline_digests = [match_digest(t) for t in self.timelines]
+            return self._timeline_digests
+
+    def invalidate(self):
+        """
+        Drop memoized section results and derived tables so they're recomputed from the current data
 
-        print("[ANALYZER] ✅ All analysis complete!")
+        Assigning matches or timelines does this; call it after changing either in place.
+        """
+        with self._lock:
+            self._results = {}  # {section name: result}, each section runs at most once per analyzer
+            self._dataset_keys = {}  # {(includes timelines, includes baselines): dataset key}
+            self._match_digests = None
+            self._timeline_digests = None
+            self._spatial_index = None
+            self._timeline_index = None
+            self._match_frames = None
+            self._kill_damage_table = None
+            self._features = None
+            self._columns = None
+            self._outcomes = {}  # {row order: OutcomeSequence}
+            self._accumulators = None  # MatchAccumulators, or False when they can't be used
+            self._narrative_prefetch = None  # (inputs key, future) started by analyze_all
+
+    @property
+    def matches(self):
+        return self._matches
+
+    @matches.setter
+    def matches(self, matches):
+        """Replacing the matches drops everything computed from the old ones"""
+        with self._lock:
+            self._matches = matches
+            self.invalidate()
+
+    @property
+    def timelines(self):
+        return self._timelines
+
+    @timelines.setter
+    def timelines(self, timelines):
+        with self._lock:
+            self._timelines = timelines or []
+            self.invalidate()
+
+    def _run_section(self, section, method):
+        """
+        Run an analysis section at most once per analyzer instance
 
-        return {
-            'nemesis': nemesis,
-            'bff': bff,
-            'hot_streak_month': hot_streak,
-            'slump_month': slump,
-            'glow_up': glow_up,
-            'miracle_comeback': comeback,
-            'pentakill_breaker': pentakill,
-            'afk_stats': afk,
-            'highlight_stats': highlights,
-            'role_evolution': role_evo,
-            'longest_win_streak': streak,
-            'surrender_analysis': surrenders,
-            'what_if_scenarios': what_if,
-            'time_analysis': time_analysis,
-            'champion_diversity': diversity,
-            'total_hours': total_hours,
-            'cs_efficiency': cs_efficiency,
-            'kill_steals': kill_steals,
-            'build_comparison': build_comparison,
-            'tilt_detection': tilt_detection,
-            'champion_fatigue': champion_fatigue,
-            'learning_curves': learning_curves,
-            'meta_adaptation': meta_adaptation,
-            'comeback_potential': comeback_potential,
-            'power_spikes': power_spikes,
-            'objective_priority': objective_priority,
-            'duo_synergy': duo_synergy,
-            'tilt_factor': tilt_factor
-        }
+        Returns the memoized result itself - sections and accessors only read it, and analyze_all()
+        hands callers copies.
+        """
+        name = section['name']
+        with self._lock:
+            section_lock = self._section_locks.setdefault(name, threading.Lock())
+        # Per-section lock: sections form a DAG, so threads waiting on each other's dependencies can't deadlock
+        with section_lock:
+            with self._lock:
+                results = self._results
+                found = name in results
+            if not found:
+                # Kept in the dict it was computed for - an invalidation meanwhile drops it
+                results[name] = self._compute_section(section, method)
+        return results[name]
+
+    def _compute_section(self, section, method):
+        """Compute a section, reusing a stored result for the same dataset and section version"""
+        if self.store is None:
+            return method(self)
+
+        key = self.dataset_key(section['inputs'])
+        options = self.section_options(section)
+        if options:
+            key = compute_dataset_key(key, [f"{option}={value!r}" for option, value in options.items()])
+        found, result = self.store.get(key, section['name'], section['version'], max_age=section['max_age'])
+        if found:
+            print(f"[ANALYSIS STORE] Reusing {section['name']} v{section['version']}")
+            return result
+
+        # Sections with incremental accumulators only need the games added since the last refresh
+        accumulators = self.get_accumulators() if section['name'] in ACCUMULATED_SECTIONS else None
+        result = accumulators.section(section['name'], **options) if accumulators is not None else method(self)
+        # Network sections return None on transient failures - don't pin those
+        if result is not None or 'network' not in section['inputs']:
+            self.store.put(key, section['name'], section['version'], result)
+        return result
+
+    def section_options(self, section):
+        """{option: value} of the analyzer attributes a section's result depends on"""
+        return {option: getattr(self, option) for option in section['options']}
+
+    def get_accumulators(self):
+        """The player's saved accumulators brought up to date with any new matches (None without a store and PUUID)"""
+        if self._accumulators is None and self.store is not None and self.puuid:
+            self._accumulators = self._load_accumulators()
+        return self._accumulators or None
+
+    def _load_accumulators(self):
+        saved = self.store.get_accumulators(self.puuid)
+        accumulators = MatchAccumulators.from_dict(saved)
+        digests = self.get_match_digests()
+        added = accumulators.extend(self.matches, digests) if accumulators is not None else None
+
+        if added is None:
+            # Not the saved history plus newer games (first visit, other version, different subset or contents)
+            accumulators = MatchAccumulators()
+            added = accumulators.extend(self.matches, digests)
+            if added is None:
+                print("[ACCUMULATORS] Matches aren't in chronological order, computing sections in full")
+                return False
+            if saved and len(saved.get('match_ids', [])) > len(accumulators):
+                # Keep the longer saved history for the next full refresh
+                return accumulators
+
+        if added:
+            self.store.put_accumulators(self.puuid, accumulators.to_dict())
+        print(f"[ACCUMULATORS] Folded in {added} new matches ({len(accumulators)} total)")
+        return accumulators
+
+    def get_timeline_index(self):
+        """Event index over all timelines with the player's participantId per match, built once per analyzer"""
+        if self._timeline_index is None:
+            self._timeline_index = TimelineIndex.from_timelines(self.timelines, self.matches, self.puuid)
+            print(f"[TIMELINE INDEX] Indexed {self._timeline_index.event_count} events from {len(self.timelines)} timelines")
+        return self._timeline_index
+
+    def get_match_frames(self):
+        """Per-minute participant stats for every match with a timeline: {match_id: MatchFrames}"""
+        if self._match_frames is None:
+            self._match_frames = {}
+            # Digests are what the per-process cache is keyed by; with a store they're needed for the
+            # dataset key anyway, without one hashing costs more than extracting the frames again
+            digests = self.get_timeline_digests() if self.store is not None else [None] * len(self.timelines)
+            for timeline_data, digest in zip(self.timelines, digests):
+                timeline = timeline_data.get('timeline')
+                if timeline and 'info' in timeline:
+                    match_id = timeline_data.get('match_id')
+                    self._match_frames[match_id] = get_match_frames(match_id, timeline, digest)
+        return self._match_frames
+
+    def get_kill_damage_table(self):
+        """Vectorized damage attribution over every champion kill, or None when the Python loop should run"""
+        if self._kill_damage_table is None and self._use_numpy() and damage_attribution.is_available():
+            # Cached per timeline digest, computed only when the store needs them (see get_match_frames)
+            digests = None
+            if self.store is not None:
+                digests = {t.get('match_id'): digest for t, digest in zip(self.timelines, self.get_timeline_digests())}
+            self._kill_damage_table = KillDamageTable(self.get_timeline_index(), digests)
+        return self._kill_damage_table
+
+    def get_spatial_index(self):
+        """Spatial index over all timeline events, built once per analyzer"""
+        if self._spatial_index is None:
+            self._spatial_index = TimelineSpatialIndex.from_timelines(self.timelines)
+            print(f"[SPATIAL INDEX] Indexed {self._spatial_index.event_count} events from {len(self.timelines)} timelines")
+        return self._spatial_index
+
+    def get_features(self):
+        """Per-match feature table (dates, KDA, CS/min, role, patch...), built once per analyzer"""
+        if self._features is None:
+            self._features = MatchFeatureTable(self.matches)
+        return self._features
+
+    def get_outcomes(self, order='chronological'):
+        """Win/loss sequence of the feature rows in `order` ('chronological' or 'by_creation'), built once"""
+        if order not in self._outcomes:
+            features = self.get_features()
+            rows = getattr(features, order)
+            # Usually both orders are the same games - share one sequence then
+            other = 'by_creation' if order == 'chronological' else 'chronological'
+            if other in self._outcomes and all(a is b for a, b in zip(rows, self._outcomes[other].rows)):
+                self._outcomes[order] = self._outcomes[other]
+            else:
+                self._outcomes[order] = OutcomeSequence(rows)
+        return self._outcomes[order]
+
+    def _use_numpy(self):
+        """Whether the NumPy code paths should run for this dataset (NumPy itself may still be missing)"""
+        if self.backend == 'python':
+            return False
+        return self.backend == 'numpy' or len(self.matches) >= NUMPY_MIN_MATCHES
+
+    def get_columns(self):
+        """NumPy columns for the group-by sections, or None when the Python loops should run"""
+        if self._columns is None and self._use_numpy() and numpy_backend.is_available():
+            self._columns = numpy_backend.MatchColumns(self.get_features())
+        return self._columns
+
+    def get_section(self, name):
+        """Result of a registered section by name (memoized like the section methods)"""
+        return getattr(self, SECTION_REGISTRY[name]['method'])()
+
+    def get_narrative_inputs(self):
+        """The analysis sections generate_ai_narrative() reads"""
+        return {name: self.get_section(name) for name in NARRATIVE_SECTIONS}
+
+    def analyze_all(self, sections=None, prefetch_narrative=False):
+        """
+        Run the requested analysis sections (all by default) for the year-in-review
+
+        Sections run in dependency order. Network-bound sections (the OP.GG build lookup)
+        and, with prefetch_narrative, the Bedrock narrative run on a thread pool while the
+        CPU-bound sections run, and are joined at the end.
+
+        Args:
+            sections: Section names to return (None = all); dependencies are run as needed
+            prefetch_narrative: Start generate_ai_narrative() in the background as soon as its inputs are ready
 
+        Raises:
+            ValueError: Unknown section name
+        """
+        requested = list(dict.fromkeys(SECTION_REGISTRY if sections is None else sections))
+        run_order = resolve_sections(requested + list(NARRATIVE_SECTIONS) if prefetch_narrative else requested)
+        network_sections = [name for name in run_order if 'network' in SECTION_REGISTRY[name]['inputs']]
+        print(f"[ANALYZER] Starting analysis of {len(requested)} sections ({len(run_order)} with dependencies)...")
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=NETWORK_WORKERS) as network_pool:
+            futures = {}
+
+            def start_ready_background_work():
+                for name in network_sections:
+                    if name not in futures and all(dep in results for dep in SECTION_REGISTRY[name]['depends']):
+                        print(f"[ANALYZER] Running {name} (in background)...")
+                        futures[name] = network_pool.submit(self.get_section, name)
+
+                # The narrative only needs a couple of sections, so start it as soon as they're done
+                if prefetch_narrative and self._narrative_prefetch is None and all(n in results for n in NARRATIVE_SECTIONS):
+                    print("[ANALYZER] Generating AI narrative (in background)...")
+                    narrative_inputs = {name: results[name] for name in NARRATIVE_SECTIONS}
+                    # request_narrative, not generate_ai_narrative - that one would find this
+                    # prefetch and wait on it from inside the pool thread running it
+                    self._narrative_prefetch = (
+                        self._narrative_key(narrative_inputs),
+                        network_pool.submit(request_narrative, self.bedrock_client, self.summoner_name,
+                                            len(self.matches), sum(1 for m in self.matches if m['win']),
+                                            narrative_inputs)
+                    )
+
+            start_ready_background_work()
+            for name in run_order:
+                if name in network_sections:
+                    continue
+                for dependency in SECTION_REGISTRY[name]['depends']:
+                    if dependency in futures and dependency not in results:
+                        results[dependency] = futures[dependency].result()
+                print(f"[ANALYZER] Running {name}...")
+                results[name] = self.get_section(name)
+                start_ready_background_work()
+
+            for name in network_sections:
+                if name not in results:
+                    print(f"[ANALYZER] Waiting for {name}...")
+                    results[name] = futures[name].result() if name in futures else self.get_section(name)
+                    start_ready_background_work()
+
+            print("[ANALYZER] ✅ All analysis complete!")
+
+        # Copies - the memoized results keep serving later calls on this analyzer
+        return copy.deepcopy({name: results[name] for name in requested})
+
+    @analysis_section('nemesis', version=2)
     def find_nemesis(self):
         """Find the opponent you lose to the most"""
         opponent_losses = defaultdict(int)
         opponent_info = {}
+        opponent_names = {}
 
+        # Keyed by PUUID so a rename mid-year doesn't split a nemesis in two
         for match in self.matches:
             if not match['win']:
                 for opponent in match.get('opponents', []):
-                    key = f"{opponent['riotIdGameName']}#{opponent['riotIdTagline']}"
+                    key = player_key(opponent)
                     opponent_losses[key] += 1
                     opponent_info[key] = opponent
+                    opponent_names.setdefault(key, riot_id(opponent))  # Matches are most recent first
 
         if not opponent_losses:
             return None
 
         nemesis = max(opponent_losses.items(), key=lambda x: x[1])
         return {
-            'name': nemesis[0],
+            'name': opponent_names[nemesis[0]],
             'losses': nemesis[1],
             'info': opponent_info.get(nemesis[0])
         }
 
+    @analysis_section('bff', version=2)
     def find_bff(self):
         """Find the teammate you win most with"""
         teammate_stats = defaultdict(lambda: {'wins': 0, 'games': 0})
         teammate_info = {}
+        teammate_names = {}
 
         for match in self.matches:
             for teammate in match.get('teammates', []):
                 if teammate.get('riotIdGameName'):
-                    key = f"{teammate['riotIdGameName']}#{teammate.get('riotIdTagline', '')}"
+                    key = player_key(teammate)
                     teammate_stats[key]['games'] += 1
                     if match['win']:
                         teammate_stats[key]['wins'] += 1
                     teammate_info[key] = teammate
+                    teammate_names.setdefault(key, riot_id(teammate))
 
         if not teammate_stats:
             return None
@@ -202,27 +761,31 @@ class YearInReviewAnalyzer:
             )
 
         return {
-            'name': best_duo[0],
+            'name': teammate_names[best_duo[0]],
             'games': best_duo[1]['games'],
             'wins': best_duo[1]['wins'],
             'winrate': round(best_duo[1]['wins'] / best_duo[1]['games'] * 100, 1),
             'info': teammate_info.get(best_duo[0])
         }
 
+    @analysis_section('hot_streak_month')
     def find_hot_streak_month(self):
         """Find the month with best performance"""
-        monthly_stats = defaultdict(lambda: {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0, 'assists': 0})
+        columns = self.get_columns()
+        if columns is not None:
+            monthly_stats = columns.group_stats('month', wins='win', kills='kills', deaths='deaths', assists='assists')
+        else:
+            monthly_stats = defaultdict(lambda: {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0, 'assists': 0})
 
-        for match in self.matches:
-            date = datetime.fromtimestamp(match['gameCreation'] / 1000)
-            month_key = date.strftime('%Y-%m')
+            for row in self.get_features():
+                month_key = row['month']
 
-            monthly_stats[month_key]['games'] += 1
-            if match['win']:
-                monthly_stats[month_key]['wins'] += 1
-            monthly_stats[month_key]['kills'] += match['kills']
-            monthly_stats[month_key]['deaths'] += match['deaths']
-            monthly_stats[month_key]['assists'] += match['assists']
+                monthly_stats[month_key]['games'] += 1
+                if row['win']:
+                    monthly_stats[month_key]['wins'] += 1
+                monthly_stats[month_key]['kills'] += row['kills']
+                monthly_stats[month_key]['deaths'] += row['deaths']
+                monthly_stats[month_key]['assists'] += row['assists']
 
         if not monthly_stats:
             return None
@@ -245,17 +808,21 @@ class YearInReviewAnalyzer:
             'kda': round((month_data['kills'] + month_data['assists']) / max(month_data['deaths'], 1), 2)
         }
 
+    @analysis_section('slump_month')
     def find_slump_month(self):
         """Find the month with worst performance"""
-        monthly_stats = defaultdict(lambda: {'wins': 0, 'games': 0})
+        columns = self.get_columns()
+        if columns is not None:
+            monthly_stats = columns.group_stats('month', wins='win')
+        else:
+            monthly_stats = defaultdict(lambda: {'wins': 0, 'games': 0})
 
-        for match in self.matches:
-            date = datetime.fromtimestamp(match['gameCreation'] / 1000)
-            month_key = date.strftime('%Y-%m')
+            for row in self.get_features():
+                month_key = row['month']
 
-            monthly_stats[month_key]['games'] += 1
-            if match['win']:
-                monthly_stats[month_key]['wins'] += 1
+                monthly_stats[month_key]['games'] += 1
+                if row['win']:
+                    monthly_stats[month_key]['wins'] += 1
 
         if not monthly_stats:
             return None
@@ -274,15 +841,17 @@ class YearInReviewAnalyzer:
             'winrate': round(month_data['wins'] / month_data['games'] * 100, 1)
         }
 
+    @analysis_section('glow_up')
     def calculate_glow_up(self):
         """Compare early year vs late year stats"""
         if len(self.matches) < 10:
             return None
 
         # Split matches into early and late year (first 25% vs last 25%)
-        split_point = len(self.matches) // 4
-        early_matches = self.matches[-split_point:]  # Most recent are at start, so reverse
-        late_matches = self.matches[:split_point]
+        rows = self.get_features().rows
+        split_point = len(rows) // 4
+        early_matches = rows[-split_point:]  # Most recent are at start, so reverse
+        late_matches = rows[:split_point]
 
         def calc_stats(matches):
             wins = sum(1 for m in matches if m['win'])
@@ -311,20 +880,22 @@ class YearInReviewAnalyzer:
             }
         }
 
+    @analysis_section('miracle_comeback')
     def find_miracle_comeback(self):
         """Find games where you were behind in gold but won"""
         # This would require timeline data with gold differentials
         # For now, find games with high deaths but still won
         comeback_games = [
-            m for m in self.matches
-            if m['win'] and m['deaths'] >= 8  # High deaths but still won
+            row for row in self.get_features()
+            if row['win'] and row['deaths'] >= 8  # High deaths but still won
         ]
 
         if not comeback_games:
             return None
 
-        best_comeback = max(comeback_games, key=lambda x: x['deaths'])
-        game_date = datetime.fromtimestamp(best_comeback['gameCreation'] / 1000)
+        best_row = max(comeback_games, key=lambda x: x['deaths'])
+        best_comeback = best_row['match']
+        game_date = best_row['date']
         return {
             'matchId': best_comeback['matchId'],
             'championName': best_comeback['championName'],
@@ -334,9 +905,10 @@ class YearInReviewAnalyzer:
             'gameDuration': best_comeback['gameDuration'],
             'date': game_date.strftime('%B %d, %Y'),
             'time': game_date.strftime('%I:%M %p'),
-            'kda': round((best_comeback['kills'] + best_comeback['assists']) / max(best_comeback['deaths'], 1), 2)
+            'kda': round(best_row['kda'], 2)
         }
 
+    @analysis_section('pentakill_breaker')
     def find_pentakill_breaker(self):
         """Find who denied your pentakills (quadra kills that didn't become penta)"""
         quadra_games = [m for m in self.matches if m.get('quadraKills', 0) > 0 and m.get('pentaKills', 0) == 0]
@@ -345,6 +917,7 @@ class YearInReviewAnalyzer:
             'games': quadra_games[:3]  # Return up to 3 games
         }
 
+    @analysis_section('afk_stats')
     def calculate_afk_stats(self):
         """Calculate AFK/leaver statistics"""
         games_with_afk = sum(1 for m in self.matches if m.get('teamHadAFK', False))
@@ -356,13 +929,15 @@ class YearInReviewAnalyzer:
             'afk_rate': round(games_with_afk / len(self.matches) * 100, 1) if self.matches else 0
         }
 
+    @analysis_section('highlight_stats')
     def get_highlight_stats(self):
         """Get all the cool highlight stats"""
         # Find games for specific highlights
-        longest_living_game = max(self.matches, key=lambda m: m.get('longestTimeSpentLiving', 0)) if self.matches else None
-        largest_crit_game = max(self.matches, key=lambda m: m.get('largestCriticalStrike', 0)) if self.matches else None
-        largest_spree_game = max(self.matches, key=lambda m: m.get('largestKillingSpree', 0)) if self.matches else None
-        most_kills_game = max(self.matches, key=lambda m: m['kills']) if self.matches else None
+        rows = self.get_features().rows
+        longest_living_row = max(rows, key=lambda r: r['match'].get('longestTimeSpentLiving', 0)) if rows else None
+        largest_crit_row = max(rows, key=lambda r: r['match'].get('largestCriticalStrike', 0)) if rows else None
+        largest_spree_row = max(rows, key=lambda r: r['match'].get('largestKillingSpree', 0)) if rows else None
+        most_kills_row = max(rows, key=lambda r: r['kills']) if rows else None
 
         result = {
             'total_pentakills': sum(m.get('pentaKills', 0) for m in self.matches),
@@ -375,24 +950,27 @@ class YearInReviewAnalyzer:
         }
 
         # Add game context for highlights
-        if longest_living_game:
-            game_date = datetime.fromtimestamp(longest_living_game['gameCreation'] / 1000)
+        if longest_living_row:
+            longest_living_game = longest_living_row['match']
+            game_date = longest_living_row['date']
             result['longest_living_details'] = {
                 'champion': longest_living_game['championName'],
                 'date': game_date.strftime('%B %d, %Y'),
                 'time': game_date.strftime('%I:%M %p')
             }
 
-        if largest_crit_game:
-            game_date = datetime.fromtimestamp(largest_crit_game['gameCreation'] / 1000)
+        if largest_crit_row:
+            largest_crit_game = largest_crit_row['match']
+            game_date = largest_crit_row['date']
             result['largest_crit_details'] = {
                 'champion': largest_crit_game['championName'],
                 'date': game_date.strftime('%B %d, %Y'),
                 'time': game_date.strftime('%I:%M %p')
             }
 
-        if largest_spree_game:
-            game_date = datetime.fromtimestamp(largest_spree_game['gameCreation'] / 1000)
+        if largest_spree_row:
+            largest_spree_game = largest_spree_row['match']
+            game_date = largest_spree_row['date']
             result['largest_spree_details'] = {
                 'champion': largest_spree_game['championName'],
                 'date': game_date.strftime('%B %d, %Y'),
@@ -400,8 +978,9 @@ class YearInReviewAnalyzer:
                 'kills': largest_spree_game['kills']
             }
 
-        if most_kills_game:
-            game_date = datetime.fromtimestamp(most_kills_game['gameCreation'] / 1000)
+        if most_kills_row:
+            most_kills_game = most_kills_row['match']
+            game_date = most_kills_row['date']
             result['most_kills_details'] = {
                 'champion': most_kills_game['championName'],
                 'date': game_date.strftime('%B %d, %Y'),
@@ -411,72 +990,56 @@ class YearInReviewAnalyzer:
 
         return result
 
+    @analysis_section('role_evolution')
     def track_role_evolution(self):
         """Track how roles changed over time"""
+        columns = self.get_columns()
+        if columns is not None:
+            return columns.group_counts('month', 'role')
+
         role_by_month = defaultdict(lambda: Counter())
 
-        for match in self.matches:
-            date = datetime.fromtimestamp(match['gameCreation'] / 1000)
-            month_key = date.strftime('%Y-%m')
-            role = match.get('individualPosition', 'NONE')
-            role_by_month[month_key][role] += 1
+        for row in self.get_features():
+            role_by_month[row['month']][row['role']] += 1
 
         # Convert Counter objects to regular dicts for JSON serialization
         return {month: dict(roles) for month, roles in role_by_month.items()}
 
+    @analysis_section('longest_win_streak')
     def find_longest_win_streak(self):
         """Find longest winning streak"""
-        current_streak = 0
-        max_streak = 0
-        streak_start = 0
-        max_streak_start = 0
-        streak_matches = []
-        current_streak_matches = []
-
-        for i, match in enumerate(reversed(self.matches)):  # Go chronologically
-            if match['win']:
-                if current_streak == 0:
-                    streak_start = i
-                    current_streak_matches = []
-                current_streak += 1
-                current_streak_matches.append(match)
-                if current_streak > max_streak:
-                    max_streak = current_streak
-                    max_streak_start = streak_start
-                    streak_matches = current_streak_matches.copy()
-            else:
-                current_streak = 0
-                current_streak_matches = []
+        outcomes = self.get_outcomes()
+        longest = outcomes.longest_streak(True)
 
         # Get details of first and last game in streak
-        start_game = None
-        end_game = None
-        if streak_matches:
-            start_game = streak_matches[0]
-            end_game = streak_matches[-1]
-            start_date = datetime.fromtimestamp(start_game['gameCreation'] / 1000)
-            end_date = datetime.fromtimestamp(end_game['gameCreation'] / 1000)
+        if longest:
+            max_streak_start, max_streak = longest
+            start_row = outcomes.rows[max_streak_start]
+            end_row = outcomes.rows[max_streak_start + max_streak - 1]
+            start_game = start_row['match']
+            end_game = end_row['match']
 
             return {
                 'streak': max_streak,
                 'start_index': max_streak_start,
                 'start_game': {
                     'champion': start_game['championName'],
-                    'date': start_date.strftime('%B %d, %Y'),
+                    'date': start_row['date'].strftime('%B %d, %Y'),
                     'kda': f"{start_game['kills']}/{start_game['deaths']}/{start_game['assists']}"
                 },
                 'end_game': {
                     'champion': end_game['championName'],
-                    'date': end_date.strftime('%B %d, %Y'),
+                    'date': end_row['date'].strftime('%B %d, %Y'),
                     'kda': f"{end_game['kills']}/{end_game['deaths']}/{end_game['assists']}"
                 }
             }
 
         return {
-            'streak': max_streak,
-            'start_index': max_streak_start
+            'streak': 0,
+            'start_index': 0
         }
 
+    @analysis_section('surrender_analysis')
     def analyze_surrenders(self):
         """Analyze surrender patterns"""
         surrenders = sum(1 for m in self.matches if m.get('gameEndedInSurrender', False))
@@ -495,26 +1058,35 @@ class YearInReviewAnalyzer:
             'time_saved_hours': round(time_saved / 3600, 1)
         }
 
+    @analysis_section('what_if_scenarios')
     def generate_what_if_scenarios(self):
         """Generate What-If scenarios using AI"""
         # Calculate main champion stats
-        champion_games = Counter(m['championName'] for m in self.matches)
+        features = self.get_features()
+        champion_games = features.champion_counts
         main_champion = champion_games.most_common(1)[0] if champion_games else ('Unknown', 0)
 
         # Calculate winrate if only played main champion
-        main_champ_matches = [m for m in self.matches if m['championName'] == main_champion[0]]
-        main_champ_winrate = (sum(1 for m in main_champ_matches if m['win']) / len(main_champ_matches) * 100) if main_champ_matches else 0
+        columns = self.get_columns()
+        if columns is not None:
+            main_champ_stats = columns.group_stats('champion', wins='win').get(main_champion[0])
+            main_champ_winrate = (main_champ_stats['wins'] / main_champ_stats['games'] * 100) if main_champ_stats else 0
+        else:
+            main_champ_matches = [r for r in features if r['champion'] == main_champion[0]]
+            main_champ_winrate = (sum(1 for m in main_champ_matches if m['win']) / len(main_champ_matches) * 100) if main_champ_matches else 0
 
         # Overall winrate
-        overall_winrate = (sum(1 for m in self.matches if m['win']) / len(self.matches) * 100) if self.matches else 0
+        overall_winrate = (features.wins / len(features) * 100) if self.matches else 0
 
         # Calculate role stats
-        role_stats = defaultdict(lambda: {'wins': 0, 'games': 0})
-        for match in self.matches:
-            role = match.get('individualPosition', 'NONE')
-            role_stats[role]['games'] += 1
-            if match['win']:
-                role_stats[role]['wins'] += 1
+        if columns is not None:
+            role_stats = columns.group_stats('role', wins='win')
+        else:
+            role_stats = defaultdict(lambda: {'wins': 0, 'games': 0})
+            for row in features:
+                role_stats[row['role']]['games'] += 1
+                if row['win']:
+                    role_stats[row['role']]['wins'] += 1
 
         # Find best and worst roles
         best_role = max(role_stats.items(), key=lambda x: x[1]['wins'] / max(x[1]['games'], 1)) if role_stats else ('NONE', {'wins': 0, 'games': 0})
@@ -539,29 +1111,24 @@ class YearInReviewAnalyzer:
             }
         }
 
+    @analysis_section('time_analysis')
     def analyze_performance_by_time(self):
         """Analyze performance by time of day"""
-        time_stats = defaultdict(lambda: {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0})
+        columns = self.get_columns()
+        if columns is not None:
+            time_stats = columns.group_stats('period', wins='win', kills='kills', deaths='deaths')
+        else:
+            time_stats = defaultdict(lambda: {'wins': 0, 'games': 0, 'kills': 0, 'deaths': 0})
 
-        for match in self.matches:
-            date = datetime.fromtimestamp(match['gameCreation'] / 1000)
-            hour = date.hour
-
-            # Categorize time
-            if 0 <= hour < 6:
-                period = 'Night Owl (12am-6am)'
-            elif 6 <= hour < 12:
-                period = 'Early Bird (6am-12pm)'
-            elif 12 <= hour < 18:
-                period = 'Afternoon (12pm-6pm)'
-            else:
-                period = 'Evening (6pm-12am)'
+            for row in self.get_features():
+                # Time of day bucket (Night Owl / Early Bird / Afternoon / Evening)
+                period = row['period']
 
-            time_stats[period]['games'] += 1
-            if match['win']:
-                time_stats[period]['wins'] += 1
-            time_stats[period]['kills'] += match['kills']
-            time_stats[period]['deaths'] += match['deaths']
+                time_stats[period]['games'] += 1
+                if row['win']:
+                    time_stats[period]['wins'] += 1
+                time_stats[period]['kills'] += row['kills']
+                time_stats[period]['deaths'] += row['deaths']
 
         # Find best time
         best_time = max(
@@ -583,9 +1150,10 @@ class YearInReviewAnalyzer:
 
         return result
 
+    @analysis_section('champion_diversity')
     def calculate_champion_diversity(self):
         """Calculate champion pool diversity"""
-        champion_games = Counter(m['championName'] for m in self.matches)
+        champion_games = self.get_features().champion_counts
         unique_champions = len(champion_games)
         total_games = len(self.matches)
 
@@ -603,9 +1171,11 @@ class YearInReviewAnalyzer:
             'one_trick': top_3_percentage > 70  # True if player is a one-trick (70%+ on top 3)
         }
 
+    @analysis_section('total_hours')
     def calculate_total_hours(self):
         """Calculate total hours played across all matches"""
-        total_seconds = sum(match.get('gameDuration', 0) for match in self.matches)
+        rows = self.get_features().rows
+        total_seconds = sum(r['duration'] for r in rows)
         total_hours = total_seconds / 3600  # Convert seconds to hours
 
         # Calculate average game duration in minutes
@@ -613,7 +1183,7 @@ class YearInReviewAnalyzer:
         avg_minutes = avg_seconds / 60
 
         # Find longest and shortest games
-        longest_game = max((m.get('gameDuration', 0) for m in self.matches), default=0)
+        longest_game = max((r['duration'] for r in rows), default=0)
         shortest_game = min((m.get('gameDuration', 9999) for m in self.matches), default=0)
 
         return {
@@ -625,49 +1195,27 @@ class YearInReviewAnalyzer:
             'shortest_game_minutes': round(shortest_game / 60, 1)
         }
 
+    @staticmethod
+    def _narrative_key(analysis_data):
+        """The parts of the analysis the narrative prompt reads"""
+        return repr((analysis_data.get('hot_streak_month'), analysis_data.get('highlight_stats')))
+
     def generate_ai_narrative(self, analysis_data):
         """Generate AI-powered narrative using AWS Bedrock"""
-        print("[AI NARRATIVE] Preparing prompt...")
-
-        prompt = f"""You are a League of Legends analyst creating a fun year-in-review for {self.summoner_name}.
-
-Based on these stats, write an engaging narrative (6-8 sentences) about their year:
-
-Total Games: {len(self.matches)}
-Win Rate: {sum(1 for m in self.matches if m['win']) / len(self.matches) * 100:.1f}%
-Hot Streak Month: {analysis_data.get('hot_streak_month', {}).get('month', 'Unknown')}
-Pentakills: {analysis_data.get('highlight_stats', {}).get('total_pentakills', 0)}
-
-Make it fun, personal, and celebratory! Do not use emojis."""
-
-        try:
-            print("[AI NARRATIVE] Calling AWS Bedrock...")
-            response = self.bedrock_client.invoke_model(
-                modelId=MODEL_ID,
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 600,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ]
-                })
-            )
-
-            print("[AI NARRATIVE] Response received, parsing...")
-            result = json.loads(response['body'].read())
-            narrative = result['content'][0]['text']
-            print(f"[AI NARRATIVE] ✅ Generated: {narrative[:50]}...")
-            return narrative
+        # Reuse the narrative analyze_all(prefetch_narrative=True) started for the same stats
+        with self._lock:
+            prefetch = self._narrative_prefetch
+            if prefetch is not None and prefetch[0] == self._narrative_key(analysis_data):
+                self._narrative_prefetch = None
+            else:
+                prefetch = None
+        if prefetch is not None:
+            return prefetch[1].result()
 
-        except Exception as e:
-            print(f"[AI NARRATIVE] ❌ ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return f"Had an incredible year with {len(self.matches)} games played!"
+        return request_narrative(self.bedrock_client, self.summoner_name, len(self.matches),
+                                 sum(1 for m in self.matches if m['win']), analysis_data)
 
+    @analysis_section('build_comparison', inputs=('matches', 'network'), max_age=BUILD_META_MAX_AGE)
     def analyze_build_mistakes(self):
         """Analyze player's item builds vs optimal builds using OP.GG"""
         print("[BUILD ANALYSIS] Analyzing build orders...")
@@ -804,6 +1352,7 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             traceback.print_exc()
             return None
 
+    @analysis_section('tilt_detection', version=2, options=('tilt_windows',))
     def detect_tilt_patterns(self):
         """Detect tilt patterns: win rate drops after consecutive losses"""
         print("[TILT DETECTION] Analyzing tilt patterns...")
@@ -812,54 +1361,34 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             if len(self.matches) < 10:
                 return None
 
-            # Reverse to chronological order (oldest first)
-            matches = list(reversed(self.matches))
-
-            tilt_episodes = []
-            loss_streak = 0
-            baseline_winrate = sum(1 for m in matches if m['win']) / len(matches)
-
-            # Track performance after losses
-            games_after_2_losses = []
-            games_after_3_losses = []
-            normal_games = []
-
-            for i, match in enumerate(matches):
-                # Check previous games
-                if i >= 2:
-                    prev_2 = matches[i-2:i]
-                    if all(not m['win'] for m in prev_2):
-                        # After 2+ losses
-                        games_after_2_losses.append(match)
-
-                if i >= 3:
-                    prev_3 = matches[i-3:i]
-                    if all(not m['win'] for m in prev_3):
-                        # After 3+ losses
-                        games_after_3_losses.append(match)
-
-                # Track normal baseline (no recent losses)
-                if i >= 2:
-                    prev_2 = matches[i-2:i]
-                    if any(m['win'] for m in prev_2):
-                        normal_games.append(match)
-
-                # Track loss streaks
-                if not match['win']:
-                    loss_streak += 1
-                else:
-                    if loss_streak >= 3:
-                        # End of tilt episode
-                        tilt_episodes.append({
-                            'length': loss_streak,
-                            'ended_at': i
-                        })
-                    loss_streak = 0
+            # Chronological order (oldest first)
+            outcomes = self.get_outcomes()
+            baseline_winrate = outcomes.wins / outcomes.size
+
+            # Performance after losses
+            games_after_2_losses, wins_after_2_losses = outcomes.after_losses(2)
+            games_after_3_losses, wins_after_3_losses = outcomes.after_losses(3)
+
+            # Normal baseline: a win in the previous two games
+            normal_games = (outcomes.size - 2) - games_after_2_losses
+            normal_wins = outcomes.wins_between(2, outcomes.size) - wins_after_2_losses
+
+            # Tilt episodes: loss streaks of 3+ that a win ended
+            tilt_episodes = outcomes.streaks(False, min_length=3, closed=True)
 
             # Calculate win rates
-            wr_after_2_losses = (sum(1 for m in games_after_2_losses if m['win']) / len(games_after_2_losses) * 100) if games_after_2_losses else 0
-            wr_after_3_losses = (sum(1 for m in games_after_3_losses if m['win']) / len(games_after_3_losses) * 100) if games_after_3_losses else 0
-            wr_normal = (sum(1 for m in normal_games if m['win']) / len(normal_games) * 100) if normal_games else baseline_winrate * 100
+            wr_after_2_losses = (wins_after_2_losses / games_after_2_losses * 100) if games_after_2_losses else 0
+            wr_after_3_losses = (wins_after_3_losses / games_after_3_losses * 100) if games_after_3_losses else 0
+            wr_normal = (normal_wins / normal_games * 100) if normal_games else baseline_winrate * 100
+
+            winrate_after_losses = []
+            for losses in self.tilt_windows:
+                games, wins = outcomes.after_losses(losses)
+                winrate_after_losses.append({
+                    'losses': losses,
+                    'games': games,
+                    'winrate': round(wins / games * 100, 1) if games else 0
+                })
 
             # Detect significant tilt
             tilt_drop_2_losses = wr_normal - wr_after_2_losses
@@ -869,7 +1398,7 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             # 1. Check if overall win rate is very low (hard stuck/tilted)
             # 2. Check if performance drops significantly after losses
             # 3. Check for multiple tilt episodes
-            longest_loss_streak = max([ep['length'] for ep in tilt_episodes], default=0)
+            longest_loss_streak = max([length for _, length in tilt_episodes], default=0)
 
             # Determine tilt status with multiple criteria
             is_heavily_tilting = False
@@ -907,10 +1436,11 @@ Make it fun, personal, and celebratory! Do not use emojis."""
                 'wr_normal': round(wr_normal, 1),
                 'tilt_drop_2_losses': round(tilt_drop_2_losses, 1),
                 'tilt_drop_3_losses': round(tilt_drop_3_losses, 1),
-                'games_analyzed_after_2_losses': len(games_after_2_losses),
-                'games_analyzed_after_3_losses': len(games_after_3_losses),
+                'games_analyzed_after_2_losses': games_after_2_losses,
+                'games_analyzed_after_3_losses': games_after_3_losses,
                 'tilt_episodes': len(tilt_episodes),
-                'longest_loss_streak': longest_loss_streak
+                'longest_loss_streak': longest_loss_streak,
+                'winrate_after_losses': winrate_after_losses
             }
 
         except Exception as e:
@@ -919,6 +1449,7 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             traceback.print_exc()
             return None
 
+    @analysis_section('champion_fatigue')
     def detect_champion_fatigue(self):
         """Detect champion fatigue: win rate drops after playing same champ consecutively"""
         print("[CHAMPION FATIGUE] Analyzing champion fatigue...")
@@ -927,50 +1458,34 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             if len(self.matches) < 20:
                 return None
 
-            # Reverse to chronological order
-            matches = list(reversed(self.matches))
+            # Chronological order
+            outcomes = self.get_outcomes()
 
-            # Track performance by game number on same champion
-            champion_sessions = {}  # {champion: {game_num: [wins]}}
-            current_champ = None
-            games_on_champ = 0
+            # Sessions of consecutive games on the same champion
+            # {champion: [longest session, early wins, early games, late wins, late games]}
+            champion_sessions = {}
+            for champ, start, length in outcomes.sessions('champion'):
+                stats = champion_sessions.setdefault(champ, [0, 0, 0, 0, 0])
+                stats[0] = max(stats[0], length)
 
-            for match in matches:
-                champ = match['championName']
-
-                if champ != current_champ:
-                    # New champion session
-                    current_champ = champ
-                    games_on_champ = 1
-                else:
-                    games_on_champ += 1
-
-                # Track performance by game number
-                if champ not in champion_sessions:
-                    champion_sessions[champ] = defaultdict(list)
-
-                champion_sessions[champ][games_on_champ].append(match['win'])
+                # Compare games 1-3 of a session vs games 5+
+                early = min(length, 3)
+                stats[1] += outcomes.wins_between(start, start + early)
+                stats[2] += early
+                if length >= 5:
+                    stats[3] += outcomes.wins_between(start + 4, start + length)
+                    stats[4] += length - 4
 
             # Find fatigue patterns
             fatigue_detected = []
 
-            for champ, sessions in champion_sessions.items():
-                if len(sessions) < 5:
+            for champ, (longest_session, early_wins, early_games, late_wins, late_games) in champion_sessions.items():
+                if longest_session < 5:
                     continue
 
-                # Compare first 3 games vs games 5+
-                early_games = []
-                late_games = []
-
-                for game_num, results in sessions.items():
-                    if game_num <= 3:
-                        early_games.extend(results)
-                    elif game_num >= 5:
-                        late_games.extend(results)
-
-                if len(early_games) >= 3 and len(late_games) >= 3:
-                    early_wr = sum(early_games) / len(early_games) * 100
-                    late_wr = sum(late_games) / len(late_games) * 100
+                if early_games >= 3 and late_games >= 3:
+                    early_wr = early_wins / early_games * 100
+                    late_wr = late_wins / late_games * 100
                     drop = early_wr - late_wr
 
                     if drop >= 15:
@@ -979,8 +1494,8 @@ Make it fun, personal, and celebratory! Do not use emojis."""
                             'early_wr': round(early_wr, 1),
                             'late_wr': round(late_wr, 1),
                             'drop': round(drop, 1),
-                            'early_games': len(early_games),
-                            'late_games': len(late_games)
+                            'early_games': early_games,
+                            'late_games': late_games
                         })
 
             # Sort by biggest drop
@@ -1000,6 +1515,7 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             traceback.print_exc()
             return None
 
+    @analysis_section('learning_curves')
     def analyze_learning_curves(self):
         """Analyze learning curves: CS/min improving over time, KDA improvements"""
         print("[LEARNING CURVES] Analyzing learning curves...")
@@ -1008,8 +1524,8 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             if len(self.matches) < 30:
                 return None
 
-            # Reverse to chronological order
-            matches = list(reversed(self.matches))
+            # Chronological order
+            matches = self.get_features().chronological
 
             # Split into early and late periods
             chunk_size = len(matches) // 3
@@ -1018,16 +1534,11 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             late_matches = matches[chunk_size*2:]
 
             def calc_avg_cs_per_min(match_list):
-                cs_rates = []
-                for m in match_list:
-                    duration_min = m.get('gameDuration', 0) / 60
-                    if duration_min > 0:
-                        cs = m.get('totalMinionsKilled', 0) + m.get('neutralMinionsKilled', 0)
-                        cs_rates.append(cs / duration_min)
+                cs_rates = [m['cs_per_min'] for m in match_list if m['cs_per_min'] is not None]
                 return sum(cs_rates) / len(cs_rates) if cs_rates else 0
 
             def calc_avg_kda(match_list):
-                kdas = [(m['kills'] + m['assists']) / max(m['deaths'], 1) for m in match_list]
+                kdas = [m['kda'] for m in match_list]
                 return sum(kdas) / len(kdas) if kdas else 0
 
             def calc_winrate(match_list):
@@ -1082,6 +1593,7 @@ Make it fun, personal, and celebratory! Do not use emojis."""
             traceback.print_exc()
             return None
 
+    @analysis_section('meta_adaptation')
     def analyze_meta_adaptation(self):
         """Analyze how quickly player adapts to meta changes"""
         print("[META ADAPTATION] Analyzing meta adaptation...")
@@ -1091,20 +1603,22 @@ Make it fun, personal, and celebratory! Do not use emojis."""
                 return None
 
             # Group matches by patch version
-            patch_stats = defaultdict(lambda: {'games': 0, 'wins': 0, 'champions': set()})
+            columns = self.get_columns()
+            if columns is not None:
+                patch_stats = columns.group_stats('patch', wins='win')
+                for patch, champions in columns.group_counts('patch', 'champion').items():
+                    patch_stats[patch]['champions'] = champions
+            else:
+                patch_stats = defaultdict(lambda: {'games': 0, 'wins': 0, 'champions': set()})
 
-            for match in self.matches:
-                patch = match.get('gameVersion', 'Unknown')
-                # Extract major.minor patch (e.g., "14.23.604.8681" -> "14.23")
-                if patch and '.' in patch:
-                    parts = patch.split('.')
-                    if len(parts) >= 2:
-                        patch = f"{parts[0]}.{parts[1]}"
-
-                patch_stats[patch]['games'] += 1
-                if match['win']:
-                    patch_stats[patch]['wins'] += 1
-                patch_stats[patch]['champions'].add(match['championName'])
+                for row in self.get_features():
+                    # Major.minor patch (e.g., "14.23.604.8681" -> "14.23")
+                    patch = row['patch']
+
+                    patch_stats[patch]['games'] += 1
+                    if row['win']:
+                        patch_stats[patch]['wins'] += 1
+                    patch_stats[patch]['champions'].add(row['champion'])
 
             # Sort patches by game count
             patches = sorted(patch_stats.items(), key=lambda x: x[1]['games'], reverse=True)
@@ -1364,14 +1878,13 @@ At the end write a paragraph or two about things he can do to improve and constr
 
         try:
             # Gather comprehensive player stats
-            from collections import Counter
-
             # Champion pool analysis
-            champion_games = Counter(m['championName'] for m in self.matches)
+            features = self.get_features()
+            champion_games = features.champion_counts
             top_champions = champion_games.most_common(5)
 
             # Role analysis
-            role_counts = Counter(m.get('individualPosition', 'NONE') for m in self.matches)
+            role_counts = features.role_counts
             most_played_roles = role_counts.most_common(3)
 
             # Playstyle analysis
@@ -1492,6 +2005,7 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
             traceback.print_exc()
             return None
 
+    @analysis_section('cs_efficiency', inputs=('matches', 'baselines'))
     def analyze_cs_efficiency(self):
         """Analyze CS (Creep Score) per minute by month"""
         if not self.matches:
@@ -1501,36 +2015,25 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
         monthly_cs = defaultdict(lambda: {'total_cs': 0, 'total_minutes': 0, 'games': 0})
         role_counts = Counter()
 
-        # Rank benchmarks for CS/min (approximate averages by rank)
-        cs_benchmarks = {
-            'Iron': 3.5,
-            'Bronze': 4.0,
-            'Silver': 4.5,
-            'Gold': 5.0,
-            'Platinum': 5.5,
-            'Emerald': 6.0,
-            'Diamond': 6.5,
-            'Master': 7.0,
-            'Grandmaster': 7.5,
-            'Challenger': 8.0
-        }
-
-        for match in self.matches:
-            timestamp = match.get('gameCreation', 0) / 1000
-            date = datetime.fromtimestamp(timestamp)
-            month_key = date.strftime('%Y-%m')
+        columns = self.get_columns()
+        if columns is not None:
+            role_counts = self.get_features().role_counts
+            played = columns.values['duration_min'] > 0
+            monthly_cs = columns.group_stats('month', mask=played, total_cs='cs', total_minutes='duration_min')
+        else:
+            for row in self.get_features():
+                month_key = row['month']
 
-            # Track role
-            role = match.get('individualPosition', 'NONE')
-            role_counts[role] += 1
+                # Track role
+                role_counts[row['role']] += 1
 
-            total_cs = match.get('totalMinionsKilled', 0) + match.get('neutralMinionsKilled', 0)
-            game_duration_minutes = match.get('gameDuration', 0) / 60
+                total_cs = row['cs']
+                game_duration_minutes = row['duration_min']
 
-            if game_duration_minutes > 0:
-                monthly_cs[month_key]['total_cs'] += total_cs
-                monthly_cs[month_key]['total_minutes'] += game_duration_minutes
-                monthly_cs[month_key]['games'] += 1
+                if game_duration_minutes > 0:
+                    monthly_cs[month_key]['total_cs'] += total_cs
+                    monthly_cs[month_key]['total_minutes'] += game_duration_minutes
+                    monthly_cs[month_key]['games'] += 1
 
         # Calculate CS per minute for each month
         monthly_data = []
@@ -1559,244 +2062,122 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
         jungle_games = role_counts.get('JUNGLE', 0)
         is_jungler = jungle_games > (total_games * 0.5)
 
-        # Determine estimated rank based on CS/min
-        estimated_rank = 'Iron'
-        for rank, benchmark in sorted(cs_benchmarks.items(), key=lambda x: x[1]):
-            if overall_cs_per_min >= benchmark:
-                estimated_rank = rank
+        # Estimated rank from where the CS/min falls among the main role's population
+        estimated_rank, benchmarks, percentile, source = cs_rank(overall_cs_per_min, role_counts, get_baselines())
 
         return {
             'monthly_data': monthly_data,
             'overall_cs_per_min': round(overall_cs_per_min, 1),
             'total_cs': total_cs_all,
             'estimated_rank': estimated_rank,
-            'benchmarks': cs_benchmarks,
+            'benchmarks': benchmarks,
+            'percentile': percentile,
+            'benchmark_source': source,
             'is_jungler': is_jungler,
             'jungle_percentage': round((jungle_games / total_games * 100) if total_games > 0 else 0, 1)
         }
 
-    def analyze_kill_steals(self):
-        """Analyze kill stealing behavior from timeline data"""
-        if not self.timelines:
-            print("[KILL_STEALS] No timeline data available")
+    @analysis_section('population_percentiles', inputs=('matches', 'baselines'))
+    def analyze_population_percentiles(self):
+        """Average percentile of the player's games in CS/min, KDA, vision and damage among all cached games"""
+        baselines = get_baselines()
+        if baselines is None or not self.matches:
+            print("[PERCENTILES] No population baselines built yet")
             return None
 
-        print(f"[KILL_STEALS] Analyzing {len(self.timelines)} timelines...")
-
-        # Build a map of match_id to player's participantId
-        match_participant_map = {}
+        tally = PercentileTally(baselines)
         for match in self.matches:
-            match_id = match.get('matchId')
-            # participantId is 1-indexed in timeline, but we need to find it from the match
-            # We'll use the match data to figure out which participant is the player
-            match_participant_map[match_id] = match  # Store full match for reference
-
-        kill_steal_stats = {
-            'total_kills': 0,
-            'kill_steals': 0,
-            'lowest_damage_percentage': 100,
-            'most_shameless_kill': None,
-            'average_damage_contribution': 0,
-            'damage_contributions': []
-        }
-
-        for timeline_data in self.timelines:
-            match_id = timeline_data.get('match_id')
-            timeline = timeline_data.get('timeline')
+            tally.add(match)
+        return tally.result()
 
-            if not timeline or 'info' not in timeline:
-                continue
-
-            # Find player's participantId from the match data
-            # Timeline uses 1-10 participantIds
-            match_info = match_participant_map.get(match_id)
-            if not match_info:
-                continue
-
-            # The player's participantId isn't directly available, but we can infer it
-            # from champion name or other identifying info
-            # For simplicity, we'll track ALL kills and filter by checking the processed match data
-            player_champion = match_info.get('championName')
-
-            # Get all champion kill events from timeline
-            for frame in timeline['info'].get('frames', []):
-                for event in frame.get('events', []):
-                    if event.get('type') != 'CHAMPION_KILL':
-                        continue
-
-                    killer_id = event.get('killerId', 0)
-                    victim_id = event.get('victimId', 0)
-
-                    # Skip if killer_id is 0 (executed/environmental kill)
-                    if killer_id == 0:
-                        continue
-
-                    # Get damage dealt to victim
-                    victim_damage_received = event.get('victimDamageReceived', [])
-
-                    # Determine killer's team (1-5 = blue, 6-10 = red)
-                    killer_team = range(1, 6) if killer_id <= 5 else range(6, 11)
-
-                    # Calculate total damage from killer's team
-                    team_damage_total = 0
-                    killer_damage = 0
-
-                    for damage_entry in victim_damage_received:
-                        participant_id = damage_entry.get('participantId', 0)
-
-                        # Only count damage from the killer's team
-                        if participant_id not in killer_team:
-                            continue
-
-                        # Calculate total damage
-                        total_dmg = (damage_entry.get('magicDamage', 0) +
-                                   damage_entry.get('physicalDamage', 0) +
-                                   damage_entry.get('trueDamage', 0))
-
-                        team_damage_total += total_dmg
-
-                        # Track killer's damage
-                        if participant_id == killer_id:
-                            killer_damage += total_dmg
-
-                    # Calculate damage percentage
-                    if team_damage_total > 0:
-                        damage_percentage = (killer_damage / team_damage_total) * 100
-
-                        # Check if this kill was by the player (by matching championName or participantId)
-                        # We need to map participantId (1-10) to the actual player
-                        # For now, we'll track ALL kills and filter later
-                        # This is a simplified version - in reality we'd need to match participantId more carefully
-
-                        kill_steal_stats['total_kills'] += 1
-                        kill_steal_stats['damage_contributions'].append(damage_percentage)
-
-                        # Check if it's a kill steal (< 15% damage)
-                        if damage_percentage < 15:
-                            kill_steal_stats['kill_steals'] += 1
-
-                            # Track most shameless kill
-                            if damage_percentage < kill_steal_stats['lowest_damage_percentage']:
-                                kill_steal_stats['lowest_damage_percentage'] = damage_percentage
-                                kill_steal_stats['most_shameless_kill'] = {
-                                    'damage_percentage': round(damage_percentage, 1),
-                                    'killer_damage': killer_damage,
-                                    'team_damage': team_damage_total,
-                                    'match_id': match_id,
-                                    'timestamp': event.get('timestamp', 0)
-                                }
-
-        # Calculate average damage contribution
-        if kill_steal_stats['damage_contributions']:
-            kill_steal_stats['average_damage_contribution'] = round(
-                sum(kill_steal_stats['damage_contributions']) / len(kill_steal_stats['damage_contributions']),
-                1
-            )
+    @analysis_section('kill_steals', version=3, inputs=('matches', 'timelines'))
+    def analyze_kill_steals(self):
+        """Analyze kill stealing, solo kills and assist quality from timeline damage data"""
+        if not self.timelines:
+            print("[KILL_STEALS] No timeline data available")
+            return None
 
-        # Calculate kill steal rate
-        if kill_steal_stats['total_kills'] > 0:
-            kill_steal_stats['kill_steal_rate'] = round(
-                (kill_steal_stats['kill_steals'] / kill_steal_stats['total_kills']) * 100,
-                1
-            )
+        index = self.get_timeline_index()
+        identified = sum(1 for participant_id in index.participants.values() if participant_id is not None)
+        table = self.get_kill_damage_table()
+        print(f"[KILL_STEALS] Attributing kill damage from {identified}/{len(self.timelines)} timelines...")
+        if table is not None:
+            attribution = table.summary()
         else:
-            kill_steal_stats['kill_steal_rate'] = 0
+            attribution = attribute_player_damage(index)
 
-        print(f"[KILL_STEALS] Found {kill_steal_stats['kill_steals']} kill steals out of {kill_steal_stats['total_kills']} total kills")
-
-        return kill_steal_stats
+        return summarize_kill_steals(attribution)
 
+    @analysis_section('comeback_potential', version=2, inputs=('matches', 'timelines'))
     def analyze_comeback_potential(self):
-        """Analyze how well player performs when behind (Comeback King Score)"""
+        """Analyze how well player performs when behind on gold at 15 minutes (Comeback King Score)"""
         if not self.matches:
             return None
 
-        comeback_games = 0
-        total_deficit_games = 0
-        biggest_comeback = None
-        max_comeback_gold = 0
+        match_frames = self.get_match_frames()
+        index = self.get_timeline_index()
 
+        tally = ComebackTally()
         for match in self.matches:
-            # Check if gold data is available
-            gold_at_15 = match.get('goldPerMinDeltas', {}).get('0-15', 0)
-            total_gold = match.get('goldEarned', 0)
-            game_duration = match.get('gameDuration', 0)
-            won = match.get('win', False)
-
-            # Rough estimate: if player had less than average gold at 15 min, they were behind
-            # Average is around 300-400 gold per minute in first 15 min
-            if gold_at_15 > 0 and gold_at_15 < 350:  # Behind threshold
-                total_deficit_games += 1
-                if won:
-                    comeback_games += 1
-                    deficit = 350 - gold_at_15
-                    if deficit > max_comeback_gold:
-                        max_comeback_gold = deficit
-                        biggest_comeback = match
-
-        comeback_rate = (comeback_games / total_deficit_games * 100) if total_deficit_games > 0 else 0
-
-        return {
-            'comeback_games': comeback_games,
-            'total_deficit_games': total_deficit_games,
-            'comeback_rate': round(comeback_rate, 1),
-            'biggest_comeback': biggest_comeback,
-            'comeback_score': min(100, round(comeback_rate * 1.2, 0))  # Boosted score
-        }
+            tally.add(match, match_frames.get(match.get('matchId')), index.player_id(match.get('matchId')))
+        return tally.result()
 
+    @analysis_section('power_spikes', version=2, inputs=('matches', 'timelines'))
     def analyze_power_spikes(self):
-        """Identify which game phases the player excels in (early/mid/late)"""
-        if not self.matches:
+        """Identify which game phases the player excels in (early/mid/late) from timeline data"""
+        match_frames = self.get_match_frames()
+        if not self.matches or not match_frames:
             return None
 
-        phase_stats = {
-            'early': {'kills': 0, 'deaths': 0, 'games': 0},  # 0-15 min
-            'mid': {'kills': 0, 'deaths': 0, 'games': 0},    # 15-25 min
-            'late': {'kills': 0, 'deaths': 0, 'games': 0}    # 25+ min
-        }
+        index = self.get_timeline_index()
 
-        for match in self.matches:
-            duration = match.get('gameDuration', 0)
-            kills = match.get('kills', 0)
-            deaths = match.get('deaths', 0)
-
-            # Estimate distribution (simplified - ideally would use timeline data)
-            if duration < 900:  # < 15 min (short game)
-                phase_stats['early']['kills'] += kills
-                phase_stats['early']['deaths'] += deaths
-                phase_stats['early']['games'] += 1
-            elif duration < 1500:  # 15-25 min
-                # Distribute between early and mid
-                phase_stats['early']['kills'] += kills * 0.4
-                phase_stats['early']['deaths'] += deaths * 0.4
-                phase_stats['mid']['kills'] += kills * 0.6
-                phase_stats['mid']['deaths'] += deaths * 0.6
-                phase_stats['mid']['games'] += 1
-            else:  # 25+ min
-                # Distribute across all phases
-                phase_stats['early']['kills'] += kills * 0.3
-                phase_stats['early']['deaths'] += deaths * 0.3
-                phase_stats['mid']['kills'] += kills * 0.35
-                phase_stats['mid']['deaths'] += deaths * 0.35
-                phase_stats['late']['kills'] += kills * 0.35
-                phase_stats['late']['deaths'] += deaths * 0.35
-                phase_stats['late']['games'] += 1
-
-        # Calculate KDA for each phase
-        for phase in ['early', 'mid', 'late']:
-            kills = phase_stats[phase]['kills']
-            deaths = max(phase_stats[phase]['deaths'], 1)
-            phase_stats[phase]['kda'] = round(kills / deaths, 2)
+        # Player's kills and deaths per match, by game minute
+        event_minutes = {'kills': defaultdict(list), 'deaths': defaultdict(list)}
+        for stat, field in (('kills', 'killerId'), ('deaths', 'victimId')):
+            for match_id, event in index.player_events('CHAMPION_KILL', field=field):
+                event_minutes[stat][match_id].append(event.get('timestamp', 0) / 60000)
 
-        # Determine best phase
-        best_phase = max(phase_stats.items(), key=lambda x: x[1]['kda'])
+        tally = PhaseTally()
+        for match_id, frames in match_frames.items():
+            tally.add(frames, index.player_id(match_id),
+                      event_minutes['kills'].get(match_id, ()), event_minutes['deaths'].get(match_id, ()))
+        return tally.result()
 
+    @analysis_section('objective_fights', inputs=('matches', 'timelines'))
+    def analyze_objective_fights(self):
+        """Kills and deaths around the dragon and baron pits, per game phase, from the spatial index"""
+        if not self.timelines:
+            return None
+
+        spatial_index = self.get_spatial_index()
+        participants = self.get_timeline_index().participants
+        if not any(participant_id is not None for participant_id in participants.values()):
+            return None
+
+        pits = {}
+        for pit in OBJECTIVE_PITS:
+            stats = {'kills': 0, 'deaths': 0, 'phases': {}}
+            for phase, start, end in GAME_PHASES:
+                phase_stats = {}
+                for stat, field in (('kills', 'killerId'), ('deaths', 'victimId')):
+                    phase_stats[stat] = spatial_index.count(pit, OBJECTIVE_RADIUS, event_types='CHAMPION_KILL',
+                                                            start_minute=start, end_minute=end,
+                                                            participants=participants, participant_field=field)
+                    stats[stat] += phase_stats[stat]
+                stats['phases'][phase] = phase_stats
+            stats['kd'] = round(stats['kills'] / max(stats['deaths'], 1), 2)
+            pits[pit] = stats
+
+        fights = sum(stats['kills'] + stats['deaths'] for stats in pits.values())
         return {
-            'phase_stats': phase_stats,
-            'best_phase': best_phase[0],
-            'best_phase_kda': best_phase[1]['kda']
+            'pits': pits,
+            'radius': OBJECTIVE_RADIUS,
+            'fights': fights,
+            # Pit where the player died most relative to their kills
+            'deadliest_pit': max(OBJECTIVE_PITS, key=lambda pit: pits[pit]['deaths'] - pits[pit]['kills']) if fights else None
         }
 
+    @analysis_section('objective_priority')
     def analyze_objective_priority(self):
         """Analyze dragon/baron participation and correlation with wins"""
         if not self.matches:
@@ -1826,13 +2207,15 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
             'is_objective_focused': objective_impact > 5
         }
 
+    @analysis_section('duo_synergy', version=2)
     def analyze_duo_synergy(self):
         """Identify best teammates/duo partners based on win rate"""
         if not self.matches:
             return None
 
-        # Track performance with each teammate
+        # Track performance with each teammate, by PUUID
         teammate_stats = {}
+        teammate_names = {}
 
         for match in self.matches:
             # Get teammates from match (this would need team data from API)
@@ -1846,9 +2229,11 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
             for teammate in teammates:
                 # Create a unique key from teammate data (teammate is a dict)
                 if isinstance(teammate, dict):
-                    teammate_key = f"{teammate.get('riotIdGameName', 'Unknown')}#{teammate.get('riotIdTagline', '')}"
+                    teammate_key = player_key(teammate)
+                    teammate_names.setdefault(teammate_key, riot_id(teammate, unknown='Unknown'))
                 else:
                     teammate_key = str(teammate)
+                    teammate_names.setdefault(teammate_key, teammate_key)
 
                 if teammate_key not in teammate_stats:
                     teammate_stats[teammate_key] = {'games': 0, 'wins': 0}
@@ -1863,7 +2248,7 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
             if stats['games'] >= 3:  # Minimum 3 games together
                 winrate = (stats['wins'] / stats['games'] * 100)
                 duo_partners.append({
-                    'name': teammate_key,
+                    'name': teammate_names[teammate_key],
                     'games': stats['games'],
                     'winrate': round(winrate, 1)
                 })
@@ -1875,49 +2260,26 @@ IMPORTANT: Only recommend champions that exist in League of Legends. Respond wit
             'has_consistent_duo': len([p for p in duo_partners if p['games'] >= 5]) > 0
         }
 
+    @analysis_section('tilt_factor')
     def analyze_tilt_factor(self):
         """Detect performance degradation after losses (mental fortitude)"""
         if not self.matches or len(self.matches) < 10:
             return None
 
-        # Sort matches by game creation time (oldest first)
-        sorted_matches = sorted(self.matches, key=lambda m: m.get('gameCreation', 0))
-
-        # Track performance after wins vs after losses
-        after_loss_stats = {'games': 0, 'wins': 0, 'total_kda': 0}
-        after_win_stats = {'games': 0, 'wins': 0, 'total_kda': 0}
-        loss_streaks = []
-        current_streak = 0
-        max_loss_streak = 0
+        # Matches ordered by game creation time (oldest first)
+        outcomes = self.get_outcomes('by_creation')
+        rows = outcomes.rows
 
-        prev_result = None
-        for match in sorted_matches:
-            won = match.get('win', False)
-            kda = (match.get('kills', 0) + match.get('assists', 0)) / max(match.get('deaths', 1), 1)
-
-            # Track stats based on previous game result
-            if prev_result is not None:
-                if prev_result == False:  # After a loss
-                    after_loss_stats['games'] += 1
-                    after_loss_stats['total_kda'] += kda
-                    if won:
-                        after_loss_stats['wins'] += 1
-                else:  # After a win
-                    after_win_stats['games'] += 1
-                    after_win_stats['total_kda'] += kda
-                    if won:
-                        after_win_stats['wins'] += 1
-
-            # Track loss streaks
-            if not won:
-                current_streak += 1
-                max_loss_streak = max(max_loss_streak, current_streak)
-            else:
-                if current_streak > 0:
-                    loss_streaks.append(current_streak)
-                current_streak = 0
+        # Performance after wins vs after losses
+        after_loss_stats = dict(zip(('games', 'wins'), outcomes.count_after(False)))
+        after_win_stats = dict(zip(('games', 'wins'), outcomes.count_after(True)))
+        after_loss_stats['total_kda'] = sum(rows[i]['kda'] for i in outcomes.positions_after(False))
+        after_win_stats['total_kda'] = sum(rows[i]['kda'] for i in outcomes.positions_after(True))
 
-            prev_result = won
+        # Loss streaks that a win ended, and the longest one overall
+        loss_streaks = [length for _, length in outcomes.streaks(False, closed=True)]
+        longest_loss = outcomes.longest_streak(False)
+        max_loss_streak = longest_loss[1] if longest_loss else 0
 
         # Calculate averages
         after_loss_kda = after_loss_stats['total_kda'] / after_loss_stats['games'] if after_loss_stats['games'] > 0 else 0
@@ -0,0 +1,269 @@
+"""
+Process pool for the CPU-bound year-in-review analysis
+analyze_all() is pure Python CPU work, so running it on the request thread
+holds the GIL (and the gunicorn worker) for the whole analysis. Large datasets
+are instead shipped to a pool of analysis processes sharing the machine's
+cores - as the raw JSON request body, since bytes pickle far faster than the
+parsed match and timeline dicts - and analyzed there while the request thread
+just waits for the result. The exact timeline sections of approximate analyses
+are computed there too, in the background.
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+from analysis_engine import NARRATIVE_SECTIONS, YearInReviewAnalyzer
+from analysis_sampling import ApproximateAnalyzer, approximate_sections
+from analysis_store import AnalysisStore
+from analysis_streaming import StreamingAnalyzer
+from match_record import expand_players
+from outcome_sequence import TILT_WINDOWS
+
+# Analysis processes per server process (0 = always analyze on the request thread). Every gunicorn
+# worker starts its own pool, so by default the cores are split between the WEB_CONCURRENCY workers
+# (gunicorn_config.py sets ANALYSIS_PROCESSES from its worker count)
+SERVER_PROCESSES = max(int(os.environ.get('WEB_CONCURRENCY', 1)), 1)
+ANALYSIS_PROCESSES = int(os.environ.get('ANALYSIS_PROCESSES', max((os.cpu_count() or 1) // SERVER_PROCESSES, 1)))
+
+# Seconds a request waits for its analysis in the pool (below gunicorn's 600s worker timeout)
+ANALYSIS_TIMEOUT = int(os.environ.get('ANALYSIS_TIMEOUT', 300))
+
+# Smaller histories analyze faster than the hop to another process costs
+OFFLOAD_MIN_MATCHES = int(os.environ.get('ANALYSIS_OFFLOAD_MIN_MATCHES', 100))
+
+
+class AnalysisTimeout(TimeoutError):
+    """An analysis didn't finish in the process pool within ANALYSIS_TIMEOUT"""
+
+
+_pool = None
+_pool_lock = Lock()
+
+# Dataset keys with an exact refine submitted from this process
+_refining = set()
+_refining_lock = Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver rather than fork - forking a threaded worker can deadlock the child
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['analysis_executor'])
+            _pool = ProcessPoolExecutor(max_workers=ANALYSIS_PROCESSES, mp_context=context)
+            print(f"[ANALYSIS POOL] Started pool of up to {ANALYSIS_PROCESSES} processes")
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def run_year_in_review(data, sections=None, include_narrative=True, store_root=None, approximate=False,
+                       tilt_windows=TILT_WINDOWS):
+    """
+    Analyze a year-in-review request body in this process
+
+    Args:
+        data: Parsed request body (matches, timelines, summonerName, region, puuid, optional player table)
+        sections: Section names to analyze (None = all)
+        include_narrative: Also generate the AI narrative
+        store_root: AnalysisStore directory for stored section results (None = no store)
+        approximate: Estimate heavy histories' timeline sections from a sample (needs a store, where
+            refine_year_in_review() puts the exact ones)
+        tilt_windows: Loss streak lengths for tilt detection (see outcome_sequence.parse_tilt_windows)
+
+    Returns:
+        (analysis, narrative) - narrative is None when not requested
+    """
+    matches = expand_players(data.get('matches', []), data.get('players'))
+    analyzer_class = ApproximateAnalyzer if approximate and store_root else YearInReviewAnalyzer
+    analyzer = analyzer_class(matches, data.get('summonerName', 'Summoner'), data.get('region', 'na1'),
+                              timelines=data.get('timelines', []), puuid=data.get('puuid'),
+                              store=AnalysisStore(store_root) if store_root else None, tilt_windows=tilt_windows)
+
+    # The Bedrock narrative is generated in the background while the analysis runs
+    analysis = analyzer.analyze_all(sections=sections, prefetch_narrative=include_narrative)
+    print(f"[YEAR-IN-REVIEW] ✅ Analysis complete!")
+
+    narrative = None
+    if include_narrative:
+        print(f"[YEAR-IN-REVIEW] Generating AI narrative...")
+        try:
+            narrative = analyzer.generate_ai_narrative(analyzer.get_narrative_inputs())
+            print(f"[YEAR-IN-REVIEW] ✅ AI narrative generated: {narrative[:100]}...")
+        except Exception as ai_error:
+            print(f"[YEAR-IN-REVIEW] ⚠️ AI narrative failed: {str(ai_error)}")
+            narrative = f"Had an incredible year with {len(matches)} games played!"
+
+    return analysis, narrative
+
+
+def refine_year_in_review(data, sections, store_root):
+    """
+    Compute estimated sections of an approximate analysis exactly and store them
+
+    Args:
+        data: Parsed request body, as for run_year_in_review()
+        sections: Section names to compute
+        store_root: AnalysisStore directory the exact results are read from
+    """
+    matches = expand_players(data.get('matches', []), data.get('players'))
+    analyzer = YearInReviewAnalyzer(matches, data.get('summonerName', 'Summoner'), data.get('region', 'na1'),
+                                    timelines=data.get('timelines', []), puuid=data.get('puuid'),
+                                    store=AnalysisStore(store_root))
+    for name in sections:
+        analyzer.get_section(name)  # Stored by _compute_section
+    print(f"[SAMPLING] ✅ Stored exact {', '.join(sections)}")
+
+
+def _run_from_body(body, sections, include_narrative, store_root, approximate, tilt_windows):
+    """Pool entry point - parses the request body in the analysis process"""
+    return run_year_in_review(json.loads(body), sections, include_narrative, store_root, approximate, tilt_windows)
+
+
+def _refine_from_body(body, sections, store_root):
+    """Pool entry point for refine_year_in_review()"""
+    refine_year_in_review(json.loads(body), sections, store_root)
+
+
+def _run_in_pool(function, *args):
+    """
+    function(*args) in the analysis pool, or None if the pool broke (the caller then runs it inline)
+
+    Raises:
+        AnalysisTimeout: No result within ANALYSIS_TIMEOUT - running it inline would only take longer
+    """
+    pool = _get_pool()
+    try:
+        future = pool.submit(function, *args)
+        return future.result(timeout=ANALYSIS_TIMEOUT)
+    except FutureTimeoutError:
+        # Still queued -> never starts; already running -> its result is dropped
+        future.cancel()
+        print(f"[ANALYSIS POOL] ❌ No result after {ANALYSIS_TIMEOUT}s, giving up")
+        raise AnalysisTimeout(f"Analysis took longer than {ANALYSIS_TIMEOUT}s")
+    except BrokenProcessPool:
+        # A crashed analysis process breaks the whole pool - start a fresh one next time
+        print("[ANALYSIS POOL] ⚠️ Process pool broke, analyzing on the request thread")
+        _discard_pool(pool)
+        return None
+
+
+def _submit_refine(body, refining, store_root):
+    """
+    Start refine_year_in_review() in the analysis pool without waiting for it
+
+    Args:
+        body: Raw JSON request body of the approximate analysis
+        refining: {estimated section name: dataset key}, from approximate_sections()
+        store_root: AnalysisStore directory
+    """
+    keys = set(refining.values())
+    with _refining_lock:
+        if keys & _refining:
+            print("[SAMPLING] Exact timeline sections already being computed")
+            return
+        _refining.update(keys)
+
+    def finished(future):
+        with _refining_lock:
+            _refining.difference_update(keys)
+        error = None if future.cancelled() else future.exception()
+        if isinstance(error, BrokenProcessPool):
+            _discard_pool(pool)
+        if error is not None:
+            print(f"[SAMPLING] ❌ Exact refine failed: {error}")
+
+    pool = _get_pool()
+    try:
+        future = pool.submit(_refine_from_body, body, list(refining), store_root)
+    except BrokenProcessPool:
+        print("[ANALYSIS POOL] ⚠️ Process pool broke, exact sections not computed")
+        _discard_pool(pool)
+        with _refining_lock:
+            _refining.difference_update(keys)
+        return
+    future.add_done_callback(finished)
+    print(f"[SAMPLING] Computing exact {', '.join(refining)} in the process pool...")
+
+
+def analyze_year_in_review(data, body, sections=None, include_narrative=True, store_root=None, approximate=False,
+                           tilt_windows=TILT_WINDOWS):
+    """
+    Run the year-in-review analysis in the process pool (or inline for small histories)
+
+    Args:
+        data: Parsed request body, used for the inline path and sizing
+        body: Raw JSON request body, shipped to the pool
+        sections, include_narrative, store_root, tilt_windows: As for run_year_in_review()
+        approximate: As for run_year_in_review(); the estimated sections are then computed exactly
+            in the pool in the background (ignored without a pool or store)
+
+    Returns:
+        (analysis, narrative)
+    """
+    approximate = approximate and ANALYSIS_PROCESSES > 0 and store_root is not None
+    result = None
+    if ANALYSIS_PROCESSES > 0 and len(data.get('matches', [])) >= OFFLOAD_MIN_MATCHES:
+        print(f"[ANALYSIS POOL] Analyzing {len(data.get('matches', []))} matches in the process pool...")
+        result = _run_in_pool(_run_from_body, body, sections, include_narrative, store_root, approximate, tilt_windows)
+    if result is None:
+        result = run_year_in_review(data, sections, include_narrative, store_root, approximate, tilt_windows)
+
+    refining = approximate_sections(result[0]) if approximate else None
+    if refining:
+        _submit_refine(body, refining, store_root)
+    return result
+
+
+def stream_year_in_review(history, summoner_name, region, sections=None, include_narrative=True, store_root=None):
+    """
+    Analyze a player's cached history in this process, one game in memory at a time
+
+    Args:
+        history: CachedMatchHistory
+        summoner_name, region: The player's Riot ID and platform
+        sections: Section names to analyze (None = every section StreamingAnalyzer supports)
+        include_narrative: Also generate the AI narrative
+        store_root: AnalysisStore directory for stored section results (None = no store)
+
+    Returns:
+        (analysis, narrative) - narrative is None when not requested
+    """
+    analyzer = StreamingAnalyzer(history, summoner_name, region,
+                                 store=AnalysisStore(store_root) if store_root else None)
+    # The narrative's input sections are folded in the same pass
+    names = sections
+    if sections is not None and include_narrative:
+        names = list(sections) + [name for name in NARRATIVE_SECTIONS if name not in sections]
+    results = analyzer.analyze_all(sections=names)
+    analysis = results if sections is None else {name: results[name] for name in sections}
+    print(f"[YEAR-IN-REVIEW] ✅ Streaming analysis complete!")
+
+    narrative = None
+    if include_narrative:
+        print(f"[YEAR-IN-REVIEW] Generating AI narrative...")
+        narrative = analyzer.generate_ai_narrative({name: results[name] for name in NARRATIVE_SECTIONS})
+    return analysis, narrative
+
+
+def analyze_cached_year_in_review(history, summoner_name, region, sections=None, include_narrative=True,
+                                  store_root=None):
+    """stream_year_in_review() in the process pool (or inline for small histories)"""
+    if ANALYSIS_PROCESSES > 0 and len(history) >= OFFLOAD_MIN_MATCHES:
+        print(f"[ANALYSIS POOL] Streaming {len(history)} cached matches in the process pool...")
+        result = _run_in_pool(stream_year_in_review, history, summoner_name, region, sections,
+                              include_narrative, store_root)
+        if result is not None:
+            return result
+
+    return stream_year_in_review(history, summoner_name, region, sections, include_narrative, store_root)
@@ -0,0 +1,77 @@
+"""
+Lean year-in-review responses
+A few sections keep whole processed match rows or per-kill lists in their
+results, because that's what the analysis store and the narrative work with.
+The slides only show a handful of fields of them, so the response replaces
+embedded matches with references (matchId plus the displayed fields) and drops
+lists no slide reads. Clients that need the full results ask for them with the
+`expand` parameter, per section or 'all'.
+"""
+
+# Fields of an embedded match kept in its reference
+MATCH_REF_FIELDS = ('matchId', 'championName', 'gameCreation', 'gameDuration', 'kills', 'deaths', 'assists', 'win')
+
+EXPAND_ALL = 'all'
+
+
+def match_ref(match):
+    """Reference to a processed match row: its matchId and the fields slides display"""
+    if match is None:
+        return None
+    return {field: match.get(field) for field in MATCH_REF_FIELDS if field in match}
+
+
+def _lean_pentakill_breaker(result):
+    return {**result, 'games': [match_ref(match) for match in result.get('games', [])]}
+
+
+def _lean_comeback_potential(result):
+    return {**result, 'biggest_comeback': match_ref(result.get('biggest_comeback'))}
+
+
+def _lean_kill_steals(result):
+    # Every kill's damage share - only its average is shown
+    return {key: value for key, value in result.items() if key != 'damage_contributions'}
+
+
+def _lean_build_comparison(result):
+    # Items of every game on the champion - the slide shows the most common ones and the game count
+    return {key: value for key, value in result.items() if key != 'player_builds'}
+
+
+# {section name: function(full result) -> lean result}, only applied to non-None results
+LEAN_VIEWS = {
+    'pentakill_breaker': _lean_pentakill_breaker,
+    'comeback_potential': _lean_comeback_potential,
+    'kill_steals': _lean_kill_steals,
+    'build_comparison': _lean_build_comparison,
+}
+
+
+def parse_expand(value):
+    """
+    The `expand` request parameter as a set of section names
+
+    Accepts a list of names or a comma-separated string; 'all' expands every section.
+
+    Raises:
+        ValueError: Neither a list nor a string
+    """
+    if value is None:
+        return set()
+    if isinstance(value, str):
+        value = [name.strip() for name in value.split(',') if name.strip()]
+    if not isinstance(value, list):
+        raise ValueError('expand must be a list of section names')
+    return set(value)
+
+
+def lean_analysis(analysis, expand=()):
+    """Analysis results with embedded matches replaced by references, except for the expanded sections"""
+    if EXPAND_ALL in expand:
+        return analysis
+    lean = {}
+    for name, result in analysis.items():
+        view = LEAN_VIEWS.get(name)
+        lean[name] = view(result) if view is not None and result is not None and name not in expand else result
+    return lean
@@ -0,0 +1,281 @@
+"""
+Approximate timeline sections from a stratified sample of games
+The timeline sections (kill steals, comeback potential, power spikes) index
+every event and per-minute frame of every timeline, which for players with
+hundreds of games is most of the year-in-review's time. In approximate mode
+they're first estimated from a sample of the player's games instead: stratified
+by month (proportional allocation, at least two games per month), and within a
+month spread across champions by a systematic pick over the games sorted by
+champion. Rates and averages are stratified ratio estimates returned with 95%
+confidence intervals, and the exact sections are computed in the analysis
+process pool and stored in the AnalysisStore under the dataset key each
+estimate carries, where the client picks them up.
+"""
+import math
+import os
+import random
+from collections import defaultdict
+
+from analysis_engine import GAME_PHASES, SECTION_REGISTRY, YearInReviewAnalyzer
+from damage_attribution import KILL_STEAL_SHARE
+from analysis_streaming import TIMELINE_SECTIONS, TimelineAccumulators
+
+# Games whose timelines are analyzed for the estimates
+SAMPLE_GAMES = int(os.environ.get('TIMELINE_SAMPLE_GAMES', 60))
+
+# Below this many timelines the exact sections are fast enough
+SAMPLE_MIN_TIMELINES = int(os.environ.get('TIMELINE_SAMPLE_MIN_TIMELINES', 150))
+
+# Two-sided 95% normal quantile
+CONFIDENCE = 0.95
+Z_SCORE = 1.96
+
+PHASE_STATS = ('kills', 'deaths', 'games', 'minutes', 'gold', 'xp', 'cs')
+
+
+def stratified_sample(rows, size, seed):
+    """
+    Stratified sample of match feature rows
+
+    Args:
+        rows: MatchFeatureTable rows of the games with timelines
+        size: Games to sample (every game when there are fewer)
+        seed: Seed for the systematic starts, so the same history always gets the same sample
+
+    Returns:
+        [(stratum size, sampled rows)] per month
+    """
+    months = defaultdict(list)
+    for row in rows:
+        months[row['month']].append(row)
+
+    # Proportional allocation, at least two per month so each has a variance estimate
+    total = len(rows)
+    allocation = {month: min(len(games), max(2, round(size * len(games) / total))) for month, games in months.items()}
+
+    rng = random.Random(seed)
+    strata = []
+    for month in sorted(months):
+        games = sorted(months[month], key=lambda row: (row['champion'] or '', row['creation']))
+        picks = allocation[month]
+        step = len(games) / picks
+        start = rng.random() * step
+        strata.append((len(games), [games[int(start + i * step)] for i in range(picks)]))
+    return strata
+
+
+def ratio_estimate(strata, numerator, denominator, scale=1):
+    """
+    Stratified ratio estimate of sum(numerator) / sum(denominator) over all games, with its confidence interval
+
+    Args:
+        strata: [(stratum size, [per-game totals])]
+        numerator, denominator: Keys of the per-game totals
+        scale: Multiplier for the estimate and bounds (100 for percentages)
+
+    Returns:
+        (estimate, low, high), or (None, None, None) when no sampled game has a denominator
+    """
+    y_total = sum(size / len(units) * sum(unit[numerator] for unit in units) for size, units in strata)
+    x_total = sum(size / len(units) * sum(unit[denominator] for unit in units) for size, units in strata)
+    if x_total <= 0:
+        return None, None, None
+    ratio = y_total / x_total
+
+    # Linearized variance; months with a single sampled game borrow the pooled within-month variance
+    variances = []
+    for size, units in strata:
+        residuals = [unit[numerator] - ratio * unit[denominator] for unit in units]
+        if len(residuals) > 1:
+            mean = sum(residuals) / len(residuals)
+            variances.append(sum((r - mean) ** 2 for r in residuals) / (len(residuals) - 1))
+        else:
+            variances.append(None)
+    degrees = sum(len(units) - 1 for _, units in strata)
+    pooled = sum(v * (len(units) - 1) for v, (_, units) in zip(variances, strata) if v is not None) / degrees if degrees else 0
+
+    variance = sum(size ** 2 * (1 - len(units) / size) * (pooled if v is None else v) / len(units)
+                   for v, (size, units) in zip(variances, strata)) / x_total ** 2
+    margin = Z_SCORE * math.sqrt(variance)
+    return ratio * scale, (ratio - margin) * scale, (ratio + margin) * scale
+
+
+def estimate_total(strata, key):
+    """Stratified estimate of sum(key) over all games"""
+    return sum(size / len(units) * sum(unit[key] for unit in units) for size, units in strata)
+
+
+def _game_totals(accumulators, before):
+    """Per-game totals: the TimelineAccumulators counters added by the last game"""
+    kills = accumulators.kill_blocks[-1] if accumulators.timelines > before['timelines'] else []
+    assists = accumulators.assist_blocks[-1] if accumulators.timelines > before['timelines'] else []
+    comebacks = accumulators.comebacks
+    totals = {
+        'kills': len(kills),
+        'steals': sum(1 for kill in kills if kill[4] < KILL_STEAL_SHARE),
+        'contribution': sum(kill[4] for kill in kills),
+        'solo_kills': accumulators.solo_kills - before['solo_kills'],
+        'assists': len(assists),
+        'assist_share': sum(assists),
+        'deficit_games': comebacks.total_deficit_games - before['deficit_games'],
+        'comebacks': comebacks.comeback_games - before['comebacks'],
+        'leads': len(comebacks.leads_at_15) - before['leads'],
+        'lead_sum': sum(comebacks.leads_at_15[before['leads']:]),
+    }
+    for phase, stats in accumulators.phases.phase_stats.items():
+        for stat in PHASE_STATS:
+            totals[f'{phase}_{stat}'] = stats[stat] - before[f'{phase}_{stat}']
+    return totals
+
+
+def _counters(accumulators):
+    counters = {
+        'timelines': accumulators.timelines,
+        'solo_kills': accumulators.solo_kills,
+        'deficit_games': accumulators.comebacks.total_deficit_games,
+        'comebacks': accumulators.comebacks.comeback_games,
+        'leads': len(accumulators.comebacks.leads_at_15),
+    }
+    for phase, stats in accumulators.phases.phase_stats.items():
+        for stat in PHASE_STATS:
+            counters[f'{phase}_{stat}'] = stats[stat]
+    return counters
+
+
+def _interval(low, high, digits):
+    return [round(low, digits), round(high, digits)] if low is not None else None
+
+
+class TimelineSample:
+    """Timeline sections estimated from a stratified sample of a player's games"""
+
+    def __init__(self, analyzer, size=SAMPLE_GAMES):
+        timelines = {t.get('match_id'): t.get('timeline') for t in analyzer.timelines}
+        rows = [row for row in analyzer.get_features() if row['match'].get('matchId') in timelines]
+        self.population = len(rows)
+        self.strata = stratified_sample(rows, size, analyzer.dataset_key(('matches', 'timelines')))
+        self.games = sum(len(sampled) for _, sampled in self.strata)
+
+        # Folded oldest first like the streaming analyzer; each game's counters become its totals
+        self.accumulators = TimelineAccumulators()
+        totals = {}
+        for row in sorted((row for _, sampled in self.strata for row in sampled), key=lambda row: row['creation']):
+            before = _counters(self.accumulators)
+            self.accumulators.add(row['match'], timelines[row['match'].get('matchId')], analyzer.puuid)
+            totals[id(row)] = _game_totals(self.accumulators, before)
+        self.units = [(size, [totals[id(row)] for row in sampled]) for size, sampled in self.strata]
+        print(f"[SAMPLING] Analyzed {self.games}/{self.population} timelines in {len(self.strata)} months")
+
+    def _approximate(self, result, intervals):
+        result['approximate'] = {'games': self.games, 'of': self.population, 'confidence': CONFIDENCE}
+        result['confidence_intervals'] = intervals
+        return result
+
+    def section(self, name):
+        """Estimated result of one of TIMELINE_SECTIONS, shaped like the exact one plus 'approximate' and 'confidence_intervals'"""
+        result = self.accumulators.section(name)
+        if result is None:
+            return None
+        units = self.units
+
+        if name == 'kill_steals':
+            intervals = {}
+            for metric, numerator, denominator, scale in (('kill_steal_rate', 'steals', 'kills', 100),
+                                                          ('solo_kill_rate', 'solo_kills', 'kills', 100),
+                                                          ('average_damage_contribution', 'contribution', 'kills', 1),
+                                                          ('assist_quality', 'assist_share', 'assists', 1)):
+                estimate, low, high = ratio_estimate(units, numerator, denominator, scale)
+                result[metric] = round(estimate, 1) if estimate is not None else 0
+                intervals[metric] = _interval(low, high, 1)
+            for field, key in (('total_kills', 'kills'), ('kill_steals', 'steals'),
+                               ('solo_kills', 'solo_kills'), ('assists_analyzed', 'assists')):
+                result[field] = round(estimate_total(units, key))
+            return self._approximate(result, intervals)
+
+        if name == 'comeback_potential':
+            rate, low, high = ratio_estimate(units, 'comebacks', 'deficit_games', 100)
+            lead, lead_low, lead_high = ratio_estimate(units, 'lead_sum', 'leads')
+            result['comeback_rate'] = round(rate, 1) if rate is not None else 0
+            result['comeback_score'] = min(100, round(result['comeback_rate'] * 1.2, 0))
+            result['avg_gold_lead_at_15'] = round(lead) if lead is not None else 0
+            result['comeback_games'] = round(estimate_total(units, 'comebacks'))
+            result['total_deficit_games'] = round(estimate_total(units, 'deficit_games'))
+            return self._approximate(result, {
+                'comeback_rate': _interval(low, high, 1),
+                'avg_gold_lead_at_15': _interval(lead_low, lead_high, 0)
+            })
+
+        if name == 'power_spikes':
+            intervals = {}
+            for phase, _, _ in GAME_PHASES:
+                stats = result['phase_stats'][phase]
+                phase_intervals = intervals[phase] = {}
+                kda, low, high = ratio_estimate(units, f'{phase}_kills', f'{phase}_deaths')
+                if kda is None:
+                    # No sampled deaths - same as the exact kills / max(deaths, 1)
+                    kda = low = high = estimate_total(units, f'{phase}_kills')
+                stats['kda'] = round(kda, 2)
+                phase_intervals['kda'] = _interval(low, high, 2)
+                for stat in ('gold', 'xp', 'cs'):
+                    per_min, low, high = ratio_estimate(units, f'{phase}_{stat}', f'{phase}_minutes')
+                    stats[f'{stat}_per_min'] = round(per_min, 1) if per_min is not None else 0
+                    phase_intervals[f'{stat}_per_min'] = _interval(low, high, 1)
+                for stat in ('kills', 'deaths', 'games'):
+                    stats[stat] = round(estimate_total(units, f'{phase}_{stat}'))
+            best_phase = max(result['phase_stats'].items(), key=lambda x: x[1]['kda'])
+            result['best_phase'] = best_phase[0]
+            result['best_phase_kda'] = best_phase[1]['kda']
+            return self._approximate(result, intervals)
+
+        raise ValueError(f"Not a timeline section: {name}")
+
+
+class ApproximateAnalyzer(YearInReviewAnalyzer):
+    """
+    YearInReviewAnalyzer that estimates the timeline sections from a sample of a heavy player's games
+
+    Stored exact results are still used when there are any; estimated sections are listed in
+    `estimated` and carry the dataset key their exact results will be stored under, for
+    analysis_executor to compute them in the process pool.
+    """
+
+    def __init__(self, *args, sample_games=SAMPLE_GAMES, min_timelines=SAMPLE_MIN_TIMELINES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sample_games = sample_games
+        self.min_timelines = min_timelines
+        self.estimated = []
+
+    def invalidate(self):
+        super().invalidate()
+        self._sample = None
+
+    def get_sample(self):
+        """The TimelineSample of this history, built once per analyzer"""
+        if self._sample is None:
+            self._sample = TimelineSample(self, self.sample_games)
+        return self._sample
+
+    def _compute_section(self, section, method):
+        name = section['name']
+        if name not in TIMELINE_SECTIONS or len(self.timelines) < self.min_timelines:
+            return super()._compute_section(section, method)
+
+        if self.store is not None:
+            found, result = self.store.get(self.dataset_key(section['inputs']), name, section['version'],
+                                           max_age=section['max_age'])
+            if found:
+                print(f"[ANALYSIS STORE] Reusing {name} v{section['version']}")
+                return result
+
+        print(f"[SAMPLING] Estimating {name} from a sample of {len(self.timelines)} timelines...")
+        self.estimated.append(name)
+        result = self.get_sample().section(name)
+        if result is not None:
+            result['approximate']['dataset_key'] = self.dataset_key(section['inputs'])
+        return result
+
+
+def approximate_sections(analysis):
+    """Sections in an analysis result that are still estimates, as {name: dataset key of the exact result}"""
+    return {name: result['approximate']['dataset_key'] for name, result in analysis.items()
+            if name in SECTION_REGISTRY and isinstance(result, dict) and result.get('approximate')}
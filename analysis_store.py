@@ -0,0 +1,204 @@
+"""
+Persistent store for YearInReviewAnalyzer section results
+Results are keyed by dataset hash, section name and section version and kept on
+disk so every endpoint and every gunicorn worker can reuse them. Incremental
+accumulators are kept alongside, one file per player. Datasets and accumulators
+nobody has used for a while are pruned.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from threading import Lock
+
+# Datasets and accumulators unused for this long are deleted
+STORE_MAX_AGE = int(os.environ.get('ANALYSIS_STORE_MAX_AGE', 7 * 24 * 3600))
+# Beyond this many datasets the least recently used ones are deleted
+STORE_MAX_DATASETS = int(os.environ.get('ANALYSIS_STORE_MAX_DATASETS', 5000))
+# Each process sweeps the store at most this often
+PRUNE_INTERVAL = 3600
+
+PLAYERS_DIR = 'players'
+
+DATASET_KEY_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+# Last sweep per store root in this process - stores are created per request, so not per instance
+_last_prune = {}
+_prune_lock = Lock()
+
+
+def match_digest(data):
+    """Hash of a match or timeline's contents, so edited games never share a key with the originals"""
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def compute_dataset_key(identity, entries):
+    """
+    Stable hash of a dataset: player identity (PUUID or Riot ID) plus the set of its entries
+
+    Entries from request bodies must include each game's match_digest - anyone can post a body
+    claiming another player's match IDs. Plain match IDs are only safe for data read from the
+    server-side API cache.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{identity}|".encode())
+    hasher.update(','.join(sorted(set(str(e) for e in entries))).encode())
+    return hasher.hexdigest()[:32]
+
+
+def is_dataset_key(value):
+    """Whether a client-supplied value is a compute_dataset_key() result (and so safe in a store path)"""
+    return isinstance(value, str) and DATASET_KEY_PATTERN.fullmatch(value) is not None
+
+
+class AnalysisStore:
+    """Filesystem-backed memo of analysis results: <root>/<dataset_key>/<section>.v<version>.json"""
+
+    def __init__(self, root, max_age=STORE_MAX_AGE, max_datasets=STORE_MAX_DATASETS):
+        self.root = root
+        self.max_age = max_age
+        self.max_datasets = max_datasets
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, dataset_key, section, version):
+        return os.path.join(self.root, dataset_key, f"{section}.v{version}.json")
+
+    def _player_path(self, puuid):
+        player_key = hashlib.sha256(puuid.encode()).hexdigest()[:32]
+        return os.path.join(self.root, PLAYERS_DIR, f"{player_key}.json")
+
+    def _touch(self, path):
+        """Mark a dataset or accumulator file as used, so pruning keeps it"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _read_json(self, path):
+        try:
+            with open(path, 'r') as f:
+                return True, json.load(f)
+        except FileNotFoundError:
+            return False, None
+        except (OSError, ValueError) as e:
+            print(f"[ANALYSIS STORE] Failed to read {path}: {e}")
+            return False, None
+
+    def _write_json(self, path, data):
+        """Write atomically, so concurrent workers never see partial files"""
+        directory = os.path.dirname(path)
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(data))  # dumps uses the C encoder, dump doesn't
+            os.replace(tmp_path, path)
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[ANALYSIS STORE] Failed to save {path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def get(self, dataset_key, section, version, max_age=None):
+        """
+        Look up a stored section result
+
+        Returns:
+            (found, result) tuple - result may legitimately be None, so check `found`
+        """
+        path = self._path(dataset_key, section, version)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                print(f"[ANALYSIS STORE] Expired {section} v{version} for {dataset_key}")
+                return False, None
+        except FileNotFoundError:
+            return False, None
+        found, result = self._read_json(path)
+        if found:
+            self._touch(os.path.dirname(path))
+        return found, result
+
+    def put(self, dataset_key, section, version, result):
+        """Save a section result"""
+        self._write_json(self._path(dataset_key, section, version), result)
+        self._maybe_prune()
+
+    def get_accumulators(self, puuid):
+        """Saved MatchAccumulators state for a player, or None"""
+        path = self._player_path(puuid)
+        found, state = self._read_json(path)
+        if found:
+            self._touch(path)
+        return state if found else None
+
+    def put_accumulators(self, puuid, state):
+        """Save a player's MatchAccumulators state"""
+        self._write_json(self._player_path(puuid), state)
+        self._maybe_prune()
+
+    # ---- Eviction ----
+
+    def _maybe_prune(self):
+        now = time.time()
+        with _prune_lock:
+            if now - _last_prune.get(self.root, 0) < PRUNE_INTERVAL:
+                return
+            _last_prune[self.root] = now
+        self.prune()
+
+    def prune(self):
+        """
+        Delete datasets and accumulators unused for max_age, then the least recently used
+        datasets beyond max_datasets
+
+        Returns:
+            Number of datasets and accumulator files deleted
+        """
+        now = time.time()
+        removed = 0
+        datasets = []
+        for entry in self._scan(self.root):
+            if entry.name == PLAYERS_DIR or not entry.is_dir():
+                continue
+            try:
+                used = entry.stat().st_mtime
+            except OSError:
+                continue
+            if now - used > self.max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+            else:
+                datasets.append((used, entry.path))
+
+        datasets.sort()
+        for _, path in datasets[:max(len(datasets) - self.max_datasets, 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+
+        for entry in self._scan(os.path.join(self.root, PLAYERS_DIR)):
+            try:
+                if now - entry.stat().st_mtime > self.max_age:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+
+        if removed:
+            print(f"[ANALYSIS STORE] Pruned {removed} unused datasets and accumulators")
+        return removed
+
+    def _scan(self, directory):
+        try:
+            with os.scandir(directory) as entries:
+                return list(entries)
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            print(f"[ANALYSIS STORE] Failed to scan {directory}: {e}")
+            return []
@@ -0,0 +1,202 @@
+"""
+Streaming year-in-review analysis over a player's cached match history
+YearInReviewAnalyzer works on the full match and timeline lists posted by the
+browser, which for heavy players is hundreds of MB per request. The streaming
+analyzer instead reads one game (match + timeline) at a time from the API
+cache, folds it into one-pass accumulators and drops it, so peak memory stays
+flat however many games a player has. Sections that can't be folded one game at
+a time (the OP.GG build comparison) aren't available in this mode.
+"""
+import boto3
+
+from analysis_accumulators import MatchAccumulators, SECTIONS as ACCUMULATED_SECTIONS
+from analysis_engine import (SECTION_REGISTRY, ComebackTally, PhaseTally, attribute_player_damage,
+                             request_narrative, resolve_sections, summarize_kill_steals)
+from analysis_store import compute_dataset_key
+from population_baselines import PercentileTally, baselines_fingerprint, get_baselines
+from timeline_frames import MatchFrames
+from timeline_index import TimelineIndex
+
+# Timeline sections folded one game at a time by TimelineAccumulators
+TIMELINE_SECTIONS = ('kill_steals', 'comeback_potential', 'power_spikes')
+
+# Sections folded by a PercentileTally over the population baselines
+BASELINE_SECTIONS = ('population_percentiles',)
+
+# Everything the streaming analyzer can compute, in registry order
+STREAMING_SECTIONS = tuple(name for name in SECTION_REGISTRY
+                           if name in ACCUMULATED_SECTIONS or name in TIMELINE_SECTIONS or name in BASELINE_SECTIONS)
+
+# Stored next to the sections: the player's record, which the narrative prompt needs
+RECORD_KEY = ('record', 1)
+
+
+class TimelineAccumulators:
+    """Running kill_steals, comeback_potential and power_spikes state over games added oldest first"""
+
+    def __init__(self):
+        self.timelines = 0
+        self.frames = 0
+        # Per-game kill attributions, oldest first - reversed at the end to the analyzer's most-recent-first order
+        self.kill_blocks = []
+        self.assist_blocks = []
+        self.solo_kills = 0
+        self.comebacks = ComebackTally(oldest_first=True)
+        self.phases = PhaseTally()
+
+    def add(self, match, timeline, puuid=None):
+        """Fold in one game's timeline (the processed match row resolves the player and the result)"""
+        if not timeline or 'info' not in timeline:
+            return
+        match_id = match.get('matchId')
+        index = TimelineIndex()
+        index.add_timeline(match_id, timeline, puuid, match)
+        participant_id = index.player_id(match_id)
+        self.timelines += 1
+
+        attribution = attribute_player_damage(index)
+        self.kill_blocks.append(attribution['kills'])
+        self.assist_blocks.append(attribution['assist_shares'])
+        self.solo_kills += attribution['solo_kills']
+
+        # Not via the per-process frame cache: a streamed history would just churn it
+        frames = MatchFrames(match_id, timeline)
+        self.frames += 1
+        self.comebacks.add(match, frames, participant_id)
+        kill_minutes = [event.get('timestamp', 0) / 60000
+                        for _, event in index.player_events('CHAMPION_KILL', field='killerId')]
+        death_minutes = [event.get('timestamp', 0) / 60000
+                         for _, event in index.player_events('CHAMPION_KILL', field='victimId')]
+        self.phases.add(frames, participant_id, kill_minutes, death_minutes)
+
+    def section(self, name):
+        """Result of one of TIMELINE_SECTIONS"""
+        if name == 'kill_steals':
+            if not self.timelines:
+                return None
+            return summarize_kill_steals({
+                'kills': [kill for block in reversed(self.kill_blocks) for kill in block],
+                'solo_kills': self.solo_kills,
+                'assist_shares': [share for block in reversed(self.assist_blocks) for share in block]
+            })
+        if name == 'comeback_potential':
+            return self.comebacks.result()
+        if name == 'power_spikes':
+            return self.phases.result() if self.frames else None
+        raise ValueError(f"Not a timeline section: {name}")
+
+
+class StreamingAnalyzer:
+    """Year-in-review sections computed in a single pass over a CachedMatchHistory"""
+
+    def __init__(self, history, summoner_name, region, store=None):
+        self.history = history
+        self.summoner_name = summoner_name
+        self.region = region
+        self.puuid = history.puuid
+        self.store = store  # Optional AnalysisStore, shared with YearInReviewAnalyzer
+        self.bedrock_client = boto3.client('bedrock-runtime', region_name='eu-central-1')
+        self.record = None  # (games, wins)
+
+    def dataset_key(self, inputs=('matches',)):
+        """
+        Hash of the cached games a section reads
+
+        Match IDs alone are enough here: the history is read from the server-side API cache, so
+        nobody can pair them with forged contents. YearInReviewAnalyzer hashes request-body
+        contents instead, so the two paths never share (or overwrite) each other's results.
+        """
+        match_ids = list(self.history.match_ids)
+        if 'timelines' in inputs:
+            match_ids += [f"timeline:{match_id}" for match_id in self.history.timeline_ids]
+        if 'baselines' in inputs:
+            match_ids.append(f"baselines:{baselines_fingerprint()}")
+        return compute_dataset_key(self.puuid, match_ids)
+
+    def analyze_all(self, sections=None):
+        """
+        Run the requested sections (all of STREAMING_SECTIONS by default)
+
+        Stored results are reused; everything else is computed in one pass over the history.
+
+        Raises:
+            ValueError: Unknown section, or one that can't be computed while streaming
+        """
+        requested = list(dict.fromkeys(STREAMING_SECTIONS if sections is None else sections))
+        unsupported = [name for name in resolve_sections(requested) if name not in STREAMING_SECTIONS]
+        if unsupported:
+            raise ValueError(f"Sections not available when analyzing from the cache: {', '.join(unsupported)}")
+
+        results = {}
+        missing = []
+        for name in requested:
+            found, result = self._get_stored(name)
+            if found:
+                print(f"[ANALYSIS STORE] Reusing {name} v{SECTION_REGISTRY[name]['version']}")
+                results[name] = result
+            else:
+                missing.append(name)
+
+        if missing:
+            results.update(self._stream(missing))
+        return {name: results[name] for name in requested}
+
+    def _get_stored(self, name):
+        if self.store is None:
+            return False, None
+        section = SECTION_REGISTRY[name]
+        return self.store.get(self.dataset_key(section['inputs']), name, section['version'], max_age=section['max_age'])
+
+    def _stream(self, names):
+        """Compute sections in one pass over the history, one game in memory at a time"""
+        with_timelines = any(name in TIMELINE_SECTIONS for name in names)
+        accumulators = MatchAccumulators() if any(name in ACCUMULATED_SECTIONS for name in names) else None
+        timeline_accumulators = TimelineAccumulators() if with_timelines else None
+        baselines = get_baselines() if any(name in BASELINE_SECTIONS for name in names) else None
+        percentiles = PercentileTally(baselines) if baselines is not None else None
+        print(f"[STREAMING] Analyzing {len(self.history)} cached games ({len(names)} sections, "
+              f"timelines: {with_timelines})...")
+
+        games = wins = 0
+        for match, timeline in self.history.games(timelines=with_timelines):
+            games += 1
+            wins += 1 if match['win'] else 0
+            if accumulators is not None:
+                accumulators.add(match)
+            if timeline_accumulators is not None:
+                timeline_accumulators.add(match, timeline, self.puuid)
+            if percentiles is not None:
+                percentiles.add(match)
+        self.record = (games, wins)
+        print(f"[STREAMING] ✅ Folded in {games} games")
+
+        results = {}
+        for name in names:
+            if name in TIMELINE_SECTIONS:
+                results[name] = timeline_accumulators.section(name)
+            elif name in BASELINE_SECTIONS:
+                results[name] = percentiles.result() if percentiles is not None and games else None
+            else:
+                results[name] = accumulators.section(name)
+
+        if self.store is not None:
+            for name, result in results.items():
+                section = SECTION_REGISTRY[name]
+                self.store.put(self.dataset_key(section['inputs']), name, section['version'], result)
+            self.store.put(self.dataset_key(), *RECORD_KEY, list(self.record))
+        return results
+
+    def get_record(self):
+        """(games, wins) of the analyzed history"""
+        if self.record is None and self.store is not None:
+            found, record = self.store.get(self.dataset_key(), *RECORD_KEY)
+            if found:
+                self.record = tuple(record)
+        if self.record is None:
+            self._stream([])
+        return self.record
+
+    def generate_ai_narrative(self, analysis_data):
+        """Generate the AI narrative for the streamed history (see request_narrative())"""
+        games, wins = self.get_record()
+        return request_narrative(self.bedrock_client, self.summoner_name, games, wins, analysis_data)
@@ -0,0 +1,125 @@
+"""
+Filesystem cache of Riot API responses
+Match details and timelines never change once a game is over, so every API
+response is kept on disk as <md5 of URL + headers>.json. Shared by the web
+endpoints and the analysis processes, which read cached matches straight from
+disk instead of receiving them in request bodies.
+"""
+import hashlib
+import json
+import os
+import time
+
+from json_response import RawJSON
+
+# Filesystem cache configuration
+CACHE_DIR = os.path.join(os.path.dirname(__file__), 'api_cache')
+CACHE_DURATION = 31536000  # 1 year cache (365 days) - match data never changes!
+
+# Create cache directory if it doesn't exist
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR)
+    print(f"[CACHE] Created cache directory: {CACHE_DIR}")
+
+def get_cache_key(url, params=None):
+    """Generate cache key from URL and params"""
+    cache_string = url
+    if params:
+        cache_string += json.dumps(params, sort_keys=True)
+    return hashlib.md5(cache_string.encode()).hexdigest()
+
+def get_from_cache(cache_key):
+    """Get data from filesystem cache"""
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    if os.path.exists(cache_file):
+        # Check if cache is still valid
+        file_age = time.time() - os.path.getmtime(cache_file)
+        if file_age < CACHE_DURATION:
+            with open(cache_file, 'r') as f:
+                print(f"[CACHE] Cache HIT for {cache_key}")
+                return json.load(f)
+        else:
+            print(f"[CACHE] Cache EXPIRED for {cache_key}")
+    return None
+
+def get_raw_from_cache(cache_key):
+    """Get undecoded JSON bytes from filesystem cache (for payloads passed through to the client as-is)"""
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    if os.path.exists(cache_file):
+        file_age = time.time() - os.path.getmtime(cache_file)
+        if file_age < CACHE_DURATION:
+            with open(cache_file, 'rb') as f:
+                data = f.read()
+            if RawJSON.is_valid(data):
+                print(f"[CACHE] Cache HIT (raw) for {cache_key}")
+                return RawJSON(data)
+            print(f"[CACHE] Cache CORRUPT for {cache_key}")
+        else:
+            print(f"[CACHE] Cache EXPIRED for {cache_key}")
+    return None
+
+def is_fresh_in_cache(cache_key):
+    """Check whether a non-expired cache entry exists without reading it"""
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    return os.path.exists(cache_file) and time.time() - os.path.getmtime(cache_file) < CACHE_DURATION
+
+def _read_raw_while_streaming(cache_key):
+    # Read mid-response: a file removed or unreadable since the request checked it is skipped, not raised
+    try:
+        return get_raw_from_cache(cache_key)
+    except OSError as e:
+        print(f"[CACHE] Failed to read {cache_key} while streaming: {e}")
+        return None
+
+def iter_cached_responses(cache_keys):
+    """Lazily load cached responses as RawJSON, one at a time (e.g. to log them without decoding)"""
+    for cache_key in cache_keys:
+        data = _read_raw_while_streaming(cache_key)
+        if data:
+            yield data
+
+def iter_cached_timelines(timeline_refs):
+    """Lazily load cached timelines as RawJSON while a response streams, one at a time"""
+    for match_id, cache_key in timeline_refs:
+        timeline_data = _read_raw_while_streaming(cache_key)
+        if timeline_data:
+            yield {
+                'match_id': match_id,
+                'timeline': timeline_data
+            }
+
+def is_match_detail(data):
+    """Whether a cached response is a match-v5 match (not a timeline or another endpoint's response)"""
+    info = data.get('info') if isinstance(data, dict) else None
+    return (isinstance(info, dict) and 'participants' in info and 'gameDuration' in info
+            and 'frames' not in info and 'matchId' in (data.get('metadata') or {}))
+
+def iter_cached_match_details(cache_dir=CACHE_DIR):
+    """Every match-v5 response in the cache, each match once (for offline jobs over the whole cache)"""
+    seen = set()
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file() or not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not is_match_detail(data) or data['metadata']['matchId'] in seen:
+            continue
+        seen.add(data['metadata']['matchId'])
+        yield data
+
+def save_raw_to_cache(cache_key, raw_data):
+    """Save an already-encoded JSON response body to filesystem cache"""
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    with open(cache_file, 'wb') as f:
+        f.write(raw_data)
+    print(f"[CACHE] Saved to cache: {cache_key}")
+
+def save_to_cache(cache_key, data):
+    """Save data to filesystem cache"""
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    with open(cache_file, 'w') as f:
+        json.dump(data, f)
+    print(f"[CACHE] Saved to cache: {cache_key}")
@@ -3,7 +3,20 @@ import requests
 import os
 import json
 from datetime import datetime
-from analysis_engine import YearInReviewAnalyzer
+from analysis_engine import YearInReviewAnalyzer, ANALYZER_VERSION, SECTION_REGISTRY, resolve_sections
+from analysis_store import AnalysisStore, is_dataset_key
+from analysis_executor import AnalysisTimeout, analyze_cached_year_in_review, analyze_year_in_review
+from analysis_response import lean_analysis, parse_expand
+from analysis_sampling import approximate_sections
+from analysis_streaming import STREAMING_SECTIONS
+from population_baselines import baselines_fingerprint
+from json_response import iter_json, json_response
+from match_history import CachedMatchHistory, process_match
+from match_record import InvalidPlayerTable, MatchRecord, PlayerTable, expand_players
+from outcome_sequence import TILT_WINDOWS, parse_tilt_windows
+from player_index import get_stored_rows, index_matches, player_index
+from api_cache import (CACHE_DIR, get_cache_key, get_from_cache, get_raw_from_cache, is_fresh_in_cache,
+                       iter_cached_responses, iter_cached_timelines, save_raw_to_cache, save_to_cache)
 from flask_caching import Cache
 from functools import lru_cache
 import time
@@ -31,42 +44,8 @@ cache = Cache(app)
 
 print("[CACHE] Flask caching initialized")
 
-# Filesystem cache configuration
-CACHE_DIR = os.path.join(os.path.dirname(__file__), 'api_cache')
-CACHE_DURATION = 31536000  # 1 year cache (365 days) - match data never changes!
-
-# Create cache directory if it doesn't exist
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
-    print(f"[CACHE] Created cache directory: {CACHE_DIR}")
-
-def get_cache_key(url, params=None):
-    """Generate cache key from URL and params"""
-    cache_string = url
-    if params:
-        cache_string += json.dumps(params, sort_keys=True)
-    return hashlib.md5(cache_string.encode()).hexdigest()
-
-def get_from_cache(cache_key):
-    """Get data from filesystem cache"""
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    if os.path.exists(cache_file):
-        # Check if cache is still valid
-        file_age = time.time() - os.path.getmtime(cache_file)
-        if file_age < CACHE_DURATION:
-            with open(cache_file, 'r') as f:
-                print(f"[CACHE] Cache HIT for {cache_key}")
-                return json.load(f)
-        else:
-            print(f"[CACHE] Cache EXPIRED for {cache_key}")
-    return None
-
-def save_to_cache(cache_key, data):
-    """Save data to filesystem cache"""
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    with open(cache_file, 'w') as f:
-        json.dump(data, f)
-    print(f"[CACHE] Saved to cache: {cache_key}")
+# Analysis results shared across endpoints and gunicorn workers (keyed by dataset hash + section version)
+analysis_store = AnalysisStore(os.path.join(CACHE_DIR, 'analysis'))
 
 def cached_request(url, headers):
     """Make a cached HTTP request"""
@@ -88,6 +67,52 @@ def cached_request(url, headers):
 
     return None
 
+def compute_dataset_hash(puuid, match_ids, scope=''):
+    """Stable content hash for a player's dataset (PUUID + match-ID set + analyzer version)"""
+    hasher = hashlib.sha256()
+    hasher.update(f"{scope}|{puuid}|{ANALYZER_VERSION}|".encode())
+    hasher.update(','.join(sorted(set(match_ids))).encode())
+    return hasher.hexdigest()[:32]
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds this ETag, otherwise None"""
+    if etag in request.if_none_match:
+        print(f"[ETAG] 304 Not Modified for {request.path} ({etag})")
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def with_etag(response, etag):
+    """Attach an ETag to a JSON response"""
+    response.set_etag(etag)
+    return response
+
+def with_player_table(payload, key, records, use_table):
+    """With use_table, payload[key]'s MatchRecords refer to a 'players' table instead of repeating every player"""
+    if use_table:
+        players = PlayerTable().add_records(records)
+        payload[key] = (record.to_dict(players) for record in records)
+        payload['players'] = players.to_list()
+        print(f"[PLAYER TABLE] {len(players.players)} distinct players across {len(records)} matches")
+    return payload
+
+def request_matches(data):
+    """
+    Matches of an analysis request body, expanding references to the player table the client sent back
+
+    Raises:
+        InvalidPlayerTable: Malformed player table or references (a client error - answer with 400)
+    """
+    return expand_players(data.get('matches', []), data.get('players'))
+
+def get_request_dataset_hash(data, scope):
+    """Dataset hash for analysis endpoints that receive matches (and timelines) in the request body"""
+    identity = data.get('puuid') or data.get('summonerName', 'Summoner')
+    match_ids = [m.get('matchId', '') for m in data.get('matches', [])]
+    match_ids += [f"timeline:{t.get('match_id', '')}" for t in data.get('timelines', [])]
+    return compute_dataset_hash(identity, match_ids, scope=f"{scope}|{data.get('region', 'na1')}")
+
 # Create a cached requests session
 @lru_cache(maxsize=128)
 def cached_get(url, headers_tuple):
@@ -120,6 +145,10 @@ REGION_ROUTING = {
     'vn2': 'sea'
 }
 
+# Premades/rivals returned by /api/co-players
+CO_PLAYERS_DEFAULT_LIMIT = 10
+CO_PLAYERS_MAX_LIMIT = 100
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -144,9 +173,9 @@ def ward_game():
     return render_template('ward_game.html')
 
 @app.route('/api/summoner', methods=['POST'])
-@cache.cached(timeout=300, key_prefix=lambda: f"summoner_{request.json.get('gameName')}_{request.json.get('tagLine')}_{request.json.get('region')}")
 def get_summoner_data():
-    print(f"[CACHE] Cache miss - fetching summoner data")
+    # Not wrapped in @cache.cached: the body is streamed (can't be stored) and repeat
+    # visits are answered with 304 via the dataset ETag instead
     try:
         data = request.json
         game_name = data.get('gameName')
@@ -296,11 +325,23 @@ Timestamp: {search_time}
         total_games = len(match_ids)
         print(f"[MATCH API] Retrieved {total_games} total match IDs from 2025")
 
+        # Nothing new since the client's last fetch - skip match details and timelines entirely
+        use_player_table = bool(data.get('playerTable'))
+        etag = compute_dataset_hash(puuid, match_ids, scope=f"summoner|{region}|players={use_player_table}")
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+
         # Step 5: Get detailed match data - fetch first 75 for initial load
-        match_details = []
+        match_details = []  # Raw matches decoded by this request, added to the player index afterwards
+        processed_matches = []
+        match_refs = []  # Cache keys of every match, for the API logs
         matches_to_fetch = match_ids[:75]  # Fetch first 75 matches for initial load
         print(f"[MATCH DETAILS] Fetching details for {len(matches_to_fetch)} matches (initial batch)")
 
+        # Rows stored when anyone in these games searched before don't need the raw match decoded
+        stored_rows = get_stored_rows(matches_to_fetch, puuid)
+
         # Track first and last match dates
         first_match_date = None
         last_match_date = None
@@ -309,11 +350,12 @@ Timestamp: {search_time}
             match_detail_url = f'https://{routing_value}.api.riotgames.com/lol/match/v5/matches/{match_id}'
             print(f"[MATCH DETAILS] Fetching match {i+1}/{len(matches_to_fetch)}: {match_id}")
 
-            # Try cache first
+            # Try the stored row, then the cache
             cache_key = get_cache_key(match_detail_url, headers)
-            match_data = get_from_cache(cache_key)
+            row = stored_rows.get(match_id)
+            match_data = get_from_cache(cache_key) if row is None else None
 
-            if match_data is None:
+            if row is None and match_data is None:
                 # Add sleep before making API request to avoid rate limits
                 # Sleep 0.1 seconds between each request (max 10 req/sec)
                 time.sleep(0.1)
@@ -330,6 +372,7 @@ Timestamp: {search_time}
                     detail_response = requests.get(match_detail_url, headers=headers, timeout=30)
                     if detail_response.status_code == 200:
                         match_data = detail_response.json()
+                        save_to_cache(cache_key, match_data)
                         print(f"[MATCH DETAILS] Successfully fetched match {match_id} after retry")
                     else:
                         print(f"[MATCH DETAILS] Still rate limited after retry")
@@ -338,9 +381,9 @@ Timestamp: {search_time}
                     print(f"[MATCH DETAILS] Failed to fetch match {match_id}: {detail_response.status_code}")
                     continue
 
-            if match_data:
+            if row is not None or match_data:
                 # Check if match is from 2024 or earlier
-                game_creation_ms = match_data['info']['gameCreation']
+                game_creation_ms = row['gameCreation'] if row is not None else match_data['info']['gameCreation']
                 match_date = datetime.fromtimestamp(game_creation_ms / 1000)
 
                 if match_date.year < 2025:
@@ -352,13 +395,19 @@ Timestamp: {search_time}
                     first_match_date = match_date
                 last_match_date = match_date
 
-                match_details.append(match_data)
+                match_refs.append(cache_key)
+                if row is None:
+                    match_details.append(match_data)
+                    row = process_match(match_data, puuid)
+                if row:
+                    processed_matches.append(MatchRecord.from_row(row))
 
             # Progress logging every 50 matches
             if (i + 1) % 50 == 0:
                 print(f"[MATCH DETAILS] Progress: {i + 1}/{len(matches_to_fetch)} matches fetched")
 
-        print(f"[MATCH DETAILS] Total matches fetched: {len(match_details)}")
+        print(f"[MATCH DETAILS] Total matches: {len(match_refs)} ({len(match_refs) - len(match_details)} from stored rows)")
+        index_matches(match_details)
 
         # Display match date range
         if first_match_date and last_match_date:
@@ -366,8 +415,9 @@ Timestamp: {search_time}
             print(f"[MATCH DATE RANGE] Last match: {last_match_date.strftime('%Y-%m-%d %H:%M:%S')}")
             print(f"[MATCH DATE RANGE] Total span: {(first_match_date - last_match_date).days} days")
 
-        # Step 6: Get timeline data for ALL matches (for comprehensive analysis)
-        match_timelines = []
+        # Step 6: Make sure timeline data for ALL matches is cached (for comprehensive analysis)
+        # Timelines are streamed to the client straight from the cache, so only references are kept here
+        timeline_refs = []
         timeline_fetch_limit = len(match_ids)  # Fetch ALL timelines
 
         print(f"[TIMELINE] Fetching timelines for {timeline_fetch_limit} matches...")
@@ -376,17 +426,17 @@ Timestamp: {search_time}
 
             # Try cache first
             cache_key = get_cache_key(timeline_url, headers)
-            timeline_data = get_from_cache(cache_key)
+            timeline_cached = is_fresh_in_cache(cache_key)
 
             # If not in cache, fetch from API with retry logic
-            if not timeline_data:
+            if not timeline_cached:
                 # Rate limiting - sleep 0.1 seconds between requests
                 time.sleep(0.1)
 
                 timeline_response = requests.get(timeline_url, headers=headers, timeout=30)
                 if timeline_response.status_code == 200:
-                    timeline_data = timeline_response.json()
-                    save_to_cache(cache_key, timeline_data)
+                    save_raw_to_cache(cache_key, timeline_response.content)
+                    timeline_cached = True
                     print(f"[TIMELINE] Fetched timeline {i+1}/{timeline_fetch_limit}: {match_id}")
                 elif timeline_response.status_code == 429:
                     print(f"[TIMELINE] Rate limited (429) on timeline {match_id}, sleeping for 2 seconds...")
@@ -394,7 +444,8 @@ Timestamp: {search_time}
                     # Retry once after rate limit
                     timeline_response = requests.get(timeline_url, headers=headers, timeout=30)
                     if timeline_response.status_code == 200:
-                        timeline_data = timeline_response.json()
+                        save_raw_to_cache(cache_key, timeline_response.content)
+                        timeline_cached = True
                         print(f"[TIMELINE] Successfully fetched timeline {match_id} after retry")
                     else:
                         print(f"[TIMELINE] Still rate limited after retry")
@@ -402,20 +453,17 @@ Timestamp: {search_time}
                 else:
                     print(f"[TIMELINE] Failed to fetch timeline for {match_id}: {timeline_response.status_code}")
 
-            if timeline_data:
-                match_timelines.append({
-                    'match_id': match_id,
-                    'timeline': timeline_data
-                })
+            if timeline_cached:
+                timeline_refs.append((match_id, cache_key))
 
             # Progress logging every 50 timelines
             if (i + 1) % 50 == 0:
                 print(f"[TIMELINE] Progress: {i + 1}/{timeline_fetch_limit} timelines fetched")
 
-        print(f"[TIMELINE] Successfully fetched {len(match_timelines)} timelines")
+        print(f"[TIMELINE] Successfully fetched {len(timeline_refs)} timelines")
 
-        # Keep first_match_timeline for backward compatibility
-        first_match_timeline = match_timelines[0]['timeline'] if match_timelines else None
+        # Keep first_match_timeline for backward compatibility (the only timeline we need to decode)
+        first_match_timeline = get_from_cache(timeline_refs[0][1]) if timeline_refs else None
 
         # Get champion data
         champion_data = get_champion_name(mastery_data[0]['championId']) if mastery_data else None
@@ -426,132 +474,11 @@ Timestamp: {search_time}
             'summoner_data': summoner_data,
             'mastery_data': mastery_data,
             'match_ids': match_ids,
-            'match_details': match_details,
+            'match_details': iter_cached_responses(match_refs),
             'first_match_timeline': first_match_timeline,
-            'match_timelines': match_timelines
+            'match_timelines': iter_cached_timelines(timeline_refs)
         })
 
-        # Process match details to extract COMPREHENSIVE data for year-in-review
-        processed_matches = []
-        for match in match_details:
-            # Find the player's participant data
-            participant = None
-            player_team_id = None
-            for p in match['info']['participants']:
-                if p['puuid'] == puuid:
-                    participant = p
-                    player_team_id = p['teamId']
-                    break
-
-            if participant:
-                # Get all opponents and teammates for rivalry/duo detection
-                opponents = []
-                teammates = []
-                for p in match['info']['participants']:
-                    if p['teamId'] == player_team_id and p['puuid'] != puuid:
-                        teammates.append({
-                            'puuid': p.get('puuid'),
-                            'riotIdGameName': p.get('riotIdGameName'),
-                            'riotIdTagline': p.get('riotIdTagline'),
-                            'championName': p['championName']
-                        })
-                    elif p['teamId'] != player_team_id:
-                        opponents.append({
-                            'puuid': p.get('puuid'),
-                            'riotIdGameName': p.get('riotIdGameName'),
-                            'riotIdTagline': p.get('riotIdTagline'),
-                            'championName': p['championName']
-                        })
-
-                # Check for AFKs/Leavers on team
-                team_had_afk = any(p.get('gameEndedInEarlySurrender') for p in match['info']['participants'] if p['teamId'] == player_team_id)
-
-                processed_matches.append({
-                    # Basic info
-                    'matchId': match['metadata']['matchId'],
-                    'gameMode': match['info']['gameMode'],
-                    'gameDuration': match['info']['gameDuration'],
-                    'gameCreation': match['info']['gameCreation'],
-                    'gameEndedInEarlySurrender': match['info'].get('gameEndedInEarlySurrender', False),
-                    'gameEndedInSurrender': match['info']['teams'][0].get('win', False) != match['info']['teams'][1].get('win', False),
-
-                    # Champion & role
-                    'championName': participant['championName'],
-                    'championId': participant['championId'],
-                    'lane': participant.get('lane', 'NONE'),
-                    'role': participant.get('role', 'NONE'),
-                    'individualPosition': participant.get('individualPosition', 'NONE'),
-
-                    # Core stats
-                    'kills': participant['kills'],
-                    'deaths': participant['deaths'],
-                    'assists': participant['assists'],
-                    'win': participant['win'],
-
-                    # Advanced combat stats (for highlights!)
-                    'pentaKills': participant.get('pentaKills', 0),
-                    'quadraKills': participant.get('quadraKills', 0),
-                    'tripleKills': participant.get('tripleKills', 0),
-                    'doubleKills': participant.get('doubleKills', 0),
-                    'largestMultiKill': participant.get('largestMultiKill', 0),
-                    'killingSprees': participant.get('killingSprees', 0),
-                    'largestKillingSpree': participant.get('largestKillingSpree', 0),
-                    'largestCriticalStrike': participant.get('largestCriticalStrike', 0),
-                    'longestTimeSpentLiving': participant.get('longestTimeSpentLiving', 0),
-
-                    # Economic stats
-                    'goldEarned': participant['goldEarned'],
-                    'goldPerMinute': round(participant['goldEarned'] / (match['info']['gameDuration'] / 60), 2),
-                    'totalMinionsKilled': participant.get('totalMinionsKilled', 0),
-                    'neutralMinionsKilled': participant.get('neutralMinionsKilled', 0),
-
-                    # Damage stats
-                    'totalDamageDealt': participant['totalDamageDealtToChampions'],
-                    'damagePerMinute': round(participant['totalDamageDealtToChampions'] / (match['info']['gameDuration'] / 60), 2),
-                    'totalDamageTaken': participant.get('totalDamageTaken', 0),
-
-                    # CC & utility
-                    'timeCCingOthers': participant.get('timeCCingOthers', 0),
-                    'totalTimeCCDealt': participant.get('totalTimeCCDealt', 0),
-
-                    # Vision
-                    'visionScore': participant.get('visionScore', 0),
-                    'wardsPlaced': participant.get('wardsPlaced', 0),
-                    'wardsKilled': participant.get('wardsKilled', 0),
-                    'visionWardsBoughtInGame': participant.get('visionWardsBoughtInGame', 0),
-
-                    # Spells & abilities
-                    'spell1Casts': participant.get('spell1Casts', 0),
-                    'spell2Casts': participant.get('spell2Casts', 0),
-                    'spell3Casts': participant.get('spell3Casts', 0),
-                    'spell4Casts': participant.get('spell4Casts', 0),
-                    'summoner1Id': participant.get('summoner1Id', 0),
-                    'summoner2Id': participant.get('summoner2Id', 0),
-                    'summoner1Casts': participant.get('summoner1Casts', 0),
-                    'summoner2Casts': participant.get('summoner2Casts', 0),
-
-                    # Bounty & objectives
-                    'bountyLevel': participant.get('bountyLevel', 0),
-                    'objectivesStolen': participant.get('objectivesStolen', 0),
-                    'turretKills': participant.get('turretKills', 0),
-                    'inhibitorKills': participant.get('inhibitorKills', 0),
-
-                    # Team context (for AFK/duo detection)
-                    'teamId': player_team_id,
-                    'teamHadAFK': team_had_afk,
-                    'opponents': opponents,
-                    'teammates': teammates,
-
-                    # Items (for interesting builds)
-                    'item0': participant.get('item0', 0),
-                    'item1': participant.get('item1', 0),
-                    'item2': participant.get('item2', 0),
-                    'item3': participant.get('item3', 0),
-                    'item4': participant.get('item4', 0),
-                    'item5': participant.get('item5', 0),
-                    'item6': participant.get('item6', 0)
-                })
-
         # Extract death positions from the first match timeline
         death_positions = []
         if first_match_timeline and 'info' in first_match_timeline:
@@ -569,9 +496,10 @@ Timestamp: {search_time}
                                 'assistingParticipantIds': event.get('assistingParticipantIds', [])
                             })
 
-        return jsonify({
+        return with_etag(json_response(with_player_table({
             'summoner': {
                 'name': f"{game_name}#{tag_line}",
+                'puuid': puuid,
                 'level': summoner_data.get('summonerLevel', 0),
                 'profileIconId': summoner_data.get('profileIconId', 0)
             },
@@ -584,14 +512,14 @@ Timestamp: {search_time}
             'totalGames': total_games,
             'topChampions': mastery_data[:5] if mastery_data else [],
             'recentMatches': processed_matches,
-            'matchTimelines': match_timelines,
+            'matchTimelines': iter_cached_timelines(timeline_refs),
             'region': region,
             'firstMatchTimeline': {
                 'hasTimeline': first_match_timeline is not None,
                 'deathPositions': death_positions,
                 'totalKills': len(death_positions)
             }
-        })
+        }, 'recentMatches', processed_matches, use_player_table)), etag)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -667,20 +595,29 @@ def get_summoner_full_data():
 
         print(f"[FULL DATA] Retrieved {len(match_ids)} total match IDs")
 
+        use_player_table = bool(data.get('playerTable'))
+        etag = compute_dataset_hash(puuid, match_ids, scope=f"summoner-full|{region}|players={use_player_table}")
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+
         # Step 3: Fetch ALL match details with smart rate limiting
-        match_details = []
+        match_details = []  # Raw matches decoded by this request, added to the player index afterwards
+        processed_matches = []
         matches_to_fetch = match_ids  # Fetch all matches
 
         print(f"[FULL DATA] Fetching {len(matches_to_fetch)} match details with rate limiting...")
+        stored_rows = get_stored_rows(matches_to_fetch, puuid)
 
         for i, match_id in enumerate(matches_to_fetch):
             match_detail_url = f'https://{routing_value}.api.riotgames.com/lol/match/v5/matches/{match_id}'
 
-            # Try cache first
+            # Try the stored row, then the cache
             cache_key = get_cache_key(match_detail_url, headers)
-            match_data = get_from_cache(cache_key)
+            row = stored_rows.get(match_id)
+            match_data = get_from_cache(cache_key) if row is None else None
 
-            if match_data is None:
+            if row is None and match_data is None:
                 # Rate limiting - sleep 0.1 seconds between requests (max 10 req/sec)
                 time.sleep(0.1)
 
@@ -701,23 +638,28 @@ def get_summoner_full_data():
                 else:
                     continue
 
-            if match_data:
+            if row is not None or match_data:
                 # Check if match is from 2024 or earlier
-                game_creation_ms = match_data['info']['gameCreation']
+                game_creation_ms = row['gameCreation'] if row is not None else match_data['info']['gameCreation']
                 match_date = datetime.fromtimestamp(game_creation_ms / 1000)
                 if match_date.year < 2025:
                     print(f"[FULL DATA] Reached 2024 match, stopping")
                     break
-                match_details.append(match_data)
+                if row is None:
+                    match_details.append(match_data)
+                    row = process_match(match_data, puuid)
+                if row:
+                    processed_matches.append(MatchRecord.from_row(row))
 
             # Progress logging every 50 matches
             if (i + 1) % 50 == 0:
                 print(f"[FULL DATA] Progress: {i + 1}/{len(matches_to_fetch)} matches fetched")
 
-        print(f"[FULL DATA] Total matches fetched: {len(match_details)}")
+        print(f"[FULL DATA] Total matches: {len(processed_matches)} ({len(match_details)} decoded, the rest from stored rows)")
+        index_matches(match_details)
 
-        # Step 4: Fetch ALL timelines
-        match_timelines = []
+        # Step 4: Make sure ALL timelines are cached (they're streamed from the cache into the response)
+        timeline_refs = []
         print(f"[FULL DATA] Fetching timelines for {len(match_ids)} matches...")
 
         for i, match_id in enumerate(match_ids):
@@ -725,23 +667,20 @@ def get_summoner_full_data():
 
             # Try cache first
             cache_key = get_cache_key(timeline_url, headers)
-            timeline_data = get_from_cache(cache_key)
 
-            if not timeline_data:
+            if not is_fresh_in_cache(cache_key):
                 # Rate limiting - sleep 0.1 seconds between requests
                 time.sleep(0.1)
 
                 timeline_response = requests.get(timeline_url, headers=headers, timeout=30)
                 if timeline_response.status_code == 200:
-                    timeline_data = timeline_response.json()
-                    save_to_cache(cache_key, timeline_data)
+                    save_raw_to_cache(cache_key, timeline_response.content)
                 elif timeline_response.status_code == 429:
                     print(f"[FULL DATA] Timeline rate limited, sleeping 5 seconds...")
                     time.sleep(5)
                     timeline_response = requests.get(timeline_url, headers=headers, timeout=30)
                     if timeline_response.status_code == 200:
-                        timeline_data = timeline_response.json()
-                        save_to_cache(get_cache_key(timeline_url, headers), timeline_data)
+                        save_raw_to_cache(cache_key, timeline_response.content)
                     else:
                         print(f"[FULL DATA] Still rate limited on timelines")
                         continue
@@ -749,119 +688,19 @@ def get_summoner_full_data():
                     print(f"[FULL DATA] Failed to fetch timeline {match_id}: {timeline_response.status_code}")
                     continue
 
-            if timeline_data:
-                match_timelines.append({
-                    'match_id': match_id,
-                    'timeline': timeline_data
-                })
+            timeline_refs.append((match_id, cache_key))
 
             # Progress logging every 50 timelines
             if (i + 1) % 50 == 0:
                 print(f"[FULL DATA] Timeline progress: {i + 1}/{len(match_ids)} fetched")
 
-        print(f"[FULL DATA] Successfully fetched {len(match_timelines)} timelines")
-
-        # Process matches (same as original endpoint)
-        processed_matches = []
-        for match in match_details:
-            participant = None
-            player_team_id = None
-            for p in match['info']['participants']:
-                if p['puuid'] == puuid:
-                    participant = p
-                    player_team_id = p['teamId']
-                    break
+        print(f"[FULL DATA] Successfully fetched {len(timeline_refs)} timelines")
 
-            if participant:
-                opponents = []
-                teammates = []
-                for p in match['info']['participants']:
-                    if p['teamId'] == player_team_id and p['puuid'] != puuid:
-                        teammates.append({
-                            'puuid': p.get('puuid'),
-                            'riotIdGameName': p.get('riotIdGameName'),
-                            'riotIdTagline': p.get('riotIdTagline'),
-                            'championName': p['championName']
-                        })
-                    elif p['teamId'] != player_team_id:
-                        opponents.append({
-                            'puuid': p.get('puuid'),
-                            'riotIdGameName': p.get('riotIdGameName'),
-                            'riotIdTagline': p.get('riotIdTagline'),
-                            'championName': p['championName']
-                        })
-
-                team_had_afk = any(p.get('gameEndedInEarlySurrender') for p in match['info']['participants'] if p['teamId'] == player_team_id)
-
-                processed_matches.append({
-                    'matchId': match['metadata']['matchId'],
-                    'gameMode': match['info']['gameMode'],
-                    'gameDuration': match['info']['gameDuration'],
-                    'gameCreation': match['info']['gameCreation'],
-                    'gameEndedInEarlySurrender': match['info'].get('gameEndedInEarlySurrender', False),
-                    'gameEndedInSurrender': match['info']['teams'][0].get('win', False) != match['info']['teams'][1].get('win', False),
-                    'championName': participant['championName'],
-                    'championId': participant['championId'],
-                    'lane': participant.get('lane', 'NONE'),
-                    'role': participant.get('role', 'NONE'),
-                    'individualPosition': participant.get('individualPosition', 'NONE'),
-                    'kills': participant['kills'],
-                    'deaths': participant['deaths'],
-                    'assists': participant['assists'],
-                    'win': participant['win'],
-                    'pentaKills': participant.get('pentaKills', 0),
-                    'quadraKills': participant.get('quadraKills', 0),
-                    'tripleKills': participant.get('tripleKills', 0),
-                    'doubleKills': participant.get('doubleKills', 0),
-                    'largestMultiKill': participant.get('largestMultiKill', 0),
-                    'killingSprees': participant.get('killingSprees', 0),
-                    'largestKillingSpree': participant.get('largestKillingSpree', 0),
-                    'largestCriticalStrike': participant.get('largestCriticalStrike', 0),
-                    'longestTimeSpentLiving': participant.get('longestTimeSpentLiving', 0),
-                    'goldEarned': participant['goldEarned'],
-                    'goldPerMinute': round(participant['goldEarned'] / (match['info']['gameDuration'] / 60), 2),
-                    'totalMinionsKilled': participant.get('totalMinionsKilled', 0),
-                    'neutralMinionsKilled': participant.get('neutralMinionsKilled', 0),
-                    'totalDamageDealt': participant['totalDamageDealtToChampions'],
-                    'totalDamageDealtToChampions': participant['totalDamageDealtToChampions'],
-                    'damagePerMinute': round(participant['totalDamageDealtToChampions'] / (match['info']['gameDuration'] / 60), 2),
-                    'totalDamageTaken': participant.get('totalDamageTaken', 0),
-                    'timeCCingOthers': participant.get('timeCCingOthers', 0),
-                    'totalTimeCCDealt': participant.get('totalTimeCCDealt', 0),
-                    'visionScore': participant.get('visionScore', 0),
-                    'wardsPlaced': participant.get('wardsPlaced', 0),
-                    'wardsKilled': participant.get('wardsKilled', 0),
-                    'visionWardsBoughtInGame': participant.get('visionWardsBoughtInGame', 0),
-                    'spell1Casts': participant.get('spell1Casts', 0),
-                    'spell2Casts': participant.get('spell2Casts', 0),
-                    'spell3Casts': participant.get('spell3Casts', 0),
-                    'spell4Casts': participant.get('spell4Casts', 0),
-                    'summoner1Id': participant.get('summoner1Id', 0),
-                    'summoner2Id': participant.get('summoner2Id', 0),
-                    'summoner1Casts': participant.get('summoner1Casts', 0),
-                    'summoner2Casts': participant.get('summoner2Casts', 0),
-                    'bountyLevel': participant.get('bountyLevel', 0),
-                    'objectivesStolen': participant.get('objectivesStolen', 0),
-                    'turretKills': participant.get('turretKills', 0),
-                    'inhibitorKills': participant.get('inhibitorKills', 0),
-                    'teamId': player_team_id,
-                    'teamHadAFK': team_had_afk,
-                    'opponents': opponents,
-                    'teammates': teammates,
-                    'item0': participant.get('item0', 0),
-                    'item1': participant.get('item1', 0),
-                    'item2': participant.get('item2', 0),
-                    'item3': participant.get('item3', 0),
-                    'item4': participant.get('item4', 0),
-                    'item5': participant.get('item5', 0),
-                    'item6': participant.get('item6', 0)
-                })
-
-        return jsonify({
+        return with_etag(json_response(with_player_table({
             'matches': processed_matches,
             'total_matches': len(processed_matches),
-            'timelines': match_timelines
-        })
+            'timelines': iter_cached_timelines(timeline_refs)
+        }, 'matches', processed_matches, use_player_table)), etag)
 
     except Exception as e:
         print(f"[FULL DATA] Error: {str(e)}")
@@ -869,6 +708,36 @@ def get_summoner_full_data():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/co-players', methods=['POST'])
+def get_co_players():
+    """Premade partners and rivals of a player (by PUUID) across every match anyone has fetched"""
+    try:
+        data = request.json or {}
+        puuid = data.get('puuid')
+        if not puuid:
+            return jsonify({'error': 'puuid is required'}), 400
+
+        limit = data.get('limit', CO_PLAYERS_DEFAULT_LIMIT)
+        if type(limit) is not int or not 1 <= limit <= CO_PLAYERS_MAX_LIMIT:
+            return jsonify({'error': f'limit must be an integer between 1 and {CO_PLAYERS_MAX_LIMIT}'}), 400
+
+        # Lookups only change when another match with the player is indexed
+        games = player_index.player_games(puuid)
+        etag = compute_dataset_hash(puuid, [str(games)], scope=f'co-players|limit={limit}')
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+
+        relations = player_index.relations(puuid, limit=limit)
+        print(f"[CO-PLAYERS] {len(relations['premades'])} premades, {len(relations['rivals'])} rivals in {games} indexed games")
+        return with_etag(jsonify(relations), etag)
+
+    except Exception as e:
+        print(f"[CO-PLAYERS] Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/preview-stats', methods=['POST'])
 def get_preview_stats():
     """Get quick preview stats from first 10 matches"""
@@ -880,6 +749,11 @@ def get_preview_stats():
         if not matches:
             return jsonify({'error': 'No matches found'}), 400
 
+        etag = get_request_dataset_hash({**data, 'matches': matches, 'timelines': []}, 'preview-stats')
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+
         # Calculate quick stats
         wins = sum(1 for m in matches if m.get('win'))
         total_kills = sum(m.get('kills', 0) for m in matches)
@@ -905,7 +779,7 @@ def get_preview_stats():
         }
 
         print(f"[PREVIEW] Preview stats: {preview}")
-        return jsonify(preview)
+        return with_etag(jsonify(preview), etag)
 
     except Exception as e:
         print(f"[PREVIEW] Error: {str(e)}")
@@ -918,48 +792,125 @@ def generate_year_in_review():
     try:
         print("[YEAR-IN-REVIEW] ===== STARTING YEAR IN REVIEW =====")
         data = request.json
-        matches = data.get('matches', [])
+        try:
+            matches = request_matches(data)
+        except InvalidPlayerTable as table_error:
+            return jsonify({'error': str(table_error)}), 400
         summoner_name = data.get('summonerName', 'Summoner')
-        region = data.get('region', 'na1')
         timelines = data.get('timelines', [])
 
         print(f"[YEAR-IN-REVIEW] Received request for: {summoner_name}")
         print(f"[YEAR-IN-REVIEW] Matches count: {len(matches)}")
         print(f"[YEAR-IN-REVIEW] Timelines count: {len(timelines)}")
 
-        if not matches or len(matches) < 5:
-            print(f"[YEAR-IN-REVIEW] ERROR: Not enough matches ({len(matches)})")
+        # Heavy histories: the client sends just the match IDs and the games are streamed from the API cache
+        history = None
+        if not matches and data.get('matchIds'):
+            if not data.get('puuid'):
+                return jsonify({'error': 'puuid is required to analyze matchIds'}), 400
+            routing_value = REGION_ROUTING.get(data.get('region', 'na1').lower(), 'americas')
+            history = CachedMatchHistory(data['matchIds'], data['puuid'], routing_value, {'X-Riot-Token': RIOT_API_KEY},
+                                         row_store=player_index)
+            print(f"[YEAR-IN-REVIEW] Streaming {len(history)}/{len(data['matchIds'])} matches from the cache")
+
+        total_matches = len(history) if history is not None else len(matches)
+        if total_matches < 5:
+            print(f"[YEAR-IN-REVIEW] ERROR: Not enough matches ({total_matches})")
             return jsonify({'error': 'Need at least 5 matches for year-in-review'}), 400
 
-        print(f"[YEAR-IN-REVIEW] Creating analyzer...")
+        # Optional subset of sections, e.g. ["nemesis", "bff", "narrative"] or "nemesis,bff,narrative"
+        sections = data.get('sections', request.args.get('sections'))
+        if isinstance(sections, str):
+            sections = [name.strip() for name in sections.split(',') if name.strip()]
+        if sections is not None and not isinstance(sections, list):
+            return jsonify({'error': 'sections must be a list of section names'}), 400
 
-        # Create analyzer and run all analysis
-        analyzer = YearInReviewAnalyzer(matches, summoner_name, region, timelines=timelines)
+        # Sections to return in full, with their embedded matches (see analysis_response)
+        try:
+            expand = parse_expand(data.get('expand', request.args.get('expand')))
+        except ValueError as expand_error:
+            return jsonify({'error': str(expand_error)}), 400
 
-        print(f"[YEAR-IN-REVIEW] Running analysis...")
-        analysis = analyzer.analyze_all()
+        # Heavy histories: estimate the timeline sections from a sample now, exact ones on a later request
+        approximate = bool(data.get('approximate', False))
 
-        print(f"[YEAR-IN-REVIEW] ✅ Analysis complete!")
-        print(f"[YEAR-IN-REVIEW] Analysis: {analysis}")
-        print(f"[YEAR-IN-REVIEW] Generating AI narrative...")
+        # Loss streak lengths tilt detection reports, e.g. [1, 2, 3, 4, 5] (the default) or "3,6,10"
+        try:
+            tilt_windows = parse_tilt_windows(data.get('tilt_windows', request.args.get('tilt_windows')))
+        except ValueError as tilt_error:
+            return jsonify({'error': str(tilt_error)}), 400
+        if history is not None and tilt_windows != TILT_WINDOWS:
+            return jsonify({'error': 'tilt_windows is not available when analyzing from the cache'}), 400
+
+        include_narrative = sections is None or 'narrative' in sections
+        if sections is not None:
+            sections = [name for name in sections if name != 'narrative']
+            try:
+                resolve_sections(sections)
+            except ValueError as section_error:
+                return jsonify({'error': str(section_error)}), 400
+            unsupported = [name for name in sections if name not in STREAMING_SECTIONS]
+            if history is not None and unsupported:
+                return jsonify({'error': f"Sections not available when analyzing from the cache: {', '.join(unsupported)}"}), 400
+            print(f"[YEAR-IN-REVIEW] Requested sections: {sections} (narrative: {include_narrative})")
+
+        # Same player, same games, same analyzer version and baselines -> the client already has this review
+        scope = f"year-in-review|baselines={baselines_fingerprint()}"
+        if sections is not None:
+            scope += f"|{','.join(sorted(set(sections)))}|narrative={include_narrative}"
+        if expand:
+            scope += f"|expand={','.join(sorted(expand))}"
+        if tilt_windows != TILT_WINDOWS:
+            scope += f"|tilt={','.join(str(window) for window in tilt_windows)}"
+        if history is not None:
+            match_ids = history.match_ids + [f"timeline:{match_id}" for match_id in history.timeline_ids]
+            etag = compute_dataset_hash(history.puuid, match_ids, scope=f"{scope}|cache|{data.get('region', 'na1')}")
+        else:
+            etag = get_request_dataset_hash(data, scope)
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
 
-        # Generate AI narrative
+        print(f"[YEAR-IN-REVIEW] Running analysis...")
+        # CPU-bound - large histories run in the analysis process pool so this worker stays responsive
         try:
-            narrative = analyzer.generate_ai_narrative(analysis)
-            print(f"[YEAR-IN-REVIEW] ✅ AI narrative generated: {narrative[:100]}...")
-        except Exception as ai_error:
-            print(f"[YEAR-IN-REVIEW] ⚠️ AI narrative failed: {str(ai_error)}")
-            narrative = f"Had an incredible year with {len(matches)} games played!"
-
-        print("Narrative: " + narrative)
-        
+            if history is not None:
+                analysis, narrative = analyze_cached_year_in_review(history, summoner_name, data.get('region', 'na1'),
+                                                                    sections=sections, include_narrative=include_narrative,
+                                                                    store_root=analysis_store.root)
+            else:
+                analysis, narrative = analyze_year_in_review(data, request.get_data(), sections=sections,
+                                                             include_narrative=include_narrative,
+                                                             store_root=analysis_store.root, approximate=approximate,
+                                                             tilt_windows=tilt_windows)
+        except AnalysisTimeout as timeout_error:
+            print(f"[YEAR-IN-REVIEW] ❌ {timeout_error}")
+            return jsonify({'error': 'The analysis is taking too long right now, please try again in a few minutes'}), 503
+
+        refining = approximate_sections(analysis)
+        analysis = lean_analysis(analysis, expand)
+        print(f"[YEAR-IN-REVIEW] Analysis: {len(analysis)} sections"
+              f"{' (expanded: ' + ', '.join(sorted(expand)) + ')' if expand else ''}")
+
+        response_data = {
+            'analysis': analysis,
+            'total_matches': total_matches
+        }
+
+        if include_narrative:
+            print("Narrative: " + narrative)
+            response_data['narrative'] = narrative
+
         print(f"[YEAR-IN-REVIEW] ===== SENDING RESPONSE =====")
 
-        return jsonify({
-            'analysis': analysis,
-            'narrative': narrative,
-            'total_matches': len(matches)
-        })
+        # Estimates aren't this dataset's final review - no ETag; the client polls
+        # /api/year-in-review/refined with {section: dataset key} for the exact sections
+        if refining:
+            print(f"[YEAR-IN-REVIEW] Approximate sections, exact ones being computed: {', '.join(refining)}")
+            response_data['refining'] = refining
+            return jsonify(response_data)
+
+        return with_etag(jsonify(response_data), etag)
 
     except Exception as e:
         print(f"[YEAR-IN-REVIEW] ❌ CRITICAL ERROR: {str(e)}")
@@ -967,6 +918,41 @@ def generate_year_in_review():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/year-in-review/refined', methods=['POST'])
+def year_in_review_refined():
+    """
+    Exact results of the sections an approximate year-in-review estimated
+
+    Reads only the AnalysisStore, so clients can poll it cheaply while the analysis pool
+    computes them. Body: {"sections": {section name: dataset key}}, the response's `refining`.
+    """
+    import traceback
+    try:
+        data = request.get_json(silent=True) or {}
+        refining = data.get('sections')
+        if not isinstance(refining, dict) or not refining:
+            return jsonify({'error': 'sections must map section names to dataset keys'}), 400
+
+        analysis = {}
+        pending = {}
+        for name, dataset_key in refining.items():
+            section = SECTION_REGISTRY.get(name)
+            if section is None or not is_dataset_key(dataset_key):
+                return jsonify({'error': f"Invalid section or dataset key: {name}"}), 400
+            found, result = analysis_store.get(dataset_key, name, section['version'], max_age=section['max_age'])
+            if found:
+                analysis[name] = result
+            else:
+                pending[name] = dataset_key
+
+        print(f"[YEAR-IN-REVIEW] Refined sections ready: {len(analysis)}/{len(refining)}")
+        return jsonify({'analysis': lean_analysis(analysis), 'pending': pending})
+
+    except Exception as e:
+        print(f"[YEAR-IN-REVIEW] ❌ Refined sections error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/feedback', methods=['POST'])
 def submit_feedback():
     """Submit user feedback via AWS SES"""
@@ -1025,7 +1011,10 @@ def roast_player():
     """Generate a savage AI roast using Knowledge Base"""
     try:
         data = request.json
-        matches = data.get('matches', [])
+        try:
+            matches = request_matches(data)
+        except InvalidPlayerTable as table_error:
+            return jsonify({'error': str(table_error)}), 400
         summoner_name = data.get('summonerName', 'Summoner')
         region = data.get('region', 'na1')
 
@@ -1053,7 +1042,7 @@ def roast_player():
         Games on Main: {champion_counts.get(most_played_champ, 0)}
         """
 
-        analyzer = YearInReviewAnalyzer(matches, summoner_name, region)
+        analyzer = YearInReviewAnalyzer(matches, summoner_name, region, puuid=data.get('puuid'), store=analysis_store)
 
         # Try KB-enhanced roast, fallback to regular if it fails
         roast = analyzer.generate_roast_with_kb(player_context)
@@ -1068,18 +1057,26 @@ def recommend_champions():
     """Generate AI-powered champion recommendations based on player stats"""
     try:
         data = request.json
-        matches = data.get('matches', [])
+        try:
+            matches = request_matches(data)
+        except InvalidPlayerTable as table_error:
+            return jsonify({'error': str(table_error)}), 400
         summoner_name = data.get('summonerName', 'Summoner')
         region = data.get('region', 'na1')
 
         if not matches:
             return jsonify({'error': 'No match data provided'}), 400
 
-        analyzer = YearInReviewAnalyzer(matches, summoner_name, region)
+        etag = get_request_dataset_hash({**data, 'timelines': []}, 'recommend-champions')
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+
+        analyzer = YearInReviewAnalyzer(matches, summoner_name, region, puuid=data.get('puuid'), store=analysis_store)
         recommendations = analyzer.recommend_champions()
 
         if recommendations:
-            return jsonify({'recommendations': recommendations})
+            return with_etag(jsonify({'recommendations': recommendations}), etag)
         else:
             return jsonify({'error': 'Could not generate recommendations'}), 500
 
@@ -1094,7 +1091,10 @@ def roast_player_enhanced():
     """Generate an enhanced AI roast using OP.GG MCP data"""
     try:
         data = request.json
-        matches = data.get('matches', [])
+        try:
+            matches = request_matches(data)
+        except InvalidPlayerTable as table_error:
+            return jsonify({'error': str(table_error)}), 400
         summoner_name = data.get('summonerName', 'Summoner')
         region = data.get('region', 'na1')
 
@@ -1152,7 +1152,7 @@ def roast_player_enhanced():
         traceback.print_exc()
         # Fallback to regular roast
         try:
-            analyzer = YearInReviewAnalyzer(matches, summoner_name, region)
+            analyzer = YearInReviewAnalyzer(matches, summoner_name, region, puuid=data.get('puuid'), store=analysis_store)
             roast = analyzer.generate_roast()
             return jsonify({'roast': roast, 'fallback': True})
         except:
@@ -1179,9 +1179,10 @@ def save_api_logs(game_name, tag_line, region, api_data):
             'api_responses': api_data
         }
 
-        # Write to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, indent=2, ensure_ascii=False)
+        # Write to file incrementally (timelines are streamed from the cache as RawJSON)
+        with open(filepath, 'wb') as f:
+            for chunk in iter_json(log_data):
+                f.write(chunk)
 
         print(f"[LOGS] Saved API responses to {filepath}")
 
@@ -0,0 +1,149 @@
+"""
+Vectorized damage attribution for champion kills
+Turns every CHAMPION_KILL of a dataset into a (kill x participant) damage
+matrix from victimDamageReceived, so each participant's share of their team's
+damage on every kill is computed at once. Kill steals, solo kills and assist
+quality for a player then become array masks instead of per-kill loops.
+Each match's kills are parsed once and cached per match ID and timeline digest,
+since the events come from request bodies.
+Optional - the analyzer keeps its pure Python loop when NumPy isn't installed.
+"""
+try:
+    import numpy as np
+except ImportError:  # Optional - see is_available()
+    np = None
+
+from timeline_frames import MatchCache
+
+# Participant columns: 0 = minions/turrets/monsters, 1-5 = blue side, 6-10 = red side
+COLUMNS = 11
+
+# Below this share of the team's damage a kill counts as a kill steal (percent)
+KILL_STEAL_SHARE = 15
+
+# Parsed kills per (match ID, timeline digest), reused across requests since finished timelines never change
+_cache = MatchCache()
+
+
+def is_available():
+    """Whether numpy is installed"""
+    return np is not None
+
+
+def damage_of(entry):
+    """Total damage of one victimDamageReceived entry"""
+    return entry.get('magicDamage', 0) + entry.get('physicalDamage', 0) + entry.get('trueDamage', 0)
+
+
+class MatchKills:
+    """Killer, timestamp, per-participant damage and assists of every champion kill in one match"""
+
+    __slots__ = ('match_id', 'size', 'killer', 'timestamps', 'damage', 'assists')
+
+    def __init__(self, match_id, events):
+        self.match_id = match_id
+        self.size = len(events)
+        self.killer = np.array([event.get('killerId', 0) for event in events], dtype=np.intp).reshape(self.size)
+        self.timestamps = [event.get('timestamp', 0) for event in events]
+
+        # Flatten every damage entry and assist to a (kill, participant) cell, then sum per cell
+        damage_cells, damage = [], []
+        for k, event in enumerate(events):
+            for entry in event.get('victimDamageReceived') or ():
+                participant_id = entry.get('participantId', 0)
+                if 0 <= participant_id < COLUMNS:
+                    damage_cells.append(k * COLUMNS + participant_id)
+                    damage.append(entry.get('magicDamage', 0) + entry.get('physicalDamage', 0) + entry.get('trueDamage', 0))
+        assist_cells = [k * COLUMNS + participant_id
+                        for k, event in enumerate(events)
+                        for participant_id in event.get('assistingParticipantIds') or ()
+                        if 0 < participant_id < COLUMNS]
+
+        cells = self.size * COLUMNS
+        # Float weights are exact for damage totals (far below 2**53)
+        self.damage = np.bincount(damage_cells, weights=damage, minlength=cells).astype(np.int64).reshape(self.size, COLUMNS)
+        self.assists = (np.bincount(assist_cells, minlength=cells) > 0).reshape(self.size, COLUMNS)
+
+
+def get_match_kills(match_id, events, digest=None):
+    """Parsed kills of a match, from the per-process cache when seen with the same timeline digest"""
+    return _cache.get((match_id, digest), lambda: MatchKills(match_id, events))
+
+
+class KillDamageTable:
+    """Per-kill damage dealt to the victim by every participant, for all kills of a TimelineIndex"""
+
+    def __init__(self, timeline_index, digests=None):
+        """digests: {match ID: analysis_store.match_digest of its timeline}, for the per-process cache"""
+        digests = digests or {}
+        blocks = [get_match_kills(match_id, timeline_index.match_events(match_id, 'CHAMPION_KILL'), digests.get(match_id))
+                  for match_id in timeline_index.match_ids]
+        self.size = sum(block.size for block in blocks)
+        self.match_ids = [block.match_id for block in blocks for _ in range(block.size)]
+        self.timestamps = [timestamp for block in blocks for timestamp in block.timestamps]
+
+        # The player's participantId in each kill's match (0 when unknown)
+        self.player = np.repeat(
+            np.array([timeline_index.player_id(block.match_id) or 0 for block in blocks], dtype=np.intp),
+            [block.size for block in blocks]
+        )
+        self.killer = np.concatenate([block.killer for block in blocks] or [np.zeros(0, dtype=np.intp)])
+        self.damage = np.concatenate([block.damage for block in blocks] or [np.zeros((0, COLUMNS), dtype=np.int64)])
+        self.assists = np.concatenate([block.assists for block in blocks] or [np.zeros((0, COLUMNS), dtype=bool)])
+
+        # Damage from the killer's team only (enemies, minions and turrets don't count)
+        columns = np.arange(COLUMNS)
+        blue = (columns >= 1) & (columns <= 5)
+        red = (columns >= 6) & (columns <= 10)
+        killer_blue = ((self.killer >= 1) & (self.killer <= 5))[:, None]
+        killer_red = ((self.killer >= 6) & (self.killer <= 10))[:, None]
+        self.team_mask = (killer_blue & blue) | (killer_red & red)
+        self.team_damage_by_participant = np.where(self.team_mask, self.damage, 0)
+        self.team_damage = self.team_damage_by_participant.sum(axis=1)
+
+    def shares(self, participants):
+        """
+        Each kill's damage by `participants` (one participantId per kill) and its percent of the killer
+        team's damage (0 when the participant isn't on the killer's team)
+        """
+        rows = np.arange(self.size)
+        damage = self.team_damage_by_participant[rows, participants]
+        valid = self.team_damage > 0
+        share = np.zeros(self.size, dtype=np.float64)
+        np.divide(damage, self.team_damage, out=share, where=valid)
+        return damage, share * 100, valid
+
+    def summary(self, participants=None):
+        """
+        Kill and assist attribution for one participant per kill (the player by default)
+
+        Returns:
+            {'kills': [(match_id, timestamp, killer_damage, team_damage, share), ...],
+             'solo_kills': n, 'assist_shares': [share, ...]} - kills and assist shares only
+            where the team dealt damage, in timeline order
+        """
+        if participants is None:
+            participants = self.player
+        damage, share, valid = self.shares(participants)
+        rows = np.arange(self.size)
+        known = participants > 0
+
+        kill_mask = known & (self.killer == participants) & valid
+        kill_rows = np.flatnonzero(kill_mask).tolist()
+        kills = list(zip(
+            [self.match_ids[k] for k in kill_rows],
+            [self.timestamps[k] for k in kill_rows],
+            damage[kill_mask].tolist(),
+            self.team_damage[kill_mask].tolist(),
+            share[kill_mask].tolist()
+        ))
+
+        # Solo kill: nobody assisted
+        solo_kills = int((kill_mask & ~self.assists.any(axis=1)).sum())
+
+        assist_mask = known & self.assists[rows, participants] & valid
+        return {
+            'kills': kills,
+            'solo_kills': solo_kills,
+            'assist_shares': share[assist_mask].tolist()
+        }
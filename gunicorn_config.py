@@ -1,6 +1,8 @@
 """
 Gunicorn configuration file for Riftwind Flask app
 """
+import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:8202"
@@ -8,7 +10,13 @@ backlog = 2048
 
 # Worker processes
 workers = 4
-worker_class = "sync"
+# Every worker starts its own analysis process pool (analysis_executor.py), so split the cores
+# between them - set ANALYSIS_PROCESSES in the environment to override
+os.environ.setdefault('ANALYSIS_PROCESSES', str(max(multiprocessing.cpu_count() // workers, 1)))
+# Threads let a worker keep serving requests while an analysis runs in the analysis
+# process pool (see analysis_executor.py); with threads > 1 gunicorn uses gthread workers
+threads = 4
+worker_class = "gthread"
 worker_connections = 1000
 timeout = 600  # 10 minutes timeout for fetching all matches and timelines
 keepalive = 2
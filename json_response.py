@@ -0,0 +1,231 @@
+"""
+Streaming JSON responses with zero-copy passthrough of cached Riot payloads
+Payloads such as match timelines are returned to the client unchanged, so they
+are kept as the raw bytes read from the filesystem cache and spliced straight
+into the response body instead of being decoded and re-encoded. Large bodies
+are encoded incrementally and compressed chunk by chunk (brotli or gzip) so
+peak memory per request stays flat and the first bytes go out immediately.
+"""
+import json
+import zlib
+
+from flask import Response, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip is used when brotli isn't installed
+    brotli = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RawJSON:
+    """Already-encoded JSON document that is spliced into responses byte-for-byte"""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data.encode() if isinstance(data, str) else data
+
+    def __len__(self):
+        return len(self.data)
+
+    def load(self):
+        """Decode the payload (only for the rare callers that need to look inside)"""
+        return json.loads(self.data)
+
+    @staticmethod
+    def is_valid(data):
+        """Cheap sanity check that cached bytes hold a complete JSON object or array"""
+        stripped = data.strip()
+        return len(stripped) >= 2 and (stripped[:1], stripped[-1:]) in ((b'{', b'}'), (b'[', b']'))
+
+
+class _ContainsRawJSON(Exception):
+    """Raised by the fast path when a subtree has RawJSON (or lazy) values and must be walked"""
+
+
+def _encode_special(obj):
+    # Compact records (e.g. MatchRecord) take their JSON shape only here, at the response edge
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    raise _ContainsRawJSON()
+
+
+_fast_encoder = json.JSONEncoder(separators=(',', ':'), default=_encode_special)
+
+
+def _encode_key(key):
+    if isinstance(key, str):
+        return json.dumps(key)
+    # Match json.dumps: non-string keys become their JSON text, quoted
+    return json.dumps(json.dumps(key))
+
+
+def _iter_value(value, defer_lazy=False):
+    """Encode a subtree with the C encoder when possible, otherwise walk it"""
+    if isinstance(value, (dict, list, tuple)):
+        try:
+            yield _fast_encoder.encode(value).encode()
+            return
+        except _ContainsRawJSON:
+            pass
+    yield from _iter_pieces(value, defer_lazy)
+
+
+class _Deferred:
+    """A lazy list left in place by prepare_json(), encoded only while the response streams"""
+
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+
+def _iter_pieces(obj, defer_lazy=False):
+    if isinstance(obj, RawJSON):
+        yield obj.data
+    elif isinstance(obj, dict):
+        yield b'{'
+        for i, (key, value) in enumerate(obj.items()):
+            yield (b',' if i else b'') + _encode_key(key).encode() + b':'
+            yield from _iter_value(value, defer_lazy)
+        yield b'}'
+    elif hasattr(obj, '__next__') and defer_lazy:
+        yield _Deferred(obj)
+    elif isinstance(obj, (list, tuple)) or hasattr(obj, '__next__'):
+        # Lists, plus generators so large sections can be produced lazily while streaming
+        yield b'['
+        for i, value in enumerate(obj):
+            if i:
+                yield b','
+            yield from _iter_value(value, defer_lazy)
+        yield b']'
+    elif hasattr(obj, 'to_dict'):
+        yield from _iter_value(obj.to_dict(), defer_lazy)
+    else:
+        yield _fast_encoder.encode(obj).encode()
+
+
+def prepare_json(payload):
+    """
+    Encode everything in a payload except its lazy lists (generators) up front
+
+    Errors in the eagerly encoded part then surface before a response is started,
+    while the lazy lists (e.g. cached timelines) are still only read while streaming.
+
+    Returns:
+        List of encoded bytes and deferred lazy lists, for iter_json()
+    """
+    return list(_iter_pieces(payload, defer_lazy=True))
+
+
+def _iter_prepared(pieces):
+    for piece in pieces:
+        if isinstance(piece, _Deferred):
+            yield from _iter_pieces(piece.items)
+        else:
+            yield piece
+
+
+def iter_json(payload, chunk_size=CHUNK_SIZE, prepared=None):
+    """
+    Encode a payload to JSON incrementally, yielding byte chunks of roughly chunk_size
+
+    Args:
+        payload: Payload to encode (ignored when prepared is given)
+        prepared: Result of prepare_json() for the payload
+    """
+    buffer = []
+    buffered = 0
+    for piece in _iter_pieces(payload) if prepared is None else _iter_prepared(prepared):
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def encode_json(payload):
+    """Encode a payload to JSON bytes in one go (RawJSON values are spliced in as-is)"""
+    return b''.join(iter_json(payload))
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        # Sync flush so every chunk reaches the client as soon as it's encoded
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _brotli_chunks(chunks):
+    compressor = brotli.Compressor(quality=4)
+    for chunk in chunks:
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best content encoding the client accepts: br, gzip or identity (q=0 means not acceptable)"""
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    def accepts(coding):
+        # An explicit entry wins over the '*' wildcard
+        return qualities.get(coding, qualities.get('*', 0)) > 0
+
+    if brotli is not None and accepts('br'):
+        return 'br'
+    if accepts('gzip'):
+        return 'gzip'
+    return None
+
+
+def _log_stream_errors(chunks):
+    # The status line is already sent - all that's left is to log and end the body
+    try:
+        yield from chunks
+    except Exception as e:
+        print(f"[JSON RESPONSE] ❌ Error while streaming response body: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+
+def json_response(payload, status=200):
+    """
+    Streamed, compressed JSON response for a payload that may contain RawJSON or lazy fields
+
+    Everything but the lazy fields is encoded before the response is returned, so
+    errors there still reach the caller's error handling instead of truncating a 200.
+    """
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    chunks = iter_json(None, prepared=prepare_json(payload))
+    if encoding == 'br':
+        chunks = _brotli_chunks(chunks)
+    elif encoding == 'gzip':
+        chunks = _gzip_chunks(chunks)
+
+    response = Response(stream_with_context(_log_stream_errors(chunks)), status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
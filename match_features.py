@@ -0,0 +1,92 @@
+"""
+Per-match feature table for YearInReviewAnalyzer
+Derives everything the analysis sections keep recomputing (dates, month keys,
+time-of-day buckets, KDA, CS/min, role, patch) in a single pass over the
+matches, so each section reads precomputed values instead of re-walking and
+re-parsing the raw match dicts.
+"""
+from collections import Counter
+from datetime import datetime
+
+TIME_PERIODS = (
+    'Night Owl (12am-6am)',
+    'Early Bird (6am-12pm)',
+    'Afternoon (12pm-6pm)',
+    'Evening (6pm-12am)',
+)
+
+
+def time_period(hour):
+    """Bucket an hour of the day into one of TIME_PERIODS"""
+    if 0 <= hour < 6:
+        return TIME_PERIODS[0]
+    elif 6 <= hour < 12:
+        return TIME_PERIODS[1]
+    elif 12 <= hour < 18:
+        return TIME_PERIODS[2]
+    return TIME_PERIODS[3]
+
+
+def patch_of(game_version):
+    """Extract major.minor patch (e.g., "14.23.604.8681" -> "14.23")"""
+    patch = game_version
+    if patch and '.' in patch:
+        parts = patch.split('.')
+        if len(parts) >= 2:
+            patch = f"{parts[0]}.{parts[1]}"
+    return patch
+
+
+def match_features(match):
+    """Precomputed features of a single processed match"""
+    creation = match.get('gameCreation', 0)
+    date = datetime.fromtimestamp(creation / 1000)
+    kills = match.get('kills', 0)
+    deaths = match.get('deaths', 0)
+    assists = match.get('assists', 0)
+    duration = match.get('gameDuration', 0)
+    duration_min = duration / 60
+    cs = match.get('totalMinionsKilled', 0) + match.get('neutralMinionsKilled', 0)
+
+    return {
+        'match': match,
+        'creation': creation,
+        'date': date,
+        'month': date.strftime('%Y-%m'),
+        'hour': date.hour,
+        'period': time_period(date.hour),
+        'win': match.get('win', False),
+        'kills': kills,
+        'deaths': deaths,
+        'assists': assists,
+        'kda': (kills + assists) / max(deaths, 1),
+        'champion': match.get('championName'),
+        'role': match.get('individualPosition', 'NONE'),
+        'patch': patch_of(match.get('gameVersion', 'Unknown')),
+        'duration': duration,
+        'duration_min': duration_min,
+        'cs': cs,
+        'cs_per_min': cs / duration_min if duration_min > 0 else None,
+    }
+
+
+class MatchFeatureTable:
+    """Feature rows for a match history, built in one pass"""
+
+    def __init__(self, matches):
+        # Same order as the input (most recent first), so tie-breaks match a loop over self.matches
+        self.rows = [match_features(m) for m in matches]
+        # Oldest first, as the streak/tilt/fatigue sections walk the history
+        self.chronological = self.rows[::-1]
+        # Strictly ordered by gameCreation (stable for equal timestamps)
+        self.by_creation = sorted(self.rows, key=lambda r: r['creation'])
+
+        self.wins = sum(1 for r in self.rows if r['win'])
+        self.champion_counts = Counter(r['champion'] for r in self.rows)
+        self.role_counts = Counter(r['role'] for r in self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
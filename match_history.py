@@ -0,0 +1,216 @@
+"""
+Processed match rows and a player's match history read from the API cache
+process_match() turns a Riot match-v5 response into the per-player row the
+endpoints send to the browser and YearInReviewAnalyzer works on.
+CachedMatchHistory walks a player's cached matches and timelines one game at a
+time, so the streaming analyzer never holds a whole history in memory (reading
+the rows the player index stored, when there are any, instead of decoding
+the raw matches).
+"""
+import sqlite3
+from datetime import datetime
+
+from api_cache import get_cache_key, get_from_cache, is_fresh_in_cache
+
+# Only this year's games are part of the year in review
+SEASON_YEAR = 2025
+
+# Bump whenever process_match()'s output changes, so rows stored by the player index are rebuilt
+ROW_VERSION = 1
+
+
+def process_match(match, puuid):
+    """
+    Extract the player's COMPREHENSIVE data for year-in-review from a match-v5 response
+
+    Returns:
+        Processed match dict, or None if the player isn't in the match
+    """
+    # Find the player's participant data
+    participant = None
+    player_team_id = None
+    for p in match['info']['participants']:
+        if p['puuid'] == puuid:
+            participant = p
+            player_team_id = p['teamId']
+            break
+
+    if not participant:
+        return None
+
+    # Get all opponents and teammates for rivalry/duo detection
+    opponents = []
+    teammates = []
+    for p in match['info']['participants']:
+        if p['teamId'] == player_team_id and p['puuid'] != puuid:
+            teammates.append({
+                'puuid': p.get('puuid'),
+                'riotIdGameName': p.get('riotIdGameName'),
+                'riotIdTagline': p.get('riotIdTagline'),
+                'championName': p['championName']
+            })
+        elif p['teamId'] != player_team_id:
+            opponents.append({
+                'puuid': p.get('puuid'),
+                'riotIdGameName': p.get('riotIdGameName'),
+                'riotIdTagline': p.get('riotIdTagline'),
+                'championName': p['championName']
+            })
+
+    # Check for AFKs/Leavers on team
+    team_had_afk = any(p.get('gameEndedInEarlySurrender') for p in match['info']['participants'] if p['teamId'] == player_team_id)
+
+    return {
+        # Basic info
+        'matchId': match['metadata']['matchId'],
+        'gameMode': match['info']['gameMode'],
+        'gameDuration': match['info']['gameDuration'],
+        'gameCreation': match['info']['gameCreation'],
+        'gameVersion': match['info'].get('gameVersion', 'Unknown'),
+        'gameEndedInEarlySurrender': match['info'].get('gameEndedInEarlySurrender', False),
+        'gameEndedInSurrender': match['info']['teams'][0].get('win', False) != match['info']['teams'][1].get('win', False),
+
+        # Champion & role
+        'championName': participant['championName'],
+        'championId': participant['championId'],
+        'lane': participant.get('lane', 'NONE'),
+        'role': participant.get('role', 'NONE'),
+        'individualPosition': participant.get('individualPosition', 'NONE'),
+
+        # Core stats
+        'kills': participant['kills'],
+        'deaths': participant['deaths'],
+        'assists': participant['assists'],
+        'win': participant['win'],
+
+        # Advanced combat stats (for highlights!)
+        'pentaKills': participant.get('pentaKills', 0),
+        'quadraKills': participant.get('quadraKills', 0),
+        'tripleKills': participant.get('tripleKills', 0),
+        'doubleKills': participant.get('doubleKills', 0),
+        'largestMultiKill': participant.get('largestMultiKill', 0),
+        'killingSprees': participant.get('killingSprees', 0),
+        'largestKillingSpree': participant.get('largestKillingSpree', 0),
+        'largestCriticalStrike': participant.get('largestCriticalStrike', 0),
+        'longestTimeSpentLiving': participant.get('longestTimeSpentLiving', 0),
+
+        # Economic stats
+        'goldEarned': participant['goldEarned'],
+        'goldPerMinute': round(participant['goldEarned'] / (match['info']['gameDuration'] / 60), 2),
+        'totalMinionsKilled': participant.get('totalMinionsKilled', 0),
+        'neutralMinionsKilled': participant.get('neutralMinionsKilled', 0),
+
+        # Damage stats
+        'totalDamageDealt': participant['totalDamageDealtToChampions'],
+        'totalDamageDealtToChampions': participant['totalDamageDealtToChampions'],
+        'damagePerMinute': round(participant['totalDamageDealtToChampions'] / (match['info']['gameDuration'] / 60), 2),
+        'totalDamageTaken': participant.get('totalDamageTaken', 0),
+
+        # CC & utility
+        'timeCCingOthers': participant.get('timeCCingOthers', 0),
+        'totalTimeCCDealt': participant.get('totalTimeCCDealt', 0),
+
+        # Vision
+        'visionScore': participant.get('visionScore', 0),
+        'wardsPlaced': participant.get('wardsPlaced', 0),
+        'wardsKilled': participant.get('wardsKilled', 0),
+        'visionWardsBoughtInGame': participant.get('visionWardsBoughtInGame', 0),
+
+        # Spells & abilities
+        'spell1Casts': participant.get('spell1Casts', 0),
+        'spell2Casts': participant.get('spell2Casts', 0),
+        'spell3Casts': participant.get('spell3Casts', 0),
+        'spell4Casts': participant.get('spell4Casts', 0),
+        'summoner1Id': participant.get('summoner1Id', 0),
+        'summoner2Id': participant.get('summoner2Id', 0),
+        'summoner1Casts': participant.get('summoner1Casts', 0),
+        'summoner2Casts': participant.get('summoner2Casts', 0),
+
+        # Bounty & objectives
+        'bountyLevel': participant.get('bountyLevel', 0),
+        'objectivesStolen': participant.get('objectivesStolen', 0),
+        'turretKills': participant.get('turretKills', 0),
+        'inhibitorKills': participant.get('inhibitorKills', 0),
+
+        # Team context (for AFK/duo detection)
+        'teamId': player_team_id,
+        'teamHadAFK': team_had_afk,
+        'opponents': opponents,
+        'teammates': teammates,
+
+        # Items (for interesting builds)
+        'item0': participant.get('item0', 0),
+        'item1': participant.get('item1', 0),
+        'item2': participant.get('item2', 0),
+        'item3': participant.get('item3', 0),
+        'item4': participant.get('item4', 0),
+        'item5': participant.get('item5', 0),
+        'item6': participant.get('item6', 0)
+    }
+
+
+def match_detail_url(routing_value, match_id):
+    return f'https://{routing_value}.api.riotgames.com/lol/match/v5/matches/{match_id}'
+
+
+def timeline_url(routing_value, match_id):
+    return f'https://{routing_value}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline'
+
+
+class CachedMatchHistory:
+    """A player's matches (and timelines) read lazily from the API cache, one game at a time"""
+
+    def __init__(self, match_ids, puuid, routing_value, headers, row_store=None):
+        """
+        Args:
+            match_ids: The player's match IDs, most recent first (as returned by match-v5)
+            puuid: The player's PUUID
+            routing_value: Regional routing value (americas, europe, ...)
+            headers: Riot API request headers (part of the cache key)
+            row_store: Optional PlayerIndex whose stored rows are used instead of decoding cached matches
+        """
+        self.puuid = puuid
+        self.routing_value = routing_value
+        self.headers = headers
+        self.row_store = row_store
+        self._match_keys = {match_id: get_cache_key(match_detail_url(routing_value, match_id), headers)
+                            for match_id in match_ids}
+        self._timeline_keys = {match_id: get_cache_key(timeline_url(routing_value, match_id), headers)
+                               for match_id in match_ids}
+        # Only games whose details are cached can be analyzed - nothing is fetched from the API here
+        self.match_ids = [match_id for match_id in match_ids if is_fresh_in_cache(self._match_keys[match_id])]
+        self.timeline_ids = [match_id for match_id in self.match_ids if is_fresh_in_cache(self._timeline_keys[match_id])]
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def games(self, timelines=True):
+        """
+        Yield (processed match, timeline or None) for every cached game, oldest first
+
+        Only one game is decoded at a time. Games from before SEASON_YEAR, or that
+        the player isn't in, are skipped.
+        """
+        for match_id in reversed(self.match_ids):
+            match = self._stored_row(match_id)
+            if match is None:
+                match_data = get_from_cache(self._match_keys[match_id])
+                if not match_data or 'info' not in match_data:
+                    continue
+                match = process_match(match_data, self.puuid)
+                if match is None:
+                    continue
+            if datetime.fromtimestamp(match['gameCreation'] / 1000).year < SEASON_YEAR:
+                continue
+
+            timeline = get_from_cache(self._timeline_keys[match_id]) if timelines else None
+            yield match, timeline
+
+    def _stored_row(self, match_id):
+        if self.row_store is None:
+            return None
+        try:
+            return self.row_store.get_row(match_id, self.puuid)
+        except sqlite3.Error as e:
+            print(f"[MATCH HISTORY] ⚠️ Failed to read stored row for {match_id}: {e}")
+            return None
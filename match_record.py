@@ -0,0 +1,195 @@
+"""
+Compact in-memory form of processed match rows
+A processed row (process_match()) is a dict of ~60 keys plus opponent and
+teammate lists of 4-key dicts that repeat the same 78-character PUUIDs and
+champion names in every match. Endpoints holding a whole season of rows per
+request keep them as slotted MatchRecords instead: no per-row dicts, and PUUIDs,
+Riot IDs, champion names and other repeated labels interned so each distinct
+string exists once per process. Records are turned back into the exact JSON
+shape of process_match() only when the response is encoded (see
+json_response, which calls to_dict()).
+
+Responses can also carry each distinct opponent/teammate once, in a player
+table, with the matches referring to them by index: {'player': 3,
+'championName': 'Ahri'} instead of the full PUUID and Riot ID. Clients send
+the table back with the matches, and expand_players() restores the full rows.
+"""
+import sys
+
+# process_match() keys, in its order (which is also the JSON key order)
+ROW_FIELDS = (
+    'matchId', 'gameMode', 'gameDuration', 'gameCreation', 'gameVersion', 'gameEndedInEarlySurrender',
+    'gameEndedInSurrender', 'championName', 'championId', 'lane', 'role', 'individualPosition',
+    'kills', 'deaths', 'assists', 'win', 'pentaKills', 'quadraKills', 'tripleKills', 'doubleKills',
+    'largestMultiKill', 'killingSprees', 'largestKillingSpree', 'largestCriticalStrike', 'longestTimeSpentLiving',
+    'goldEarned', 'goldPerMinute', 'totalMinionsKilled', 'neutralMinionsKilled', 'totalDamageDealt',
+    'totalDamageDealtToChampions', 'damagePerMinute', 'totalDamageTaken', 'timeCCingOthers', 'totalTimeCCDealt',
+    'visionScore', 'wardsPlaced', 'wardsKilled', 'visionWardsBoughtInGame', 'spell1Casts', 'spell2Casts',
+    'spell3Casts', 'spell4Casts', 'summoner1Id', 'summoner2Id', 'summoner1Casts', 'summoner2Casts',
+    'bountyLevel', 'objectivesStolen', 'turretKills', 'inhibitorKills', 'teamId', 'teamHadAFK',
+    'opponents', 'teammates', 'item0', 'item1', 'item2', 'item3', 'item4', 'item5', 'item6',
+)
+
+# String fields with few distinct values across all rows
+INTERNED_FIELDS = frozenset(('gameMode', 'gameVersion', 'championName', 'lane', 'role', 'individualPosition'))
+
+PLAYER_FIELDS = ('puuid', 'riotIdGameName', 'riotIdTagline', 'championName')
+
+_MISSING = object()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class PlayerRef:
+    """An opponent/teammate entry of a processed row, with interned strings"""
+
+    __slots__ = PLAYER_FIELDS
+
+    def __init__(self, puuid, riotIdGameName, riotIdTagline, championName):
+        self.puuid = _intern(puuid)
+        self.riotIdGameName = _intern(riotIdGameName)
+        self.riotIdTagline = _intern(riotIdTagline)
+        self.championName = _intern(championName)
+
+    @classmethod
+    def from_dict(cls, player):
+        return cls(*(player.get(field) for field in PLAYER_FIELDS))
+
+    def to_dict(self):
+        return {
+            'puuid': self.puuid,
+            'riotIdGameName': self.riotIdGameName,
+            'riotIdTagline': self.riotIdTagline,
+            'championName': self.championName
+        }
+
+
+class MatchRecord:
+    """A processed match row in slots, serialized back to the process_match() shape by to_dict()"""
+
+    __slots__ = ROW_FIELDS + ('extra',)
+
+    @classmethod
+    def from_row(cls, row):
+        """Compact a processed row (keys process_match() doesn't produce are kept as they are)"""
+        record = cls()
+        record.extra = None
+        for key, value in row.items():
+            if key in ('opponents', 'teammates'):
+                value = tuple(PlayerRef.from_dict(player) for player in value)
+            elif key in INTERNED_FIELDS:
+                value = _intern(value)
+            elif key not in MatchRecord.__slots__ or key == 'extra':
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = value
+                continue
+            setattr(record, key, value)
+        return record
+
+    def __getitem__(self, key):
+        value = getattr(self, key, _MISSING) if key in ROW_FIELDS else (self.extra or {}).get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self, players=None):
+        """
+        The row exactly as process_match() returned it
+
+        Args:
+            players: Optional PlayerTable - opponents and teammates then refer to it by index
+        """
+        row = {}
+        for key in ROW_FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                continue
+            if key in ('opponents', 'teammates'):
+                if players is not None:
+                    value = [{'player': players.id_of(player), 'championName': player.championName} for player in value]
+                else:
+                    value = [player.to_dict() for player in value]
+            row[key] = value
+        if self.extra:
+            row.update(self.extra)
+        return row
+
+
+class PlayerTable:
+    """The distinct opponents/teammates of a response, referred to by index from its matches"""
+
+    def __init__(self):
+        self.ids = {}  # {(puuid, game name, tagline): index}
+        self.players = []
+
+    def id_of(self, player):
+        """Index of a PlayerRef, adding it on first sight"""
+        key = (player.puuid, player.riotIdGameName, player.riotIdTagline)
+        player_id = self.ids.get(key)
+        if player_id is None:
+            player_id = self.ids[key] = len(self.players)
+            self.players.append({'puuid': player.puuid, 'riotIdGameName': player.riotIdGameName,
+                                 'riotIdTagline': player.riotIdTagline})
+        return player_id
+
+    def add_records(self, records):
+        """Add everyone in these MatchRecords, in order of first appearance"""
+        for record in records:
+            for player in getattr(record, 'opponents', ()) + getattr(record, 'teammates', ()):
+                self.id_of(player)
+        return self
+
+    def to_list(self):
+        return self.players
+
+
+class InvalidPlayerTable(ValueError):
+    """A request's player table, or a match's reference into it, is malformed"""
+
+
+def _table_player(players, entry):
+    player_id = entry['player']
+    # bool is an int too, and a negative index would silently pick someone from the end
+    if type(player_id) is not int or not 0 <= player_id < len(players):
+        raise InvalidPlayerTable(f"Invalid player table reference: {player_id!r}")
+    player = players[player_id]
+    if not isinstance(player, dict):
+        raise InvalidPlayerTable(f"Invalid player table entry at {player_id}")
+    return {**player, 'championName': entry.get('championName')}
+
+
+def expand_players(matches, players):
+    """
+    Restore full opponent/teammate entries in matches that refer to a player table (in place)
+
+    Args:
+        matches: Match rows from a request body
+        players: The request's player table, or None when the matches are already full rows
+
+    Returns:
+        matches
+
+    Raises:
+        InvalidPlayerTable: The table isn't a list of players, or a reference isn't an index into it
+    """
+    if not players:
+        return matches
+    if not isinstance(players, list):
+        raise InvalidPlayerTable('players must be a list')
+    for match in matches:
+        for key in ('opponents', 'teammates'):
+            entries = match.get(key)
+            if not entries:
+                continue
+            match[key] = [_table_player(players, entry) if isinstance(entry, dict) and 'player' in entry else entry
+                          for entry in entries]
+    return matches
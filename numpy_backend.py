@@ -0,0 +1,118 @@
+"""
+Optional NumPy backend for YearInReviewAnalyzer
+Stores the per-match feature table as NumPy columns so the month/hour/role/patch
+breakdowns become vectorized group-bys instead of Python dict loops. Groups are
+returned in first-appearance order and sums are accumulated in match order, so
+results are identical to the pure Python sections (including max/min tie-breaks).
+"""
+try:
+    import numpy as np
+except ImportError:  # Optional - the analyzer falls back to the pure Python loops
+    np = None
+
+# Columns summed by group_stats, and whether they hold integers
+NUMERIC_COLUMNS = {
+    'win': True,
+    'kills': True,
+    'deaths': True,
+    'assists': True,
+    'cs': True,
+    'duration_min': False,
+}
+
+# Columns that can be grouped on
+GROUP_COLUMNS = ('month', 'period', 'role', 'patch', 'champion')
+
+
+def is_available():
+    """Whether numpy is installed"""
+    return np is not None
+
+
+class MatchColumns:
+    """Column store over a MatchFeatureTable with vectorized group-by aggregations"""
+
+    def __init__(self, features):
+        rows = features.rows
+        self.size = len(rows)
+
+        self.values = {}
+        for column, is_int in NUMERIC_COLUMNS.items():
+            dtype = np.int64 if is_int else np.float64
+            self.values[column] = np.fromiter((r[column] for r in rows), dtype=dtype, count=self.size)
+
+        # Categorical columns are dictionary-encoded, codes assigned in first-appearance order
+        self.labels = {}
+        self.codes = {}
+        for column in GROUP_COLUMNS:
+            label_codes = {}
+            self.codes[column] = np.fromiter(
+                (label_codes.setdefault(r[column], len(label_codes)) for r in rows),
+                dtype=np.intp,
+                count=self.size
+            )
+            self.labels[column] = list(label_codes)
+
+    def _ordered_groups(self, codes, group_count):
+        """Group codes present in `codes`, ordered by their first occurrence"""
+        first_seen = np.full(group_count, self.size, dtype=np.intp)
+        np.minimum.at(first_seen, codes, np.arange(len(codes), dtype=np.intp))
+        present = np.flatnonzero(first_seen < self.size)
+        return present[np.argsort(first_seen[present], kind='stable')]
+
+    def group_stats(self, key, mask=None, **sums):
+        """
+        Per-group game counts and column sums
+
+        Args:
+            key: Column to group on (one of GROUP_COLUMNS)
+            mask: Optional boolean array selecting the matches to include
+            **sums: Output field -> numeric column to sum, e.g. wins='win'
+
+        Returns:
+            {group: {'games': n, <field>: sum, ...}} in first-appearance order
+        """
+        codes = self.codes[key]
+        group_count = len(self.labels[key])
+        if mask is not None:
+            codes = codes[mask]
+
+        counts = np.bincount(codes, minlength=group_count).tolist()
+        totals = {}
+        for field, column in sums.items():
+            values = self.values[column] if mask is None else self.values[column][mask]
+            # bincount adds weights one match at a time, in order - same float result as a loop
+            summed = np.bincount(codes, weights=values, minlength=group_count)
+            if NUMERIC_COLUMNS[column]:
+                summed = summed.astype(np.int64)
+            totals[field] = summed.tolist()
+
+        labels = self.labels[key]
+        result = {}
+        for code in self._ordered_groups(codes, group_count).tolist():
+            stats = {'games': counts[code]}
+            for field in sums:
+                stats[field] = totals[field][code]
+            result[labels[code]] = stats
+        return result
+
+    def group_counts(self, key, subkey):
+        """
+        Nested counts of `subkey` values within each `key` group
+
+        Returns:
+            {group: {subgroup: count}} with both levels in first-appearance order
+        """
+        sub_count = len(self.labels[subkey])
+        pair_codes = self.codes[key] * sub_count + self.codes[subkey]
+        pair_total = len(self.labels[key]) * sub_count
+
+        counts = np.bincount(pair_codes, minlength=pair_total).tolist()
+        labels = self.labels[key]
+        sub_labels = self.labels[subkey]
+
+        result = {}
+        for pair in self._ordered_groups(pair_codes, pair_total).tolist():
+            group, sub = divmod(pair, sub_count)
+            result.setdefault(labels[group], {})[sub_labels[sub]] = counts[pair]
+        return result
@@ -0,0 +1,136 @@
+"""
+Win/loss sequence of a match history for the streak and tilt analyses
+Built once per dataset: a bitset of outcomes (oldest game = bit 0), prefix
+sums of wins and run-length encoded win/loss runs and champion sessions.
+Questions such as "win rate after N straight losses", "longest win streak" or
+"win rate in games 5+ of a champion session" are then answered from the runs
+in O(runs) instead of rescanning the history with slices.
+"""
+
+# Loss streak lengths tilt detection reports the following game's win rate for (by default)
+TILT_WINDOWS = (1, 2, 3, 4, 5)
+
+# Longest loss streak a request can pick as a tilt window
+MAX_TILT_WINDOW = 20
+
+
+def parse_tilt_windows(value):
+    """
+    The `tilt_windows` request parameter as a sorted tuple of loss streak lengths
+
+    Accepts a list of integers or a comma-separated string; None gives TILT_WINDOWS.
+
+    Raises:
+        ValueError: Not integers between 1 and MAX_TILT_WINDOW, or none at all
+    """
+    if value is None:
+        return TILT_WINDOWS
+    if isinstance(value, str):
+        parts = [part.strip() for part in value.split(',') if part.strip()]
+        if not all(part.isdigit() for part in parts):
+            raise ValueError('tilt_windows must be integers')
+        value = [int(part) for part in parts]
+    if not isinstance(value, list) or not value:
+        raise ValueError('tilt_windows must be a non-empty list of integers')
+    if not all(type(window) is int and 1 <= window <= MAX_TILT_WINDOW for window in value):
+        raise ValueError(f'tilt_windows must be between 1 and {MAX_TILT_WINDOW}')
+    return tuple(sorted(set(value)))
+
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+
+def _runs(values):
+    """Run-length encode a sequence: [(value, start, length), ...]"""
+    runs = []
+    for i, value in enumerate(values):
+        if runs and runs[-1][0] == value:
+            runs[-1][2] += 1
+        else:
+            runs.append([value, i, 1])
+    return [tuple(run) for run in runs]
+
+
+class OutcomeSequence:
+    """Chronological outcomes of feature rows (oldest first) with run-length encoding and prefix sums"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.size = len(rows)
+
+        outcomes = [bool(row['win']) for row in rows]
+        self.bits = sum(1 << i for i, win in enumerate(outcomes) if win)
+        self.wins_before = [0]  # wins_before[i] = wins in games [0, i)
+        for win in outcomes:
+            self.wins_before.append(self.wins_before[-1] + win)
+        # [(win, start, length), ...] alternating win and loss runs
+        self.runs = _runs(outcomes)
+        self._sessions = {}
+
+    @property
+    def wins(self):
+        return self.wins_before[-1]
+
+    def outcome(self, i):
+        """Whether game i (0 = oldest) was a win"""
+        return bool(self.bits >> i & 1)
+
+    def wins_between(self, start, end):
+        """Wins in games [start, end)"""
+        return self.wins_before[end] - self.wins_before[start]
+
+    def streaks(self, win, min_length=1, closed=False):
+        """
+        Win (or loss) runs as (start, length), oldest first
+
+        Args:
+            win: True for win streaks, False for loss streaks
+            min_length: Shortest run to include
+            closed: Only runs that ended with a game of the other outcome (skips a run still going)
+        """
+        return [(start, length) for value, start, length in self.runs
+                if value == win and length >= min_length and (not closed or start + length < self.size)]
+
+    def longest_streak(self, win):
+        """(start, length) of the longest win/loss run (the oldest on ties), or None"""
+        best = None
+        for start, length in self.streaks(win):
+            if best is None or length > best[1]:
+                best = (start, length)
+        return best
+
+    def after_losses(self, n):
+        """
+        Games played right after at least n straight losses
+
+        Returns:
+            (games, wins)
+        """
+        games = wins = 0
+        for start, length in self.streaks(False, min_length=n):
+            # Losses n+1.. of the run were each preceded by n losses
+            games += length - n
+            # ... and so was the game that ended the run
+            if start + length < self.size:
+                games += 1
+                wins += 1
+        return games, wins
+
+    def positions_after(self, win):
+        """Indices of the games directly following a win (or a loss)"""
+        previous = self.bits if win else ~self.bits & ((1 << self.size) - 1)
+        mask = (previous << 1) & ((1 << self.size) - 1)
+        return [i for i in range(1, self.size) if mask >> i & 1]
+
+    def count_after(self, win):
+        """(games, wins) directly following a win (or a loss), from the bitset"""
+        previous = self.bits if win else ~self.bits & ((1 << self.size) - 1)
+        mask = (previous << 1) & ((1 << self.size) - 1)
+        return _popcount(mask), _popcount(mask & self.bits)
+
+    def sessions(self, key='champion'):
+        """Consecutive games with the same value of a feature (e.g. champion) as (value, start, length)"""
+        if key not in self._sessions:
+            self._sessions[key] = _runs([row[key] for row in self.rows])
+        return self._sessions[key]
@@ -0,0 +1,349 @@
+"""
+Co-occurrence index and processed rows of players across every match we've fetched
+Each match-v5 response is indexed once, as it's fetched: who played it (all 10
+participants, by PUUID), the latest Riot ID seen for every player, and running
+teammate/opponent counts for every pair of players in the match. Duo, premade
+and rival lookups are then a primary-key range scan by PUUID - they survive
+Riot ID renames and cover everyone any search has ever pulled in, not just the
+games in one request.
+
+The processed match row (process_match()) of every participant is stored too,
+keyed by (matchId, puuid), so when a teammate or opponent searches later their
+rows are read back as-is instead of decoding and processing the raw match again.
+
+The index is a SQLite database next to the API cache, so every gunicorn worker
+and analysis process can add to it concurrently. Backfill it from an existing
+cache with:
+    python player_index.py
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from api_cache import CACHE_DIR, iter_cached_match_details
+from match_history import ROW_VERSION, process_match
+
+INDEX_PATH = os.path.join(CACHE_DIR, 'player_index.sqlite3')
+
+# Solo queue rarely puts the same stranger on your team this often - it's a premade
+PREMADE_MIN_GAMES = 3
+
+# Opponents met at least this often count as rivals
+RIVAL_MIN_GAMES = 2
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS matches (
+        match_id TEXT PRIMARY KEY,
+        game_creation INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS appearances (
+        puuid TEXT NOT NULL,
+        match_id TEXT NOT NULL,
+        team_id INTEGER NOT NULL,
+        win INTEGER NOT NULL,
+        PRIMARY KEY (puuid, match_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS players (
+        puuid TEXT PRIMARY KEY,
+        game_name TEXT,
+        tag_line TEXT,
+        last_seen INTEGER NOT NULL
+    )""",
+    # One row per ordered pair of players who shared a match; wins are from `puuid`'s side
+    """CREATE TABLE IF NOT EXISTS pairs (
+        puuid TEXT NOT NULL,
+        other TEXT NOT NULL,
+        teammate_games INTEGER NOT NULL,
+        teammate_wins INTEGER NOT NULL,
+        opponent_games INTEGER NOT NULL,
+        opponent_wins INTEGER NOT NULL,
+        last_seen INTEGER NOT NULL,
+        PRIMARY KEY (puuid, other)
+    ) WITHOUT ROWID""",
+    # process_match() output as JSON, for every participant of every indexed match
+    """CREATE TABLE IF NOT EXISTS participant_rows (
+        match_id TEXT NOT NULL,
+        puuid TEXT NOT NULL,
+        row_version INTEGER NOT NULL,
+        row TEXT NOT NULL,
+        PRIMARY KEY (match_id, puuid)
+    ) WITHOUT ROWID""",
+)
+
+# SQLite's default limit on host parameters per statement is 999 on older builds
+QUERY_CHUNK = 500
+
+# Newer games win for the Riot ID, so renamed players show their current name
+PLAYER_UPSERT = """
+    INSERT INTO players (puuid, game_name, tag_line, last_seen) VALUES (?, ?, ?, ?)
+    ON CONFLICT (puuid) DO UPDATE SET
+        game_name = CASE WHEN excluded.last_seen >= last_seen THEN excluded.game_name ELSE game_name END,
+        tag_line = CASE WHEN excluded.last_seen >= last_seen THEN excluded.tag_line ELSE tag_line END,
+        last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+PAIR_UPSERT = """
+    INSERT INTO pairs (puuid, other, teammate_games, teammate_wins, opponent_games, opponent_wins, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (puuid, other) DO UPDATE SET
+        teammate_games = teammate_games + excluded.teammate_games,
+        teammate_wins = teammate_wins + excluded.teammate_wins,
+        opponent_games = opponent_games + excluded.opponent_games,
+        opponent_wins = opponent_wins + excluded.opponent_wins,
+        last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+
+def player_key(player):
+    """Stable key of a teammate/opponent entry: PUUID, or the Riot ID for rows without one"""
+    return player.get('puuid') or riot_id(player)
+
+
+def riot_id(player, unknown=''):
+    """'gameName#tagLine' of a participant or teammate/opponent entry"""
+    return f"{player.get('riotIdGameName') or unknown}#{player.get('riotIdTagline') or ''}"
+
+
+class PlayerIndex:
+    """SQLite-backed index of which players appeared in which matches, with and against whom"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Connections stay in the process that opened them (the index is pickled into analysis processes)
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads (or forked processes)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    # ---- Indexing ----
+
+    def add_matches(self, matches):
+        """
+        Index raw match-v5 responses, skipping matches that are already indexed
+
+        Returns:
+            Number of matches added
+        """
+        connection = self._connect()
+        added = 0
+        # One write transaction per batch - concurrent writers wait on the busy timeout
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for match in matches:
+                if self._add_match(connection, match):
+                    added += 1
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return added
+
+    @classmethod
+    def _add_match(cls, connection, match):
+        info = match.get('info') or {}
+        match_id = (match.get('metadata') or {}).get('matchId')
+        participants = [p for p in info.get('participants', []) if p.get('puuid') and p['puuid'] != 'BOT']
+        if not match_id or not participants:
+            return False
+        creation = info.get('gameCreation', 0)
+        if connection.execute('INSERT OR IGNORE INTO matches VALUES (?, ?)', (match_id, creation)).rowcount == 0:
+            # Already indexed - only (re)store the rows if they're missing or from an older process_match()
+            current = connection.execute(
+                'SELECT COUNT(*) FROM participant_rows WHERE match_id = ? AND row_version = ?',
+                (match_id, ROW_VERSION)).fetchone()[0]
+            if current < len(participants):
+                cls._store_rows(connection, match_id, match, participants)
+            return False
+        cls._store_rows(connection, match_id, match, participants)
+
+        connection.executemany(
+            'INSERT OR IGNORE INTO appearances VALUES (?, ?, ?, ?)',
+            [(p['puuid'], match_id, p.get('teamId', 0), 1 if p.get('win') else 0) for p in participants])
+        connection.executemany(
+            PLAYER_UPSERT,
+            [(p['puuid'], p.get('riotIdGameName'), p.get('riotIdTagline'), creation) for p in participants])
+
+        pairs = []
+        for p in participants:
+            win = 1 if p.get('win') else 0
+            for other in participants:
+                if other['puuid'] == p['puuid']:
+                    continue
+                if other.get('teamId') == p.get('teamId'):
+                    pairs.append((p['puuid'], other['puuid'], 1, win, 0, 0, creation))
+                else:
+                    pairs.append((p['puuid'], other['puuid'], 0, 0, 1, win, creation))
+        connection.executemany(PAIR_UPSERT, pairs)
+        return True
+
+    @staticmethod
+    def _store_rows(connection, match_id, match, participants):
+        rows = []
+        for p in participants:
+            try:
+                row = process_match(match, p['puuid'])
+            except (KeyError, TypeError, ZeroDivisionError):
+                # Malformed participant - the match is still indexed, its rows are just rebuilt on demand
+                continue
+            if row is not None:
+                rows.append((match_id, p['puuid'], ROW_VERSION, json.dumps(row, separators=(',', ':'))))
+        connection.executemany('INSERT OR REPLACE INTO participant_rows VALUES (?, ?, ?, ?)', rows)
+
+    # ---- Lookups ----
+
+    def get_row(self, match_id, puuid):
+        """The player's stored processed row for a match, or None if it isn't stored (or is outdated)"""
+        found = self._connect().execute(
+            'SELECT row FROM participant_rows WHERE match_id = ? AND puuid = ? AND row_version = ?',
+            (match_id, puuid, ROW_VERSION)).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def get_rows(self, match_ids, puuid):
+        """Stored processed rows of the player for any of match_ids: {match_id: row}"""
+        connection = self._connect()
+        rows = {}
+        match_ids = list(match_ids)
+        for start in range(0, len(match_ids), QUERY_CHUNK):
+            chunk = match_ids[start:start + QUERY_CHUNK]
+            found = connection.execute(
+                f"SELECT match_id, row FROM participant_rows WHERE puuid = ? AND row_version = ? "
+                f"AND match_id IN ({','.join('?' * len(chunk))})", [puuid, ROW_VERSION, *chunk])
+            for match_id, row in found:
+                rows[match_id] = json.loads(row)
+        return rows
+
+    def player_games(self, puuid):
+        """Number of indexed matches the player appeared in (changes whenever their lookups can)"""
+        row = self._connect().execute('SELECT COUNT(*) FROM appearances WHERE puuid = ?', (puuid,)).fetchone()
+        return row[0]
+
+    def match_ids(self, puuid):
+        """IDs of the player's indexed matches, most recent first"""
+        rows = self._connect().execute(
+            'SELECT a.match_id FROM appearances a JOIN matches m ON m.match_id = a.match_id '
+            'WHERE a.puuid = ? ORDER BY m.game_creation DESC', (puuid,))
+        return [row[0] for row in rows]
+
+    def riot_id(self, puuid):
+        """Latest 'gameName#tagLine' seen for a PUUID, or None if they were never indexed"""
+        row = self._connect().execute('SELECT game_name, tag_line FROM players WHERE puuid = ?', (puuid,)).fetchone()
+        return f"{row[0] or ''}#{row[1] or ''}" if row else None
+
+    def co_players(self, puuid, min_games=1):
+        """
+        Everyone who shared at least min_games indexed matches with the player, most recently seen first
+
+        Returns:
+            [{'puuid', 'name', 'teammate_games', 'teammate_wins', 'opponent_games', 'opponent_wins', 'last_seen'}]
+            with wins counted from the player's side
+        """
+        rows = self._connect().execute(
+            'SELECT p.other, pl.game_name, pl.tag_line, p.teammate_games, p.teammate_wins, '
+            'p.opponent_games, p.opponent_wins, p.last_seen '
+            'FROM pairs p LEFT JOIN players pl ON pl.puuid = p.other '
+            'WHERE p.puuid = ? AND p.teammate_games + p.opponent_games >= ? '
+            'ORDER BY p.last_seen DESC, p.other', (puuid, min_games))
+        return [{
+            'puuid': other,
+            'name': f"{game_name or ''}#{tag_line or ''}",
+            'teammate_games': teammate_games,
+            'teammate_wins': teammate_wins,
+            'opponent_games': opponent_games,
+            'opponent_wins': opponent_wins,
+            'last_seen': last_seen
+        } for other, game_name, tag_line, teammate_games, teammate_wins, opponent_games, opponent_wins, last_seen in rows]
+
+    def relations(self, puuid, limit=10):
+        """
+        The player's premade partners and rivals across every indexed match
+
+        Returns:
+            {'name', 'games', 'premades': [...], 'rivals': [...]}, each list capped at `limit`
+        """
+        co_players = self.co_players(puuid, min_games=min(PREMADE_MIN_GAMES, RIVAL_MIN_GAMES))
+
+        premades = [{
+            'puuid': row['puuid'],
+            'name': row['name'],
+            'games': row['teammate_games'],
+            'wins': row['teammate_wins'],
+            'winrate': round(row['teammate_wins'] / row['teammate_games'] * 100, 1)
+        } for row in co_players if row['teammate_games'] >= PREMADE_MIN_GAMES]
+        premades.sort(key=lambda x: (x['games'], x['winrate']), reverse=True)
+
+        rivals = [{
+            'puuid': row['puuid'],
+            'name': row['name'],
+            'games': row['opponent_games'],
+            'wins': row['opponent_wins'],
+            'losses': row['opponent_games'] - row['opponent_wins']
+        } for row in co_players if row['opponent_games'] >= RIVAL_MIN_GAMES]
+        rivals.sort(key=lambda x: (x['games'], x['losses']), reverse=True)
+
+        return {
+            'name': self.riot_id(puuid),
+            'games': self.player_games(puuid),
+            'premades': premades[:limit],
+            'rivals': rivals[:limit]
+        }
+
+
+player_index = PlayerIndex()
+
+
+def index_matches(matches):
+    """Add freshly decoded matches (and all their participants' rows) to the shared index - never fails the request"""
+    try:
+        added = player_index.add_matches(matches)
+        if added:
+            print(f"[PLAYER INDEX] Indexed {added} new matches")
+    except sqlite3.Error as e:
+        print(f"[PLAYER INDEX] ⚠️ Failed to index matches: {e}")
+
+
+def get_stored_rows(match_ids, puuid):
+    """Stored processed rows of the player ({match_id: row}) - empty if the index can't be read"""
+    try:
+        return player_index.get_rows(match_ids, puuid)
+    except sqlite3.Error as e:
+        print(f"[PLAYER INDEX] ⚠️ Failed to read stored rows: {e}")
+        return {}
+
+
+def build_index(cache_dir=CACHE_DIR, path=INDEX_PATH, batch_size=500):
+    """Index every match already in the API cache (matches indexed before are skipped)"""
+    index = PlayerIndex(path)
+    batch = []
+    seen = added = 0
+    for match in iter_cached_match_details(cache_dir):
+        batch.append(match)
+        seen += 1
+        if len(batch) >= batch_size:
+            added += index.add_matches(batch)
+            batch = []
+            print(f"[PLAYER INDEX] Progress: {seen} cached matches")
+    added += index.add_matches(batch)
+    print(f"[PLAYER INDEX] Indexed {added} new matches ({seen} in the cache) into {path}")
+    return index
+
+
+if __name__ == '__main__':
+    build_index(sys.argv[1] if len(sys.argv) > 1 else CACHE_DIR)
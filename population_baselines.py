@@ -0,0 +1,302 @@
+"""
+Population percentile baselines built from every cached match
+An offline job walks the API cache once, takes all 10 participants of every
+cached match-v5 response and adds their CS/min, KDA, vision/min and damage/min
+to quantile sketches per metric, role and patch (plus all-patch and all-role
+totals merged from those). The result is saved next to the cache, and analyses
+look a player's games up in it to get real percentiles instead of comparing
+against hard-coded benchmarks.
+
+Run after the cache has grown (e.g. nightly from cron):
+    python population_baselines.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from threading import Lock
+
+from api_cache import CACHE_DIR, iter_cached_match_details
+from match_features import patch_of
+from quantile_sketch import QuantileSketch
+
+BASELINES_PATH = os.path.join(CACHE_DIR, 'population_baselines.json')
+
+# Bump when metrics or the file layout change
+BASELINES_VERSION = 1
+
+METRICS = ('cs_per_min', 'kda', 'vision_per_min', 'damage_per_min')
+
+# Remakes end before anything meaningful happens
+MIN_GAME_SECONDS = 300
+
+# A role+patch sketch needs this many games before it's used instead of the all-patch one
+MIN_SAMPLES = 200
+
+ALL = 'ALL'
+
+# CS/min by rank used until a population sketch exists for the player's role
+CS_BENCHMARKS = {
+    'Iron': 3.5,
+    'Bronze': 4.0,
+    'Silver': 4.5,
+    'Gold': 5.0,
+    'Platinum': 5.5,
+    'Emerald': 6.0,
+    'Diamond': 6.5,
+    'Master': 7.0,
+    'Grandmaster': 7.5,
+    'Challenger': 8.0
+}
+
+# Where the median player of each rank sits in the ladder (approximate ranked distribution),
+# so a rank's CS/min benchmark is the population sketch at that quantile
+RANK_QUANTILES = {
+    'Iron': 0.02,
+    'Bronze': 0.13,
+    'Silver': 0.32,
+    'Gold': 0.52,
+    'Platinum': 0.71,
+    'Emerald': 0.87,
+    'Diamond': 0.96,
+    'Master': 0.99,
+    'Grandmaster': 0.998,
+    'Challenger': 0.9998
+}
+
+
+def game_metrics(participant, duration_seconds):
+    """
+    CS/min, KDA, vision/min and damage/min of one participant in one game
+
+    Works on both raw match-v5 participants and processed match rows.
+
+    Returns:
+        {metric: value}, or None for remakes
+    """
+    if duration_seconds < MIN_GAME_SECONDS:
+        return None
+    minutes = duration_seconds / 60
+    cs = participant.get('totalMinionsKilled', 0) + participant.get('neutralMinionsKilled', 0)
+    # Processed rows from before totalDamageDealtToChampions was added carry it as totalDamageDealt
+    damage = participant.get('totalDamageDealtToChampions', participant.get('totalDamageDealt', 0))
+    return {
+        'cs_per_min': cs / minutes,
+        'kda': (participant.get('kills', 0) + participant.get('assists', 0)) / max(participant.get('deaths', 0), 1),
+        'vision_per_min': participant.get('visionScore', 0) / minutes,
+        'damage_per_min': damage / minutes
+    }
+
+
+def role_of(participant):
+    return participant.get('individualPosition') or 'NONE'
+
+
+def _sketch_key(metric, role, patch):
+    return f"{metric}|{role}|{patch}"
+
+
+class PopulationBaselines:
+    """Quantile sketches per (metric, role, patch), with ALL for every role/patch"""
+
+    def __init__(self, sketches=None, matches=0, built_at=None):
+        self.sketches = sketches or {}  # {"metric|role|patch": QuantileSketch}
+        self.matches = matches
+        self.built_at = built_at
+
+    @property
+    def fingerprint(self):
+        """Changes whenever the baselines are rebuilt, for dataset keys and ETags"""
+        return f"{BASELINES_VERSION}:{self.built_at}:{self.matches}"
+
+    def add_match(self, match):
+        """Add every participant of a raw match-v5 response"""
+        info = match['info']
+        patch = patch_of(info.get('gameVersion', 'Unknown'))
+        for participant in info.get('participants', []):
+            metrics = game_metrics(participant, info.get('gameDuration', 0))
+            if metrics is None:
+                continue
+            role = role_of(participant)
+            for metric, value in metrics.items():
+                key = _sketch_key(metric, role, patch)
+                if key not in self.sketches:
+                    self.sketches[key] = QuantileSketch()
+                self.sketches[key].add(value)
+        self.matches += 1
+
+    def add_totals(self):
+        """Merge the per role+patch sketches into all-patch, all-role and overall sketches"""
+        totals = {}
+        for key, sketch in list(self.sketches.items()):
+            metric, role, patch = key.split('|')
+            if ALL in (role, patch):
+                continue
+            for total_key in (_sketch_key(metric, role, ALL), _sketch_key(metric, ALL, patch), _sketch_key(metric, ALL, ALL)):
+                totals.setdefault(total_key, QuantileSketch()).merge(sketch)
+        self.sketches.update(totals)
+
+    def sketch(self, metric, role, patch):
+        """Most specific sketch with enough games: role+patch, then role, then everyone"""
+        for key in (_sketch_key(metric, role, patch), _sketch_key(metric, role, ALL), _sketch_key(metric, ALL, ALL)):
+            sketch = self.sketches.get(key)
+            if sketch is not None and sketch.count >= MIN_SAMPLES:
+                return sketch
+        return None
+
+    def percentile(self, metric, role, patch, value):
+        """Percent (0-100) of the population's games in that role and patch with a lower value, or None"""
+        sketch = self.sketch(metric, role, patch)
+        if sketch is None:
+            return None
+        return sketch.rank(value) * 100
+
+    def to_dict(self):
+        return {
+            'version': BASELINES_VERSION,
+            'built_at': self.built_at,
+            'matches': self.matches,
+            'sketches': {key: sketch.to_dict() for key, sketch in self.sketches.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != BASELINES_VERSION:
+            return None
+        sketches = {key: QuantileSketch.from_dict(sketch) for key, sketch in data.get('sketches', {}).items()}
+        return cls(sketches, data.get('matches', 0), data.get('built_at'))
+
+
+def cs_rank(cs_per_min, role_counts, baselines=None):
+    """
+    Estimated rank of a CS/min against the population of the player's main role
+
+    Args:
+        cs_per_min: The player's overall CS/min
+        role_counts: {role: games}
+        baselines: PopulationBaselines, or None to use the hard-coded table
+
+    Returns:
+        (estimated rank, {rank: CS/min benchmark}, percentile or None, 'population' or 'table')
+    """
+    sketch = None
+    if baselines is not None:
+        # Ties go to the alphabetically first role so every backend picks the same one
+        main_role = min(role_counts.items(), key=lambda item: (-item[1], item[0]))[0] if role_counts else ALL
+        sketch = baselines.sketch('cs_per_min', main_role, ALL)
+
+    if sketch is not None:
+        benchmarks = {rank: round(sketch.quantile(q), 1) for rank, q in RANK_QUANTILES.items()}
+        percentile = round(sketch.rank(cs_per_min) * 100, 1)
+        source = 'population'
+    else:
+        benchmarks = dict(CS_BENCHMARKS)
+        percentile = None
+        source = 'table'
+
+    estimated_rank = 'Iron'
+    for rank in RANK_QUANTILES:
+        if cs_per_min >= benchmarks[rank]:
+            estimated_rank = rank
+    return estimated_rank, benchmarks, percentile, source
+
+
+class PercentileTally:
+    """A player's average game percentile per metric, overall and by role, folded in one game at a time"""
+
+    def __init__(self, baselines):
+        self.baselines = baselines
+        self.totals = {}  # {role or ALL: {'games': n, metric: [percentile sum, games]}}
+
+    def add(self, match):
+        """Fold in one processed match row"""
+        metrics = game_metrics(match, match.get('gameDuration', 0))
+        if metrics is None:
+            return
+        role = role_of(match)
+        patch = patch_of(match.get('gameVersion', 'Unknown'))
+        for group in (ALL, role):
+            totals = self.totals.setdefault(group, {'games': 0})
+            totals['games'] += 1
+            for metric, value in metrics.items():
+                percentile = self.baselines.percentile(metric, role, patch, value)
+                if percentile is not None:
+                    entry = totals.setdefault(metric, [0, 0])
+                    entry[0] += percentile
+                    entry[1] += 1
+
+    def result(self):
+        def averages(totals):
+            summary = {'games': totals['games']}
+            for metric in METRICS:
+                percentile_sum, games = totals.get(metric, (0, 0))
+                summary[metric] = round(percentile_sum / games, 1) if games else None
+            return summary
+
+        overall = self.totals.get(ALL)
+        return {
+            'population_matches': self.baselines.matches,
+            'overall': averages(overall) if overall else None,
+            'by_role': {role: averages(totals) for role, totals in self.totals.items() if role != ALL}
+        }
+
+
+_loaded = {'stamp': None, 'baselines': None}
+_load_lock = Lock()
+
+
+def get_baselines(path=BASELINES_PATH):
+    """The saved baselines (reloaded when the job rewrites the file), or None if never built"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _load_lock:
+        if _loaded['stamp'] != (path, mtime):
+            try:
+                with open(path, 'r') as f:
+                    _loaded['baselines'] = PopulationBaselines.from_dict(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"[BASELINES] Failed to load {path}: {e}")
+                _loaded['baselines'] = None
+            _loaded['stamp'] = (path, mtime)
+        return _loaded['baselines']
+
+
+def baselines_fingerprint():
+    """Fingerprint of the current baselines ('none' before the first build)"""
+    baselines = get_baselines()
+    return baselines.fingerprint if baselines is not None else 'none'
+
+
+def build_baselines(cache_dir=CACHE_DIR):
+    """Aggregate every cached match-v5 response (each match once) into PopulationBaselines"""
+    baselines = PopulationBaselines(built_at=int(time.time()))
+    for match in iter_cached_match_details(cache_dir):
+        baselines.add_match(match)
+        if baselines.matches % 1000 == 0:
+            print(f"[BASELINES] Progress: {baselines.matches} matches")
+
+    baselines.add_totals()
+    print(f"[BASELINES] Aggregated {baselines.matches} matches ({len(baselines.sketches)} sketches) from {cache_dir}")
+    return baselines
+
+
+def save_baselines(baselines, path=BASELINES_PATH):
+    """Write atomically, so running servers never read a partial file"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps(baselines.to_dict()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print(f"[BASELINES] Saved to {path}")
+
+
+if __name__ == '__main__':
+    save_baselines(build_baselines(sys.argv[1] if len(sys.argv) > 1 else CACHE_DIR))
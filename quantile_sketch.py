@@ -0,0 +1,102 @@
+"""
+Mergeable quantile sketch for population statistics
+A DDSketch-style histogram: non-negative values go into logarithmic buckets
+whose width is a fixed fraction of the value, so any quantile is known to
+within RELATIVE_ACCURACY however many values were added. Two sketches merge by
+adding bucket counts, so partial aggregations (per patch, per worker) combine
+into exactly the sketch of all the values together.
+"""
+import math
+from bisect import bisect_left
+
+RELATIVE_ACCURACY = 0.01
+
+# Values at or below this all land in the zero bucket (0 CS, 0 vision...)
+MIN_VALUE = 1e-3
+
+
+class QuantileSketch:
+    """Log-bucketed counts of non-negative values with quantile and rank queries"""
+
+    __slots__ = ('alpha', 'gamma_log', 'zero', 'bins', 'count', '_cumulative')
+
+    def __init__(self, alpha=RELATIVE_ACCURACY):
+        self.alpha = alpha
+        self.gamma_log = math.log((1 + alpha) / (1 - alpha))
+        self.zero = 0
+        self.bins = {}  # {bucket index: count}
+        self.count = 0
+        self._cumulative = None  # (sorted indexes, counts below each) for rank queries
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self.gamma_log)
+
+    def add(self, value, count=1):
+        if value <= MIN_VALUE:
+            self.zero += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self._cumulative = None
+
+    def merge(self, other):
+        """Add another sketch's values (both must use the same accuracy)"""
+        if other.alpha != self.alpha:
+            raise ValueError(f"Can't merge sketches with accuracy {self.alpha} and {other.alpha}")
+        self.zero += other.zero
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += other.count
+        self._cumulative = None
+        return self
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0-1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Bucket (gamma^(i-1), gamma^i] - its midpoint is within alpha of every value in it
+                return 2 * math.exp(index * self.gamma_log) / (1 + math.exp(self.gamma_log))
+        return 2 * math.exp(max(self.bins) * self.gamma_log) / (1 + math.exp(self.gamma_log))
+
+    def rank(self, value):
+        """Approximate fraction (0-1) of values below `value`, counting values in its bucket as half below"""
+        if not self.count:
+            return None
+        if value <= MIN_VALUE:
+            return self.zero / 2 / self.count
+
+        if self._cumulative is None:
+            indexes = sorted(self.bins)
+            below = []
+            total = self.zero
+            for index in indexes:
+                below.append(total)
+                total += self.bins[index]
+            self._cumulative = (indexes, below)
+        indexes, below = self._cumulative
+
+        index = self._index(value)
+        position = bisect_left(indexes, index)
+        if position == len(indexes):
+            return 1.0
+        same = self.bins[index] if indexes[position] == index else 0
+        return (below[position] + same / 2) / self.count
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'zero': self.zero, 'bins': [[index, count] for index, count in sorted(self.bins.items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get('alpha', RELATIVE_ACCURACY))
+        sketch.zero = data.get('zero', 0)
+        sketch.bins = {index: count for index, count in data.get('bins', [])}
+        sketch.count = sketch.zero + sum(sketch.bins.values())
+        return sketch
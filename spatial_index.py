@@ -0,0 +1,130 @@
+"""
+Spatial index over League of Legends timeline events
+Buckets every positioned event into a uniform grid over Summoner's Rift so
+region queries ("deaths near dragon pit between minute 10 and 20") only touch
+the grid cells that overlap the query circle instead of every frame.
+"""
+from collections import defaultdict
+
+# Summoner's Rift map coordinates run from roughly (0, 0) to (14870, 14980)
+MAP_SIZE = 15000
+CELL_SIZE = 500  # 30x30 grid
+
+# Well-known map locations that can be used as query centers
+LANDMARKS = {
+    'dragon_pit': (9866, 4414),
+    'baron_pit': (5007, 10471),
+    'mid_lane': (7435, 7435),
+}
+
+
+class TimelineSpatialIndex:
+    """Uniform grid over positioned timeline events, keyed by event type"""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        # {(event_type, cell_x, cell_y): [(x, y, timestamp, match_id, event), ...]}
+        self.cells = defaultdict(list)
+        self.event_count = 0
+        self.match_ids = set()
+
+    @classmethod
+    def from_timelines(cls, timelines, cell_size=CELL_SIZE):
+        """Build an index from the [{'match_id': ..., 'timeline': ...}] list used by the analyzer"""
+        index = cls(cell_size)
+        for timeline_data in timelines:
+            index.add_timeline(timeline_data.get('match_id'), timeline_data.get('timeline'))
+        return index
+
+    def add_timeline(self, match_id, timeline):
+        """Index every event with a position from a single match timeline"""
+        if not timeline or 'info' not in timeline:
+            return
+
+        self.match_ids.add(match_id)
+        for frame in timeline['info'].get('frames', []):
+            for event in frame.get('events', []):
+                self.add_event(match_id, event)
+
+    def add_event(self, match_id, event):
+        """Index a single event (events without a position are skipped)"""
+        position = event.get('position')
+        if not position:
+            return
+
+        x = position.get('x', 0)
+        y = position.get('y', 0)
+        key = (event.get('type'), int(x // self.cell_size), int(y // self.cell_size))
+        self.cells[key].append((x, y, event.get('timestamp', 0), match_id, event))
+        self.event_count += 1
+
+    def _cells_in_range(self, event_type, x, y, radius):
+        """Yield the grid cells of one event type overlapping the query circle's bounding box"""
+        min_cx = int(max(x - radius, 0) // self.cell_size)
+        max_cx = int(min(x + radius, MAP_SIZE) // self.cell_size)
+        min_cy = int(max(y - radius, 0) // self.cell_size)
+        max_cy = int(min(y + radius, MAP_SIZE) // self.cell_size)
+
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                cell = self.cells.get((event_type, cx, cy))
+                if cell:
+                    yield cell
+
+    def query(self, center, radius, event_types=None, start_minute=None, end_minute=None,
+              participants=None, participant_field='victimId'):
+        """
+        Find events within `radius` map units of `center`
+
+        Args:
+            center: (x, y) tuple or a LANDMARKS key such as 'dragon_pit'
+            radius: Search radius in map units
+            event_types: Event type or iterable of types (e.g. 'CHAMPION_KILL'); all types if None
+            start_minute: Only include events at or after this game minute
+            end_minute: Only include events before this game minute
+            participants: Optional {match_id: participantId} map; only events whose
+                `participant_field` matches the participant for that match are kept
+            participant_field: Event field compared against `participants` (victimId, killerId, ...)
+
+        Returns:
+            List of matching events as {'match_id', 'timestamp', 'position', 'event'} dicts,
+            ordered by match and timestamp
+        """
+        if isinstance(center, str):
+            center = LANDMARKS[center]
+        x, y = center
+
+        if event_types is None:
+            event_types = {key[0] for key in self.cells}
+        elif isinstance(event_types, str):
+            event_types = {event_types}
+
+        start_ms = start_minute * 60000 if start_minute is not None else None
+        end_ms = end_minute * 60000 if end_minute is not None else None
+        radius_sq = radius * radius
+
+        results = []
+        for event_type in event_types:
+            for cell in self._cells_in_range(event_type, x, y, radius):
+                for ex, ey, timestamp, match_id, event in cell:
+                    if start_ms is not None and timestamp < start_ms:
+                        continue
+                    if end_ms is not None and timestamp >= end_ms:
+                        continue
+                    if (ex - x) * (ex - x) + (ey - y) * (ey - y) > radius_sq:
+                        continue
+                    if participants is not None and event.get(participant_field) != participants.get(match_id):
+                        continue
+                    results.append({
+                        'match_id': match_id,
+                        'timestamp': timestamp,
+                        'position': {'x': ex, 'y': ey},
+                        'event': event
+                    })
+
+        results.sort(key=lambda r: (str(r['match_id']), r['timestamp']))
+        return results
+
+    def count(self, center, radius, **filters):
+        """Count events within `radius` of `center` (same filters as query)"""
+        return len(self.query(center, radius, **filters))
@@ -140,30 +140,44 @@ $(document).ready(function() {
         $('.error-message').hide();
 
         // Make API request to our Flask backend
-        $.ajax({
-            url: '/api/summoner',
-            method: 'POST',
-            contentType: 'application/json',
-            data: JSON.stringify({
-                gameName: gameName,
-                tagLine: tagLine,
-                region: region
-            }),
-            success: function(data) {
-                displayResults(data);
-            },
-            error: function(xhr) {
-                const errorMsg = xhr.responseJSON ? xhr.responseJSON.error : 'An error occurred';
-                showError(errorMsg);
-                $('.loading').hide();
-
-                // Re-enable submit button on error
-                const submitBtn = $('#summonerForm button[type="submit"]');
-                submitBtn.prop('disabled', false).css({
-                    'opacity': '1',
-                    'cursor': 'pointer'
-                });
-            }
+        // Revalidate against the stored data for this summoner so unchanged match history costs a 304
+        getFromIndexedDB('summonerData').catch(() => null).then(cached => {
+            const canRevalidate = cached && cached.etag && cached.region === region &&
+                cached.summoner && cached.summoner.name === `${gameName}#${tagLine}`;
+
+            $.ajax({
+                url: '/api/summoner',
+                method: 'POST',
+                contentType: 'application/json',
+                headers: canRevalidate ? { 'If-None-Match': cached.etag } : {},
+                data: JSON.stringify({
+                    gameName: gameName,
+                    tagLine: tagLine,
+                    region: region,
+                    playerTable: true
+                }),
+                success: function(data, textStatus, xhr) {
+                    if (xhr.status === 304 && canRevalidate) {
+                        console.log('[ETAG] Match history unchanged, using stored summoner data');
+                        displayResults(cached);
+                        return;
+                    }
+                    data.etag = xhr.getResponseHeader('ETag');
+                    displayResults(data);
+                },
+                error: function(xhr) {
+                    const errorMsg = xhr.responseJSON ? xhr.responseJSON.error : 'An error occurred';
+                    showError(errorMsg);
+                    $('.loading').hide();
+
+                    // Re-enable submit button on error
+                    const submitBtn = $('#summonerForm button[type="submit"]');
+                    submitBtn.prop('disabled', false).css({
+                        'opacity': '1',
+                        'cursor': 'pointer'
+                    });
+                }
+            });
         });
     });
 
@@ -43,6 +43,32 @@ function saveToIndexedDB(key, data) {
     });
 }
 
+// $.ajax wrapper with ETag revalidation: resends the last ETag stored for this
+// endpoint and hands the stored response to `success` on 304 Not Modified
+function ajaxWithETag(options) {
+    const cacheKey = `etag:${options.url}`;
+    return getFromIndexedDB(cacheKey).catch(() => null).then(cached => {
+        return $.ajax(Object.assign({}, options, {
+            headers: Object.assign({}, options.headers, cached ? { 'If-None-Match': cached.etag } : {}),
+            success: function(data, textStatus, xhr) {
+                if (xhr.status === 304 && cached) {
+                    console.log(`[ETAG] ${options.url} not modified, using stored response`);
+                    data = cached.body;
+                } else {
+                    const etag = xhr.getResponseHeader('ETag');
+                    if (etag) {
+                        saveToIndexedDB(cacheKey, { etag: etag, body: data })
+                            .catch(e => console.error('[ETAG] Failed to store response:', e));
+                    }
+                }
+                if (options.success) {
+                    options.success(data, textStatus, xhr);
+                }
+            }
+        }));
+    });
+}
+
 // Configure marked library for inline rendering
 if (typeof marked !== 'undefined') {
     marked.setOptions({
@@ -114,7 +140,8 @@ async function startReview() {
                         data: JSON.stringify({
                             gameName: summonerParam.split('#')[0],
                             tagLine: summonerParam.split('#')[1] || regionParam,
-                            region: regionParam
+                            region: regionParam,
+                            playerTable: true
                         })
                     });
 
@@ -166,12 +193,14 @@ async function startReview() {
 function showPreviewStats(summonerData) {
     console.log('[PREVIEW] Getting preview stats...');
 
-    $.ajax({
+    ajaxWithETag({
         url: '/api/preview-stats',
         method: 'POST',
         contentType: 'application/json',
         data: JSON.stringify({
-            matches: summonerData.recentMatches
+            matches: summonerData.recentMatches,
+            puuid: summonerData.summoner.puuid,
+            region: summonerData.region
         }),
         success: function(previewData) {
             console.log('[PREVIEW] Preview data received:', previewData);
@@ -250,15 +279,18 @@ function generateYearInReview(summonerData) {
         console.log('[LAST GAME] Date:', new Date(lastMatch.gameCreation).toLocaleString(), '| Champion:', lastMatch.championName);
     }
 
-    $.ajax({
+    ajaxWithETag({
         url: '/api/year-in-review',
         method: 'POST',
         contentType: 'application/json',
         data: JSON.stringify({
             matches: summonerData.recentMatches,
+            players: summonerData.players,
             summonerName: summonerData.summoner.name,
             region: summonerData.region,
-            timelines: summonerData.matchTimelines || []
+            timelines: summonerData.matchTimelines || [],
+            puuid: summonerData.summoner.puuid,
+            approximate: true
         }),
         success: function(data) {
             const elapsed = ((Date.now() - startTime) / 1000).toFixed(2);
@@ -290,6 +322,7 @@ function generateYearInReview(summonerData) {
             console.log('[YEAR IN REVIEW] Initializing scroll animations...');
             initScrollAnimations();
             console.log('[YEAR IN REVIEW] ✨ Initial review complete!');
+            refineApproximateSections(summonerData, reviewData);
 
             // Trigger background fetch for full data (500 matches) only if we have less than 500
             if (summonerData.recentMatches.length < 500) {
@@ -320,6 +353,40 @@ function generateYearInReview(summonerData) {
     });
 }
 
+// Heavy histories get sampled estimates of the timeline sections first - poll until the exact ones are stored
+function refineApproximateSections(summonerData, data, attempt = 0) {
+    if (!data.refining || attempt >= 40) {
+        return;
+    }
+    setTimeout(() => {
+        $.ajax({
+            url: '/api/year-in-review/refined',
+            method: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify({
+                sections: data.refining
+            }),
+            success: function(refined) {
+                if (reviewData !== data) {
+                    return;  // Replaced by a newer analysis
+                }
+                Object.assign(data.analysis, refined.analysis);
+                data.refining = Object.keys(refined.pending).length ? refined.pending : null;
+                if (data.refining) {
+                    refineApproximateSections(summonerData, data, attempt + 1);
+                    return;
+                }
+                console.log('[YEAR IN REVIEW] ✅ Exact timeline sections received');
+                buildStoryCards(summonerData, data);
+                initScrollAnimations();
+            },
+            error: function(xhr) {
+                console.error('[YEAR IN REVIEW] Error refining approximate sections:', xhr);
+            }
+        });
+    }, 3000);
+}
+
 // Trigger background fetch for full data (500 matches)
 function triggerFullDataFetch(summonerData) {
     console.log('[FULL DATA] Starting background fetch for additional matches...');
@@ -358,7 +425,8 @@ function triggerFullDataFetch(summonerData) {
         data: JSON.stringify({
             gameName: gameName,
             tagLine: tagLine,
-            region: summonerData.region
+            region: summonerData.region,
+            playerTable: true
         }),
         success: function(fullData) {
             console.log(`[FULL DATA] ✅ Full data received: ${fullData.total_matches} matches`);
@@ -373,6 +441,7 @@ function triggerFullDataFetch(summonerData) {
 
             // Merge new matches with existing data
             summonerData.recentMatches = fullData.matches;
+            summonerData.players = fullData.players;
 
             // Save updated data to IndexedDB
             saveToIndexedDB('summonerData', summonerData).then(() => {
@@ -390,15 +459,18 @@ function triggerFullDataFetch(summonerData) {
                 `;
 
                 // Re-run analysis
-                $.ajax({
+                ajaxWithETag({
                     url: '/api/year-in-review',
                     method: 'POST',
                     contentType: 'application/json',
                     data: JSON.stringify({
                         matches: summonerData.recentMatches,
+                        players: summonerData.players,
                         summonerName: summonerData.summoner.name,
                         region: summonerData.region,
-                        timelines: summonerData.matchTimelines || []
+                        timelines: summonerData.matchTimelines || [],
+                        puuid: summonerData.summoner.puuid,
+                        approximate: true
                     }),
                     success: function(data) {
                         console.log('[FULL DATA] ✅ Full analysis complete!');
@@ -421,6 +493,8 @@ function triggerFullDataFetch(summonerData) {
 
                         // Scroll to top to see updated content
                         window.scrollTo({ top: 0, behavior: 'smooth' });
+
+                        refineApproximateSections(summonerData, reviewData);
                     },
                     error: function(xhr) {
                         console.error('[FULL DATA] Error re-analyzing:', xhr);
@@ -1053,6 +1127,11 @@ function buildStoryCards(summonerData, reviewData) {
                     <p style="color: #A09B8C; font-size: 0.95rem; margin: 5px 0;">
                         ${percentAboveBenchmark > 0 ? `${percentAboveBenchmark}% above` : `${Math.abs(percentAboveBenchmark)}% below`} ${cs.estimated_rank} average
                     </p>
+                    ${cs.percentile != null ? `
+                    <p style="color: #A09B8C; font-size: 0.85rem; margin: 5px 0;">
+                        Better than ${Math.round(cs.percentile)}% of games in your role
+                    </p>
+                    ` : ''}
                 </div>
             `;
         }
@@ -1392,6 +1471,42 @@ function buildStoryCards(summonerData, reviewData) {
 
     // Card 23: Objective Priority - REMOVED
 
+    // Card 23b: Objective Fights (kills and deaths around the pits)
+    if (analysis.objective_fights && analysis.objective_fights.fights > 0) {
+        const fights = analysis.objective_fights;
+        const pitNames = {dragon_pit: '🐉 Dragon Pit', baron_pit: '👾 Baron Pit'};
+
+        cards.push(`
+            <div class="story-card">
+                <h2>🏟️ Objective Brawls</h2>
+                <div class="stat-number">${fights.fights}</div>
+                <p style="font-size: 1.3rem; margin-bottom: 20px;">Kills & Deaths Around the Pits</p>
+
+                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 20px 0;">
+                    ${['dragon_pit', 'baron_pit'].map(pit => {
+                        const stats = fights.pits[pit];
+                        const isDeadliest = pit === fights.deadliest_pit;
+                        return `
+                            <div style="background: ${isDeadliest ? 'rgba(199, 59, 59, 0.15)' : 'rgba(255, 255, 255, 0.05)'}; padding: 15px; border-radius: 10px; border: ${isDeadliest ? '2px solid #C73B3B' : 'none'};">
+                                <p style="color: #A09B8C; font-size: 0.8rem; margin-bottom: 5px;">${pitNames[pit]}</p>
+                                <p style="color: #E4E1D8; font-size: 1.8rem; font-weight: bold; margin: 0;">${stats.kills} / ${stats.deaths}</p>
+                                <p style="color: #A09B8C; font-size: 0.7rem; margin-top: 3px;">Kills / Deaths</p>
+                            </div>
+                        `;
+                    }).join('')}
+                </div>
+
+                <div style="background: rgba(199, 155, 59, 0.1); border-radius: 10px; padding: 15px; border-left: 3px solid #C79B3B;">
+                    <p style="color: #A09B8C; font-size: 0.9rem; margin: 0;">
+                        ${fights.pits[fights.deadliest_pit].deaths > fights.pits[fights.deadliest_pit].kills ?
+                            `The ${pitNames[fights.deadliest_pit]} is where you die most - ward it before the fight starts.` :
+                            'You win your objective fights - keep forcing them!'}
+                    </p>
+                </div>
+            </div>
+        `);
+    }
+
     // Card 24: Tilt Factor (Mental Fortitude)
     if (analysis.tilt_factor) {
         const tilt = analysis.tilt_factor;
@@ -1531,8 +1646,10 @@ async function getRoasted() {
         contentType: 'application/json',
         data: JSON.stringify({
             matches: summonerData.recentMatches,
+            players: summonerData.players,
             summonerName: summonerData.summoner.name,
-            region: summonerData.region
+            region: summonerData.region,
+            puuid: summonerData.summoner.puuid
         }),
         success: function(data) {
             console.log('[ROAST] ✅ Roast received:', data.roast);
@@ -1570,14 +1687,16 @@ async function getChampionRecommendations() {
     button.disabled = true;
     button.textContent = 'Analyzing your playstyle...';
 
-    $.ajax({
+    ajaxWithETag({
         url: '/api/recommend-champions',
         method: 'POST',
         contentType: 'application/json',
         data: JSON.stringify({
             matches: summonerData.recentMatches,
+            players: summonerData.players,
             summonerName: summonerData.summoner.name,
-            region: summonerData.region
+            region: summonerData.region,
+            puuid: summonerData.summoner.puuid
         }),
         success: function(data) {
             console.log('[CHAMPION RECS] ✅ Recommendations received:', data.recommendations);
@@ -319,7 +319,8 @@ async function loadYearInReview() {
                         data: JSON.stringify({
                             gameName: summonerParam.split('#')[0],
                             tagLine: summonerParam.split('#')[1] || regionParam,
-                            region: regionParam
+                            region: regionParam,
+                            playerTable: true
                         })
                     });
 
@@ -365,9 +366,11 @@ function generateMapCards(summonerData) {
         contentType: 'application/json',
         data: JSON.stringify({
             matches: summonerData.recentMatches,
+            players: summonerData.players,
             summonerName: summonerData.summoner.name,
             region: summonerData.region,
-            timelines: summonerData.matchTimelines || []
+            timelines: summonerData.matchTimelines || [],
+            puuid: summonerData.summoner.puuid
         }),
         success: function(data) {
             console.log('[MAP] ✅ Analysis received, placing cards...');
@@ -0,0 +1,132 @@
+"""
+Per-minute participant stats extracted from match timelines
+Turns a timeline's participantFrames into a (minute x participant x stat) array
+of gold, xp, cs and map position, plus each minute's team gold difference, so
+phase and gold-lead analyses index arrays instead of walking frames. Timelines
+never change once a match is over, so extracted frames are cached per match ID
+and content digest - timelines come from request bodies, and a forged one sent
+with a real match ID must not be served to anyone else.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    import numpy as np
+except ImportError:  # Optional - nested lists with the same layout are used instead
+    np = None
+
+STATS = ('gold', 'xp', 'cs', 'x', 'y')
+GOLD, XP, CS, X, Y = range(len(STATS))
+PARTICIPANTS = 10
+
+# Extracted matches kept per process (~16KB each as arrays)
+CACHE_SIZE = 1024
+
+
+class MatchCache:
+    """Bounded per-process LRU of data extracted from match timelines, keyed by (match ID, content digest)"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, build):
+        """
+        Cached value for a match, calling build() on a miss
+
+        key is (match ID, analysis_store.match_digest of the data); with no digest the value
+        is built but not cached, since only the digest ties the ID to the data.
+        """
+        if key is None or None in key:
+            return build()
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = MatchCache()
+
+
+def _frame_rows(timeline):
+    """[minute][participant] -> (gold, xp, cs, x, y) for participantIds 1-10"""
+    rows = []
+    for frame in timeline.get('info', {}).get('frames', []):
+        participant_frames = frame.get('participantFrames') or {}
+        row = []
+        for participant_id in range(1, PARTICIPANTS + 1):
+            stats = participant_frames.get(str(participant_id)) or {}
+            position = stats.get('position') or {}
+            row.append((
+                stats.get('totalGold', 0),
+                stats.get('xp', 0),
+                stats.get('minionsKilled', 0) + stats.get('jungleMinionsKilled', 0),
+                position.get('x', 0),
+                position.get('y', 0)
+            ))
+        rows.append(row)
+    return rows
+
+
+class MatchFrames:
+    """Per-minute stats of every participant in one match"""
+
+    __slots__ = ('match_id', 'minutes', 'stats', 'team_gold_diff')
+
+    def __init__(self, match_id, timeline):
+        rows = _frame_rows(timeline)
+        self.match_id = match_id
+        self.minutes = len(rows)
+
+        if np is not None:
+            self.stats = np.array(rows, dtype=np.int64).reshape(self.minutes, PARTICIPANTS, len(STATS))
+            gold = self.stats[:, :, GOLD]
+            # Blue side (participants 1-5) minus red side (6-10)
+            self.team_gold_diff = (gold[:, :5].sum(axis=1) - gold[:, 5:].sum(axis=1)).tolist()
+        else:
+            self.stats = rows
+            self.team_gold_diff = [sum(p[GOLD] for p in row[:5]) - sum(p[GOLD] for p in row[5:]) for row in rows]
+
+    @property
+    def last_minute(self):
+        """Minute of the final frame (roughly the game length)"""
+        return self.minutes - 1
+
+    def stat_at(self, minute, participant_id, stat):
+        """A participant's cumulative stat (GOLD, XP, CS, X or Y) at a minute"""
+        if np is not None:
+            return int(self.stats[minute, participant_id - 1, stat])
+        return self.stats[minute][participant_id - 1][stat]
+
+    def gains(self, start_minute, end_minute, participant_id):
+        """Gold, xp and cs a participant gained between two minutes"""
+        if np is not None:
+            delta = self.stats[end_minute, participant_id - 1, :CS + 1] - self.stats[start_minute, participant_id - 1, :CS + 1]
+            return tuple(delta.tolist())
+        end = self.stats[end_minute][participant_id - 1]
+        start = self.stats[start_minute][participant_id - 1]
+        return tuple(end[i] - start[i] for i in (GOLD, XP, CS))
+
+    def gold_lead(self, participant_id):
+        """Per-minute team gold lead from the participant's side (negative = behind)"""
+        if participant_id <= 5:
+            return self.team_gold_diff
+        return [-diff for diff in self.team_gold_diff]
+
+
+def get_match_frames(match_id, timeline, digest=None):
+    """Extracted frames for a match, from the per-process cache when seen with the same digest"""
+    return _cache.get((match_id, digest), lambda: MatchFrames(match_id, timeline))
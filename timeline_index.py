@@ -0,0 +1,157 @@
+"""
+Parsed event index over the match timelines of a dataset
+Walks every frame of every timeline once, resolves which participantId is the
+player in each match (from metadata.participants) and indexes the events by
+type, by participant and by time bucket, so timeline analyses read only the
+events they need instead of re-scanning all frames.
+"""
+from collections import defaultdict
+
+BUCKET_MINUTES = 5
+
+# Event fields that name a single participant (1-10)
+PARTICIPANT_FIELDS = ('killerId', 'victimId', 'participantId', 'creatorId')
+
+
+def resolve_participant_id(timeline, puuid=None, match=None):
+    """
+    Find the player's participantId (1-10) in a timeline
+
+    Riot lists the participants' PUUIDs in participantId order in
+    metadata.participants. When the player's PUUID isn't known, the player is
+    the one participant who isn't among the processed match's teammates/opponents.
+
+    Returns:
+        participantId, or None if the player can't be identified
+    """
+    participants = (timeline.get('metadata') or {}).get('participants') or []
+    if not participants:
+        # Newer timelines also carry [{'participantId': n, 'puuid': ...}] in info
+        info_participants = timeline.get('info', {}).get('participants') or []
+        ordered = sorted(info_participants, key=lambda p: p.get('participantId', 0))
+        participants = [p.get('puuid') for p in ordered]
+
+    if puuid and puuid in participants:
+        return participants.index(puuid) + 1
+
+    if match:
+        others = {p.get('puuid') for p in match.get('teammates', []) + match.get('opponents', [])}
+        candidates = [i + 1 for i, p in enumerate(participants) if p not in others]
+        if len(candidates) == 1:
+            return candidates[0]
+
+    return None
+
+
+class TimelineIndex:
+    """Events of a set of timelines, indexed by type, participant and time bucket"""
+
+    def __init__(self, bucket_minutes=BUCKET_MINUTES):
+        self.bucket_ms = bucket_minutes * 60000
+        # {match_id: player's participantId or None}
+        self.participants = {}
+        # {event_type: [(match_id, event), ...]} in timeline order
+        self.by_type = defaultdict(list)
+        # {(match_id, event_type, field, participantId): [event, ...]}
+        self.by_participant = defaultdict(list)
+        # {(event_type, bucket): [(match_id, event), ...]}
+        self.by_bucket = defaultdict(list)
+        # {(match_id, event_type): [event, ...]}
+        self.by_match = defaultdict(list)
+        self.event_count = 0
+
+    @classmethod
+    def from_timelines(cls, timelines, matches=(), puuid=None, bucket_minutes=BUCKET_MINUTES):
+        """Build an index from the [{'match_id': ..., 'timeline': ...}] list used by the analyzer"""
+        index = cls(bucket_minutes)
+        matches_by_id = {m.get('matchId'): m for m in matches}
+        for timeline_data in timelines:
+            match_id = timeline_data.get('match_id')
+            index.add_timeline(match_id, timeline_data.get('timeline'), puuid, matches_by_id.get(match_id))
+        return index
+
+    def add_timeline(self, match_id, timeline, puuid=None, match=None):
+        """Index every event of a single match timeline"""
+        if not timeline or 'info' not in timeline:
+            return
+
+        self.participants[match_id] = resolve_participant_id(timeline, puuid, match)
+        for frame in timeline['info'].get('frames', []):
+            for event in frame.get('events', []):
+                self.add_event(match_id, event)
+
+    def add_event(self, match_id, event):
+        """Index a single event"""
+        event_type = event.get('type')
+        entry = (match_id, event)
+        self.by_type[event_type].append(entry)
+        self.by_match[(match_id, event_type)].append(event)
+        self.by_bucket[(event_type, event.get('timestamp', 0) // self.bucket_ms)].append(entry)
+
+        for field in PARTICIPANT_FIELDS:
+            participant_id = event.get(field)
+            if participant_id:
+                self.by_participant[(match_id, event_type, field, participant_id)].append(event)
+        for participant_id in event.get('assistingParticipantIds') or ():
+            self.by_participant[(match_id, event_type, 'assistingParticipantIds', participant_id)].append(event)
+
+        self.event_count += 1
+
+    @property
+    def match_ids(self):
+        return list(self.participants)
+
+    def player_id(self, match_id):
+        """The player's participantId in a match (None if unknown)"""
+        return self.participants.get(match_id)
+
+    def events(self, event_type):
+        """All events of a type as (match_id, event) pairs"""
+        return self.by_type.get(event_type, [])
+
+    def match_events(self, match_id, event_type):
+        """Events of a type in one match, in timeline order"""
+        return self.by_match.get((match_id, event_type), [])
+
+    def participant_events(self, match_id, event_type, participant_id, field='killerId'):
+        """Events of a type in one match where `field` is (or, for assistingParticipantIds, contains) participant_id"""
+        return self.by_participant.get((match_id, event_type, field, participant_id), [])
+
+    def player_events(self, event_type, field='killerId'):
+        """
+        The player's events of a type across all matches
+
+        Args:
+            event_type: e.g. 'CHAMPION_KILL'
+            field: Which role the player has in the event - killerId, victimId,
+                assistingParticipantIds, creatorId, ...
+
+        Returns:
+            List of (match_id, event) pairs, skipping matches where the player
+            couldn't be identified
+        """
+        results = []
+        for match_id, participant_id in self.participants.items():
+            if participant_id is None:
+                continue
+            for event in self.by_participant.get((match_id, event_type, field, participant_id), ()):
+                results.append((match_id, event))
+        return results
+
+    def events_between(self, event_type, start_minute=None, end_minute=None):
+        """Events of a type with start_minute <= game time < end_minute, as (match_id, event) pairs"""
+        start_ms = start_minute * 60000 if start_minute is not None else 0
+        if end_minute is None:
+            buckets = [b for (t, b) in self.by_bucket if t == event_type and b >= start_ms // self.bucket_ms]
+            end_ms = None
+        else:
+            end_ms = end_minute * 60000
+            buckets = range(start_ms // self.bucket_ms, (end_ms - 1) // self.bucket_ms + 1)
+
+        results = []
+        for bucket in sorted(buckets):
+            for match_id, event in self.by_bucket.get((event_type, bucket), ()):
+                timestamp = event.get('timestamp', 0)
+                if timestamp >= start_ms and (end_ms is None or timestamp < end_ms):
+                    results.append((match_id, event))
+        return results